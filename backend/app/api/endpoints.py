@@ -1,80 +1,308 @@
 # app/api/endpoints.py
-from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import json
 import shutil
-from app.models.schemas import VideoRequest, VideoResponse
+import uuid
+from typing import Any, Dict, Optional
+from app.models.schemas import VideoRequest, VideoResponse, JobSubmitResponse, JobStatusResponse, BatchRequest
 from app.core.tiktok_generator import make_tiktok_from_prompt
 from app.core.subtitle_generator import process_video_for_subtitles
+from app.core.batch_generator import make_tiktok_batch
+from app.core.checkpoints import checkpoint_stats
+from app.core.tts_router import tts_router
+from app.core.transcript_cache import transcript_cache_stats
+from app.utils.whisper_utils import model_registry, WHISPER_MODEL_SIZES
+from app.core.result_cache import get_or_generate, invalidate_result, is_cached, is_valid_cache_key, result_cache_stats
+from app.core.jobs import job_manager, JOB_SUCCEEDED, JOB_FAILED
+from app.core.resources import ResourceBusyError, get_limiter, resources_stats
 from app.core.configs import TEMP_DIR
+from app.utils.render_cache import sprite_cache
+from app.utils.background_cache import background_cache_stats
 import os
 
 router = APIRouter()
 
+def build_video_url(http_request: Request, video_path: str) -> str:
+    """
+    Construit l'URL publique d'une vidéo servie depuis le dossier de sortie.
+    """
+    base_url = str(http_request.base_url)
+    return f"{base_url.rstrip('/')}/videos/{os.path.basename(video_path)}"
+
+def save_upload(video_file: UploadFile, unique: bool = False) -> str:
+    """
+    Sauvegarde la vidéo uploadée dans TEMP_DIR et retourne son chemin.
+    """
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    filename = f"{uuid.uuid4().hex[:8]}_{video_file.filename}" if unique else video_file.filename
+    temp_video_path = os.path.join(TEMP_DIR, filename)
+    with open(temp_video_path, "wb") as buffer:
+        shutil.copyfileobj(video_file.file, buffer)
+    print(f"LOG: Vidéo uploadée sauvegardée temporairement à {temp_video_path}")
+    return temp_video_path
+
+def remove_upload(temp_video_path: str):
+    # Nettoyer la vidéo temporaire uploadée
+    if temp_video_path and os.path.exists(temp_video_path):
+        try:
+            os.remove(temp_video_path)
+            print(f"LOG: Vidéo temporaire uploadée supprimée : {temp_video_path}")
+        except Exception as e:
+            print(f"LOG: Erreur lors de la suppression de la vidéo temporaire {temp_video_path}: {e}")
+
 @router.get("/health")
 async def health_check():
     return {"status": "API is running"}
 
-@router.post("/generate-video", response_model=VideoResponse)
-async def generate_video(request: VideoRequest, http_request: Request):
-    print("LOG: Début du processus de génération de vidéo.")
-    try:
-        video_path = make_tiktok_from_prompt(
+@router.get("/metrics")
+async def metrics():
+    """
+    Expose les compteurs internes du worker (caches de rendu, etc.).
+    """
+    return {
+        "subtitle_sprite_cache": sprite_cache.stats(),
+        "background_cache": background_cache_stats(),
+        "resources": resources_stats(),
+        "jobs": job_manager.stats(),
+        "result_cache": result_cache_stats(),
+        "checkpoints": checkpoint_stats(),
+        "tts_router": tts_router.stats(),
+        "whisper_models": model_registry.stats(),
+        "transcript_cache": transcript_cache_stats()
+    }
+
+def check_whisper_model(whisper_model: Optional[str]):
+    if whisper_model and whisper_model not in WHISPER_MODEL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Modèle Whisper inconnu : '{whisper_model}'. Valeurs possibles : {', '.join(WHISPER_MODEL_SIZES)}")
+
+def busy_exception(e: ResourceBusyError) -> HTTPException:
+    """
+    Réponse 503 avec l'en-tête Retry-After quand une ressource est saturée.
+    """
+    print(f"LOG: Requête rejetée - {e}")
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def admit_generation(request: VideoRequest):
+    """
+    Rejette la demande si la file de rendu est pleine, sauf si la vidéo est déjà en cache (pas de rendu à faire).
+    """
+    if request.use_cache and is_cached(request.model_dump()):
+        return
+    get_limiter("render").check_admission()
+
+def generate_for_request(request: VideoRequest, progress_callback=None):
+    """
+    Génère la vidéo d'une requête, en passant par le cache de résultats si elle le demande.
+    Retourne (chemin de la vidéo, clé de cache ou None, servie depuis le cache).
+    """
+    def generate():
+        return make_tiktok_from_prompt(
             prompt=request.prompt,
             n_images=request.n_images,
             category=request.category,
             lang=request.lang,
             tone=request.tone,
-            tts_service=request.tts_service
+            tts_service=request.tts_service,
+            render_engine=request.render_engine,
+            progress_callback=progress_callback
         )
+
+    if request.use_cache:
+        return get_or_generate(request.model_dump(), generate)
+    return generate(), None, False
+
+@router.post("/generate-video", response_model=VideoResponse)
+async def generate_video(request: VideoRequest, http_request: Request):
+    print("LOG: Début du processus de génération de vidéo.")
+    try:
+        # Rejet immédiat si la file de rendu est déjà pleine
+        admit_generation(request)
+        # Le pipeline est bloquant : l'exécuter hors de la boucle d'événements
+        video_path, cache_key, cached = await run_in_threadpool(generate_for_request, request)
         print("LOG: Vidéo générée avec succès.")
 
         # Construire l'URL complète de la vidéo
-        base_url = str(http_request.base_url)
-        video_filename = os.path.basename(video_path)
-        # Assurez-vous que l'URL est correctement formée
-        video_url = f"{base_url.rstrip('/')}/videos/{video_filename}"
+        video_url = build_video_url(http_request, video_path)
         
         print(f"LOG: URL de la vidéo retournée au frontend : {video_url}")
-        return VideoResponse(video_url=video_url)
+        return VideoResponse(video_url=video_url, cache_key=cache_key, cached=cached)
+    except ResourceBusyError as e:
+        raise busy_exception(e)
     except Exception as e:
         print(f"LOG: Erreur critique - {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/add-subtitles", response_model=VideoResponse)
-async def add_subtitles_to_video(request: Request, video_file: UploadFile = File(...)):
+async def add_subtitles_to_video(request: Request, video_file: UploadFile = File(...), render_engine: str = Form("moviepy"),
+                                 whisper_model: Optional[str] = Form(None)):
     """
     Accepte une vidéo, extrait l'audio, le transcrit, et incruste les sous-titres.
     """
+    check_whisper_model(whisper_model)
     temp_video_path = ""
     try:
+        get_limiter("render").check_admission()
         # Sauvegarder la vidéo uploadée temporairement
-        os.makedirs(TEMP_DIR, exist_ok=True)
-        temp_video_path = os.path.join(TEMP_DIR, video_file.filename)
-        with open(temp_video_path, "wb") as buffer:
-            shutil.copyfileobj(video_file.file, buffer)
-        
-        print(f"LOG: Vidéo uploadée sauvegardée temporairement à {temp_video_path}")
+        temp_video_path = await run_in_threadpool(save_upload, video_file)
 
         # Lancer le processus de sous-titrage
-        final_video_path = process_video_for_subtitles(
+        final_video_path = await run_in_threadpool(
+            process_video_for_subtitles,
             video_path=temp_video_path,
-            original_filename=video_file.filename
+            original_filename=video_file.filename,
+            render_engine=render_engine,
+            whisper_model=whisper_model
         )
 
         # Construire l'URL de la vidéo finale
-        base_url = str(request.base_url)
-        video_url = f"{base_url}videos/{os.path.basename(final_video_path)}"
+        video_url = build_video_url(request, final_video_path)
         print(f"LOG: URL de la vidéo avec sous-titres : {video_url}")
 
         return VideoResponse(video_url=video_url)
 
+    except ResourceBusyError as e:
+        raise busy_exception(e)
     except Exception as e:
         print(f"LOG: Erreur critique lors de l'ajout de sous-titres: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        # Nettoyer la vidéo temporaire uploadée
-        if temp_video_path and os.path.exists(temp_video_path):
-            try:
-                os.remove(temp_video_path)
-                print(f"LOG: Vidéo temporaire uploadée supprimée : {temp_video_path}")
-            except Exception as e:
-                print(f"LOG: Erreur lors de la suppression de la vidéo temporaire {temp_video_path}: {e}")
\ No newline at end of file
+        remove_upload(temp_video_path)
+
+def job_submit_response(http_request: Request, job) -> JobSubmitResponse:
+    status_url = str(http_request.url_for("get_job", job_id=job.id))
+    return JobSubmitResponse(job_id=job.id, status=job.status, status_url=status_url, events_url=f"{status_url}/events")
+
+@router.post("/jobs/generate-video", response_model=JobSubmitResponse, status_code=202)
+async def submit_generate_video_job(request: VideoRequest, http_request: Request):
+    """
+    Lance la génération en arrière-plan et retourne immédiatement l'identifiant du job.
+    """
+    try:
+        admit_generation(request)
+        job = job_manager.submit(
+            "generate-video",
+            lambda progress_callback: generate_for_request(request, progress_callback)[0]
+        )
+    except ResourceBusyError as e:
+        raise busy_exception(e)
+    print(f"LOG: Job de génération {job.id} créé.")
+    return job_submit_response(http_request, job)
+
+@router.post("/jobs/add-subtitles", response_model=JobSubmitResponse, status_code=202)
+async def submit_add_subtitles_job(request: Request, video_file: UploadFile = File(...), render_engine: str = Form("moviepy"),
+                                   whisper_model: Optional[str] = Form(None)):
+    """
+    Sauvegarde la vidéo puis lance le sous-titrage en arrière-plan.
+    """
+    check_whisper_model(whisper_model)
+    try:
+        get_limiter("render").check_admission()
+    except ResourceBusyError as e:
+        raise busy_exception(e)
+
+    temp_video_path = await run_in_threadpool(save_upload, video_file, True)
+
+    def run(progress_callback):
+        try:
+            return process_video_for_subtitles(
+                video_path=temp_video_path,
+                original_filename=video_file.filename,
+                render_engine=render_engine,
+                progress_callback=progress_callback,
+                whisper_model=whisper_model
+            )
+        finally:
+            remove_upload(temp_video_path)
+
+    try:
+        job = job_manager.submit("add-subtitles", run)
+    except ResourceBusyError as e:
+        remove_upload(temp_video_path)
+        raise busy_exception(e)
+    print(f"LOG: Job de sous-titrage {job.id} créé.")
+    return job_submit_response(request, job)
+
+@router.post("/generate-batch", response_model=JobSubmitResponse, status_code=202)
+async def submit_generate_batch_job(request: BatchRequest, http_request: Request):
+    """
+    Lance la génération d'un lot de vidéos en un seul job ; le manifeste des résultats
+    est disponible sur GET /jobs/{job_id} une fois le lot terminé.
+    """
+    try:
+        job = job_manager.submit("generate-batch", make_tiktok_batch, items=[item.model_dump() for item in request.items])
+    except ResourceBusyError as e:
+        raise busy_exception(e)
+    print(f"LOG: Job de lot {job.id} créé ({len(request.items)} vidéos).")
+    return job_submit_response(http_request, job)
+
+@router.delete("/result-cache/{cache_key}")
+async def invalidate_cached_result(cache_key: str):
+    """
+    Oublie la vidéo associée à une clé du cache de résultats.
+    """
+    if not is_valid_cache_key(cache_key):
+        raise HTTPException(status_code=400, detail="Clé de cache invalide.")
+    removed = invalidate_result(cache_key)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Entrée de cache introuvable.")
+    return {"removed": removed}
+
+@router.delete("/result-cache")
+async def clear_result_cache():
+    """
+    Vide entièrement le cache de résultats (les vidéos restent dans le dossier de sortie).
+    """
+    return {"removed": invalidate_result()}
+
+def build_manifest(http_request: Request, result: Dict[str, Any]) -> Dict[str, Any]:
+    manifest = dict(result)
+    manifest["items"] = [
+        dict(entry, video_url=build_video_url(http_request, entry["video_path"]) if entry.get("video_path") else None)
+        for entry in result["items"]
+    ]
+    return manifest
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse, name="get_job")
+async def get_job(job_id: str, http_request: Request):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job introuvable.")
+    status = job.to_dict()
+    result = status.pop("result")
+    if isinstance(result, dict):
+        status["manifest"] = build_manifest(http_request, result)
+    elif result:
+        status["video_url"] = build_video_url(http_request, result)
+    return JobStatusResponse(**status)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, http_request: Request):
+    """
+    Flux Server-Sent Events des changements d'état, d'étape et de progression du rendu d'un job.
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job introuvable.")
+
+    async def event_stream():
+        index = 0
+        finished = False
+        while not finished:
+            for event in job_manager.events_since(job, index):
+                index += 1
+                # S'arrêter seulement après avoir envoyé l'événement final (avec video_url ou error)
+                finished = finished or (event["type"] == "status" and event["status"] in (JOB_SUCCEEDED, JOB_FAILED))
+                if isinstance(event.get("result"), dict):
+                    event = dict(event, result=build_manifest(http_request, event["result"]))
+                elif event.get("result"):
+                    event = dict(event, video_url=build_video_url(http_request, event["result"]))
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if finished or await http_request.is_disconnected():
+                break
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
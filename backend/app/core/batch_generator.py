@@ -0,0 +1,203 @@
+# app/core/batch_generator.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List
+from app.core.configs import OUTPUT_DIR
+from app.core.config_loader import BATCH_PREPARE_WORKERS
+from app.core.pipeline import StagePipeline
+from app.core.checkpoints import open_checkpoint
+from app.core.result_cache import claim_result, finish_result, request_cache_key, store_result
+from app.core.tiktok_generator import new_base_name, add_asset_stages, render_tiktok_video, cleanup_temp_files, check_render_engine
+from app.utils.video_search_utils import search_pexels_video
+
+class SharedSearch:
+    """
+    Recherche Pexels mémorisée pour un lot : une requête identique n'est envoyée qu'une seule fois,
+    même si plusieurs éléments la demandent en même temps. Une erreur de la recherche est transmise
+    à tous les éléments qui l'attendaient.
+    """
+    def __init__(self, search_func: Callable[..., Any] = search_pexels_video):
+        self.search_func = search_func
+        self._results: Dict[str, Any] = {}
+        self._errors: Dict[str, Exception] = {}
+        self._events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, query: str, target_duration: float = None):
+        key = " ".join(query.lower().split())
+        with self._lock:
+            event = self._events.get(key)
+            owner = event is None
+            if owner:
+                event = self._events[key] = threading.Event()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            event.wait()
+            if key in self._errors:
+                raise self._errors[key]
+            return self._results.get(key)
+
+        try:
+            self._results[key] = self.search_func(query=query, target_duration=target_duration)
+            return self._results[key]
+        except Exception as e:
+            self._errors[key] = e
+            raise
+        finally:
+            event.set()
+
+def make_tiktok_batch(items: List[Dict[str, Any]], progress_callback=None) -> Dict[str, Any]:
+    """
+    Génère une vidéo par élément du lot et retourne un manifeste des résultats.
+
+    Les étapes réseau (script, recherche et téléchargement du fond, TTS, STT) des éléments suivants
+    sont préparées en avance dans un pool de threads pendant que l'élément précédent est monté.
+    L'avance est bornée à BATCH_PREPARE_WORKERS éléments : un fond préparé trop tôt pourrait être
+    évincé du cache par les téléchargements suivants avant son montage.
+    Les éléments identiques (même clé canonique que le cache de résultats) ne sont générés qu'une fois
+    et pointent tous vers la même vidéo ; avec `use_cache`, le cache de résultats est consulté avant
+    toute étape et alimenté après le montage. Les recherches de fond identiques sont partagées dans le
+    lot ; les téléchargements, polices et sprites le sont déjà via les caches du worker.
+    """
+    started = time.time()
+    search = SharedSearch()
+    manifest: List[Dict[str, Any]] = [
+        {"index": index, "prompt": item.get("prompt"), "status": "pending", "video_path": None, "error": None,
+         "cached": False}
+        for index, item in enumerate(items)
+    ]
+    # Une seule génération par groupe d'éléments identiques, dans l'ordre de leur première apparition
+    groups: Dict[str, List[int]] = {}
+    for index, item in enumerate(items):
+        groups.setdefault(request_cache_key(item), []).append(index)
+    units = list(groups.items())
+
+    def report(stage, status, fraction=None):
+        if progress_callback:
+            progress_callback(stage, status, fraction)
+
+    def prepare(key: str, indices: List[int]) -> Dict[str, Any]:
+        item = items[indices[0]]
+        check_render_engine(item.get("render_engine", "moviepy"))
+        claim = None
+        if any(items[index].get("use_cache") for index in indices):
+            state, value = claim_result(key)
+            if state == "cached":
+                return {"video_path": value, "cached": True}
+            if state == "shared":
+                # La même demande est en cours de génération ailleurs : attendre son résultat
+                return {"video_path": value.result(), "cached": True}
+            claim = value
+
+        temp_files = []
+        checkpoint = None
+        try:
+            base_name = new_base_name()
+            audio_path = os.path.join(OUTPUT_DIR, f"{base_name}.mp3")
+            checkpoint = open_checkpoint(item)
+            pipeline = StagePipeline(name=f"{base_name}_batch{indices[0]}")
+            add_asset_stages(pipeline, item["prompt"], item.get("category", "astuce"), item.get("lang", "fr"),
+                             item.get("tone", "percutant"), audio_path, temp_files, search_func=search, checkpoint=checkpoint)
+            results = pipeline.run()
+        except Exception as e:
+            cleanup_temp_files(temp_files)
+            if checkpoint:
+                checkpoint.release()
+            if claim:
+                finish_result(key, claim, error=e)
+            raise
+        return {
+            "base_name": base_name,
+            "background": results["background"],
+            "audio_path": results["audio"]["path"],
+            "timings": results["timings"],
+            "temp_files": temp_files,
+            "checkpoint": checkpoint,
+            "claim": claim,
+            "stage_timings": pipeline.timings
+        }
+
+    print(f"LOG: Génération d'un lot de {len(items)} vidéos ({len(units)} distinctes)...")
+    report("batch", "started", 0.0)
+    done = 0
+    next_unit = 0
+    with ThreadPoolExecutor(max_workers=BATCH_PREPARE_WORKERS, thread_name_prefix="batch") as executor:
+        futures = {}
+
+        def submit_next():
+            nonlocal next_unit
+            if next_unit < len(units):
+                futures[executor.submit(prepare, *units[next_unit])] = units[next_unit]
+                next_unit += 1
+
+        for _ in range(min(BATCH_PREPARE_WORKERS, len(units))):
+            submit_next()
+
+        # Le montage se fait au fil de l'eau, pendant que les éléments suivants sont préparés
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            future = next(iter(finished))
+            key, indices = futures.pop(future)
+            # Un élément entre en montage : lancer la préparation du suivant
+            submit_next()
+            item = items[indices[0]]
+            assets = None
+            try:
+                assets = future.result()
+                if assets.get("cached"):
+                    outcome = dict(status="succeeded", video_path=assets["video_path"], cached=True)
+                else:
+                    out_video = os.path.join(OUTPUT_DIR, f"{assets['base_name']}.mp4")
+                    for index in indices:
+                        report(f"item_{index}", "started")
+                    render_tiktok_video(assets["background"], assets["audio_path"], assets["timings"], out_video,
+                                        item.get("render_engine", "moviepy"))
+                    if assets["checkpoint"]:
+                        assets["checkpoint"].discard()
+                    if assets["claim"]:
+                        store_result(key, out_video, item)
+                        finish_result(key, assets.pop("claim"), video_path=out_video)
+                    outcome = dict(status="succeeded", video_path=out_video,
+                                   stage_timings={name: round(t.get("duration", 0.0), 3) for name, t in assets["stage_timings"].items()})
+                for index in indices:
+                    manifest[index].update(outcome)
+                    report(f"item_{index}", "completed")
+            except Exception as e:
+                print(f"LOG: Échec de l'élément {indices[0]} du lot : {e}")
+                if assets and not assets.get("cached"):
+                    cleanup_temp_files(assets["temp_files"])
+                    if assets.get("claim"):
+                        finish_result(key, assets["claim"], error=e)
+                for index in indices:
+                    manifest[index].update(status="failed", error=str(e))
+                    report(f"item_{index}", "failed")
+            finally:
+                if assets and assets.get("checkpoint"):
+                    assets["checkpoint"].release()
+            for index in indices[1:]:
+                manifest[index]["duplicate_of"] = indices[0]
+            done += len(indices)
+            report("batch", "running", done / len(items))
+
+    elapsed = time.time() - started
+    succeeded = sum(1 for entry in manifest if entry["status"] == "succeeded")
+    print(f"LOG: Lot terminé : {succeeded}/{len(items)} vidéos en {elapsed:.1f}s "
+          f"({len(items) - len(units)} doublons, {search.misses} recherches Pexels, {search.hits} partagées).")
+    report("batch", "completed", 1.0)
+    return {
+        "items": manifest,
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "elapsed_seconds": round(elapsed, 1),
+        "videos_per_hour": round(succeeded * 3600 / elapsed, 1) if elapsed else 0.0,
+        "shared_searches": search.hits,
+        "deduplicated": len(items) - len(units),
+        "cached": sum(1 for entry in manifest if entry["cached"])
+    }
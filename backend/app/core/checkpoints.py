@@ -0,0 +1,181 @@
+# app/core/checkpoints.py
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.core.configs import CHECKPOINT_DIR
+from app.core.config_loader import CHECKPOINTS_ENABLED, CHECKPOINT_TTL_SECONDS
+from app.core.result_cache import request_cache_key
+
+class StageCheckpoint:
+    """
+    Résultats des étapes déjà terminées d'une génération, conservés sur disque
+    pour qu'une nouvelle tentative de la même demande reprenne après la dernière étape réussie.
+    Les valeurs sont stockées en JSON, sauf les fichiers (audio) dont les octets sont copiés.
+    Un checkpoint est réservé à une seule génération à la fois (fichier verrou créé avec O_EXCL),
+    à libérer avec `release()`.
+    """
+    def __init__(self, key: str):
+        self.key = key
+        self.directory = os.path.join(CHECKPOINT_DIR, key)
+        self.lock_path = os.path.join(CHECKPOINT_DIR, f"{key}.lock")
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path = os.path.join(self.directory, "meta.json")
+        if not os.path.exists(meta_path):
+            self._write(meta_path, {"created_at": time.time()})
+
+    def _write(self, path: str, value: Any):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _stage_path(self, stage: str, suffix: str = ".json") -> str:
+        return os.path.join(self.directory, f"{stage}{suffix}")
+
+    def load(self, stage: str) -> Tuple[bool, Any]:
+        try:
+            with open(self._stage_path(stage), 'r', encoding='utf-8') as f:
+                return True, json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False, None
+
+    def save(self, stage: str, value: Any):
+        try:
+            self._write(self._stage_path(stage), value)
+        except Exception as e:
+            # Un checkpoint manquant coûte seulement une reprise moins complète
+            print(f"LOG: Impossible d'enregistrer le checkpoint de l'étape '{stage}' : {e}")
+
+    def restore_file(self, stage: str, path: str) -> bool:
+        source = self._stage_path(stage, ".bin")
+        if not os.path.exists(source):
+            return False
+        shutil.copyfile(source, path)
+        return True
+
+    def save_file(self, stage: str, path: str):
+        target = self._stage_path(stage, ".bin")
+        try:
+            tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        except Exception as e:
+            print(f"LOG: Impossible d'enregistrer le checkpoint de l'étape '{stage}' : {e}")
+
+    def invalidate(self, *stages: str):
+        for stage in stages:
+            for suffix in (".json", ".bin"):
+                try:
+                    os.remove(self._stage_path(stage, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def release(self):
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+def checkpointed(checkpoint: Optional[StageCheckpoint], stage: str, func: Callable[..., Any],
+                 is_valid: Callable[[Any], bool] = None, invalidates: Tuple[str, ...] = ()) -> Callable[..., Any]:
+    """
+    Enveloppe une fonction d'étape du pipeline : le résultat enregistré est réutilisé s'il existe
+    (et reste valide), sinon l'étape s'exécute et son résultat est enregistré.
+    Quand l'étape est réellement exécutée, les checkpoints des étapes `invalidates` qui en dérivent sont supprimés.
+    """
+    if checkpoint is None:
+        return func
+
+    def run(**dependencies):
+        found, value = checkpoint.load(stage)
+        if found and (is_valid is None or is_valid(value)):
+            print(f"LOG: Étape '{stage}' reprise depuis le checkpoint {checkpoint.key[:12]}.")
+            return value
+        checkpoint.invalidate(*invalidates)
+        value = func(**dependencies)
+        checkpoint.save(stage, value)
+        return value
+    return run
+
+def _acquire_lock(lock_path: str) -> bool:
+    """
+    Crée le fichier verrou d'un checkpoint. Un verrou plus vieux que CHECKPOINT_TTL_SECONDS
+    (processus arrêté brutalement) est considéré comme abandonné et repris.
+    """
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) <= CHECKPOINT_TTL_SECONDS:
+                    return False
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    return False
+
+# Le parcours du dossier n'a lieu qu'au plus une fois par intervalle
+PURGE_INTERVAL_SECONDS = min(CHECKPOINT_TTL_SECONDS, 600)
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+def purge_expired_checkpoints(now: float = None) -> int:
+    """
+    Supprime les checkpoints plus vieux que CHECKPOINT_TTL_SECONDS (demandes jamais relancées).
+    Les checkpoints réservés par une génération en cours sont conservés.
+    """
+    now = now or time.time()
+    removed = 0
+    for key in os.listdir(CHECKPOINT_DIR):
+        directory = os.path.join(CHECKPOINT_DIR, key)
+        if not os.path.isdir(directory) or os.path.exists(f"{directory}.lock"):
+            continue
+        try:
+            with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+                created_at = json.load(f).get("created_at", 0)
+        except (OSError, json.JSONDecodeError):
+            created_at = os.path.getmtime(directory) if os.path.exists(directory) else now
+        if now - created_at > CHECKPOINT_TTL_SECONDS:
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+    if removed:
+        print(f"LOG: {removed} checkpoint(s) expiré(s) supprimé(s).")
+    return removed
+
+def open_checkpoint(request_fields: Dict[str, Any]) -> Optional[StageCheckpoint]:
+    """
+    Checkpoint associé à une demande (même clé que le cache de résultats, hors moteur de rendu),
+    ou None si les checkpoints sont désactivés.
+    Si une génération identique utilise déjà ce checkpoint, retourne None : la demande s'exécute sans reprise
+    plutôt que de partager (et corrompre) les fichiers de l'autre.
+    """
+    global _last_purge
+    if not CHECKPOINTS_ENABLED:
+        return None
+    with _purge_lock:
+        purge_due = time.time() - _last_purge >= PURGE_INTERVAL_SECONDS
+        if purge_due:
+            _last_purge = time.time()
+    if purge_due:
+        purge_expired_checkpoints()
+
+    key = request_cache_key(dict(request_fields, render_engine=None))
+    if not _acquire_lock(os.path.join(CHECKPOINT_DIR, f"{key}.lock")):
+        print(f"LOG: Checkpoint {key[:12]} déjà utilisé par une génération identique, pas de reprise pour celle-ci.")
+        return None
+    return StageCheckpoint(key)
+
+def checkpoint_stats() -> Dict[str, Any]:
+    return {
+        "enabled": CHECKPOINTS_ENABLED,
+        "pending": sum(1 for name in os.listdir(CHECKPOINT_DIR) if os.path.isdir(os.path.join(CHECKPOINT_DIR, name))),
+        "ttl_seconds": CHECKPOINT_TTL_SECONDS
+    }
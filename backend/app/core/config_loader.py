@@ -16,6 +16,17 @@ try:
 except ImportError:
     print("LOG: Avertissement - python-dotenv n'est pas installé. Les variables d'environnement ne seront pas chargées depuis .env")
 
+def parse_limits(value: str) -> dict:
+    """
+    Convertit une liste "nom=valeur,nom=valeur" en dictionnaire {nom: entier}.
+    """
+    limits = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, number = item.split('=', 1)
+            limits[name.strip()] = int(number)
+    return limits
+
 # Charger les clés API depuis les variables d'environnement
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
 ELEVENLABS_API_KEY = os.environ.get("ELEVENLABS_API_KEY", "")
@@ -26,6 +37,80 @@ PEXELS_API_KEY = os.environ.get("PEXELS_API_KEY", "")
 CARTESIA_ACCESS_TOKEN = os.environ.get("CARTESIA_ACCESS_TOKEN", "")
 CARTESIA_VOICE_ID = os.environ.get("CARTESIA_VOICE_ID", "")
 
+# Configuration Deepgram (le SDK lit aussi DEEPGRAM_API_KEY)
+DEEPGRAM_API_KEY = os.environ.get("DEEPGRAM_API_KEY", "")
+DEEPGRAM_API_URL = os.environ.get("DEEPGRAM_API_URL", "https://api.deepgram.com/v1/listen")
+
+# Paramètres de performance du rendu
+SUBTITLE_SPRITE_CACHE_SIZE = int(os.environ.get("SUBTITLE_SPRITE_CACHE_SIZE", "2048"))  # Nombre de sprites de mots gardés en mémoire
+RENDER_MAX_WORKERS = int(os.environ.get("RENDER_MAX_WORKERS", "0"))  # Processus max pour le rendu parallèle (0 = nombre de cœurs)
+PARALLEL_MIN_SEGMENT_SECONDS = float(os.environ.get("PARALLEL_MIN_SEGMENT_SECONDS", "8"))  # Durée minimale d'un segment parallèle
+
+# Jobs asynchrones
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))  # Nombre de jobs exécutés en parallèle par le worker
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", "3600"))  # Durée de conservation des jobs terminés
+BATCH_PREPARE_WORKERS = int(os.environ.get("BATCH_PREPARE_WORKERS", "3"))  # Éléments d'un lot préparés en parallèle pendant le montage
+JOB_MAX_QUEUE = int(os.environ.get("JOB_MAX_QUEUE", "20"))  # Jobs en attente au-delà desquels les nouvelles demandes sont rejetées (503)
+
+# Limites de concurrence par ressource (fournisseurs externes et rendu) et taille de leurs files d'attente
+RESOURCE_LIMITS = parse_limits(os.environ.get(
+    "RESOURCE_LIMITS", "openai=4,pexels=4,elevenlabs=2,cartesia=2,deepgram=4,gtts=2,whisper=1,render=2,default=4"))
+RESOURCE_QUEUE_LIMITS = parse_limits(os.environ.get(
+    "RESOURCE_QUEUE_LIMITS", "render=8,default=16"))
+RESOURCE_QUEUE_TIMEOUT = float(os.environ.get("RESOURCE_QUEUE_TIMEOUT", "600"))  # Attente maximale dans une file, en secondes
+
+# Cache des vidéos générées (opt-in par requête avec use_cache)
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 7 jours par défaut
+
+# Checkpoints des étapes d'une génération (reprise après un échec du montage)
+CHECKPOINTS_ENABLED = os.environ.get("CHECKPOINTS_ENABLED", "true").lower() in ("1", "true", "yes")
+CHECKPOINT_TTL_SECONDS = float(os.environ.get("CHECKPOINT_TTL_SECONDS", str(24 * 3600)))  # 24 h par défaut
+
+# Routage TTS : disjoncteurs par fournisseur et requêtes de couverture
+TTS_HEDGING_ENABLED = os.environ.get("TTS_HEDGING_ENABLED", "true").lower() in ("1", "true", "yes")
+TTS_HEDGE_DEFAULT_DELAY = float(os.environ.get("TTS_HEDGE_DEFAULT_DELAY", "20"))  # Délai de couverture tant que le p95 est inconnu
+TTS_HEDGE_MIN_SAMPLES = int(os.environ.get("TTS_HEDGE_MIN_SAMPLES", "5"))  # Appels réussis nécessaires pour estimer le p95
+TTS_BREAKER_WINDOW = int(os.environ.get("TTS_BREAKER_WINDOW", "20"))  # Nombre d'appels récents suivis par fournisseur
+TTS_BREAKER_MIN_CALLS = int(os.environ.get("TTS_BREAKER_MIN_CALLS", "5"))
+TTS_BREAKER_ERROR_RATE = float(os.environ.get("TTS_BREAKER_ERROR_RATE", "0.5"))  # Proportion d'échecs qui ouvre le disjoncteur
+TTS_BREAKER_COOLDOWN = float(os.environ.get("TTS_BREAKER_COOLDOWN", "60"))  # Secondes avant un appel d'essai
+TTS_BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("TTS_BREAKER_SLOW_CALL_SECONDS", "45"))  # Un appel plus lent compte comme un échec
+
+# Alignement local du script sur l'audio TTS quand le service ne fournit pas de timings
+FORCED_ALIGNMENT_ENABLED = os.environ.get("FORCED_ALIGNMENT_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Modèles Whisper (transcription locale)
+WHISPER_DEFAULT_MODEL = os.environ.get("WHISPER_DEFAULT_MODEL", "base")
+WHISPER_PRELOAD = os.environ.get("WHISPER_PRELOAD", "false").lower() in ("1", "true", "yes")  # Charger et préchauffer le modèle au démarrage
+WHISPER_MEMORY_LIMIT_MB = float(os.environ.get("WHISPER_MEMORY_LIMIT_MB", "2048"))  # Au-delà, les modèles inutilisés sont déchargés
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "openai-whisper")  # 'openai-whisper' ou 'faster-whisper' (int8 sur CPU, paquet optionnel)
+WHISPER_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "int8")  # Quantification de faster-whisper
+WHISPER_BEAM_SIZE = int(os.environ.get("WHISPER_BEAM_SIZE", "0")) or None  # Largeur du beam search (0 = valeur par défaut du moteur)
+WHISPER_THREADS = int(os.environ.get("WHISPER_THREADS", "0"))  # Threads CPU de l'inférence (0 = valeur par défaut du moteur)
+
+# Format de l'audio extrait pour la transcription : 'wav' (PCM 16 kHz mono) ou 'opus'
+STT_AUDIO_FORMAT = os.environ.get("STT_AUDIO_FORMAT", "wav")
+# Envoyer l'audio à Deepgram au fil de l'extraction plutôt qu'après
+STT_STREAMING = os.environ.get("STT_STREAMING", "false").lower() in ("1", "true", "yes")
+# Réutiliser la transcription d'un audio identique déjà sous-titré
+TRANSCRIPT_CACHE_ENABLED = os.environ.get("TRANSCRIPT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRANSCRIPT_CACHE_TTL_SECONDS = float(os.environ.get("TRANSCRIPT_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))  # 30 jours par défaut
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.environ.get("TRANSCRIPT_CACHE_MAX_ENTRIES", "5000"))  # Les plus anciennes sont supprimées au-delà
+
+# Transcription par morceaux des longues vidéos uploadées
+STT_LONG_MEDIA_SECONDS = float(os.environ.get("STT_LONG_MEDIA_SECONDS", "300"))  # Durée à partir de laquelle l'audio est découpé
+STT_CHUNK_SECONDS = float(os.environ.get("STT_CHUNK_SECONDS", "120"))  # Durée visée d'un morceau
+STT_CHUNK_MAX_SECONDS = float(os.environ.get("STT_CHUNK_MAX_SECONDS", "180"))  # Au-delà sans silence, la coupure est forcée
+STT_CHUNK_WORKERS = int(os.environ.get("STT_CHUNK_WORKERS", "4"))  # Requêtes Deepgram simultanées
+STT_WHISPER_PROCESSES = int(os.environ.get("STT_WHISPER_PROCESSES", "2"))  # Processus Whisper (chacun charge son modèle)
+
+# Cache disque des vidéos de fond Pexels
+BACKGROUND_CACHE_ENABLED = os.environ.get("BACKGROUND_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+BACKGROUND_CACHE_MAX_BYTES = int(os.environ.get("BACKGROUND_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))  # 5 Go par défaut
+BACKGROUND_MEZZANINE_ENABLED = os.environ.get("BACKGROUND_MEZZANINE_ENABLED", "true").lower() in ("1", "true", "yes")  # Transcoder les fonds au format de sortie à l'ingestion
+BACKGROUND_PROGRESSIVE_FETCH = os.environ.get("BACKGROUND_PROGRESSIVE_FETCH", "true").lower() in ("1", "true", "yes")  # Transcoder pendant le téléchargement quand le MP4 le permet
+BACKGROUND_CACHE_LOCK_TIMEOUT = float(os.environ.get("BACKGROUND_CACHE_LOCK_TIMEOUT", "120"))  # Secondes sans progression avant de reprendre un téléchargement
+
 # Vérifier que les clés sont présentes
 if not OPENAI_API_KEY:
     print("ATTENTION: Clé API OpenAI non configurée")
@@ -4,8 +4,17 @@ import os
 BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 OUTPUT_DIR = os.path.join(BACKEND_DIR, "output")
 TEMP_DIR = os.path.join(BACKEND_DIR, "temp")
+CACHE_DIR = os.path.join(BACKEND_DIR, "cache")
+BACKGROUND_CACHE_DIR = os.path.join(CACHE_DIR, "backgrounds")
+RESULT_CACHE_DIR = os.path.join(CACHE_DIR, "results")
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "checkpoints")
+TRANSCRIPT_CACHE_DIR = os.path.join(CACHE_DIR, "transcripts")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(TEMP_DIR, exist_ok=True)
+os.makedirs(BACKGROUND_CACHE_DIR, exist_ok=True)
+os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
 
 # Paramètres vidéo
 WIDTH, HEIGHT = 1080, 1920  # Format TikTok
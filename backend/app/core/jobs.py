@@ -0,0 +1,184 @@
+# app/core/jobs.py
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config_loader import JOB_WORKERS, JOB_RETENTION_SECONDS, JOB_MAX_QUEUE
+from app.core.resources import ResourceBusyError
+
+# États possibles d'un job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+class Job:
+    """
+    Un traitement long (génération ou sous-titrage) exécuté hors de la boucle d'événements,
+    avec son état, sa progression par étape et la liste des événements émis.
+    """
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JOB_QUEUED
+        self.stage = None
+        self.progress = 0.0
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 4),
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class JobManager:
+    """
+    Exécute les jobs dans un pool de threads et conserve leur état pour le polling et les flux SSE.
+    """
+    def __init__(self, max_workers: int = JOB_WORKERS, retention_seconds: float = JOB_RETENTION_SECONDS,
+                 max_queue: int = JOB_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _emit(self, job: Job, event: Dict[str, Any]):
+        with self._lock:
+            self._append_event(job, event)
+
+    def _append_event(self, job: Job, event: Dict[str, Any]):
+        """
+        Ajoute un événement au job. Doit être appelée avec self._lock (index unique même entre étapes parallèles).
+        """
+        job.events.append(dict(event, job_id=job.id, time=time.time(), index=len(job.events)))
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: str = None):
+        """
+        Passe le job dans son état final et émet l'événement correspondant en une seule opération,
+        pour qu'un flux SSE ne voie jamais le job terminé sans son événement final.
+        """
+        with self._lock:
+            job.result = result
+            job.error = error
+            if status == JOB_SUCCEEDED:
+                job.progress = 1.0
+            job.finished_at = time.time()
+            job.status = status
+            self._append_event(job, {"type": "status", "status": status, "result": result, "error": error})
+
+    def report(self, job: Job, stage: str, status: str, fraction: float = None):
+        """
+        Met à jour la progression d'une étape du job (started, running, completed, failed).
+        """
+        with self._lock:
+            info = job.stages.setdefault(stage, {"status": status})
+            info["status"] = status
+            if status == "started":
+                info["started_at"] = time.time()
+            elif status in ("completed", "failed"):
+                info["finished_at"] = time.time()
+            if fraction is not None:
+                info["progress"] = round(fraction, 4)
+            job.stage = stage
+        self._emit(job, {"type": "stage", "stage": stage, "status": status, "progress": fraction})
+
+    def submit(self, kind: str, func: Callable[..., Any], **kwargs) -> Job:
+        """
+        Crée un job et planifie `func(progress_callback=..., **kwargs)` dans le pool.
+        Lève ResourceBusyError si trop de jobs attendent déjà un worker.
+        """
+        self.purge()
+        job = Job(kind)
+        with self._lock:
+            queued = sum(1 for other in self._jobs.values() if other.status == JOB_QUEUED)
+            if queued >= self.max_queue:
+                raise ResourceBusyError("jobs", max(1, int(self._average_duration() * (queued + 1) / self.max_workers)))
+            self._jobs[job.id] = job
+        self._emit(job, {"type": "status", "status": JOB_QUEUED})
+        self._executor.submit(self._run, job, func, kwargs)
+        return job
+
+    def _run(self, job: Job, func: Callable[..., Any], kwargs: Dict[str, Any]):
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        self._emit(job, {"type": "status", "status": JOB_RUNNING})
+
+        last_fraction = {}
+
+        def progress_callback(stage: str, status: str, fraction: float = None):
+            # Limiter les événements de progression du rendu à un par pourcent
+            if status == "running" and fraction is not None:
+                if fraction < 1.0 and fraction - last_fraction.get(stage, -1.0) < 0.01:
+                    return
+                last_fraction[stage] = fraction
+            self.report(job, stage, status, fraction)
+            if fraction is not None and stage in ("render", "batch"):
+                job.progress = fraction
+
+        try:
+            result = func(progress_callback=progress_callback, **kwargs)
+        except Exception as e:
+            print(f"LOG: Erreur dans le job {job.id} : {e}")
+            traceback.print_exc()
+            self._finish(job, JOB_FAILED, error=str(e))
+        else:
+            self._finish(job, JOB_SUCCEEDED, result=result)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def events_since(self, job: Job, index: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return job.events[index:]
+
+    def _average_duration(self) -> float:
+        durations = [job.finished_at - job.started_at for job in self._jobs.values() if job.finished and job.started_at]
+        return sum(durations) / len(durations) if durations else 60.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queued": sum(1 for job in jobs if job.status == JOB_QUEUED),
+            "running": sum(1 for job in jobs if job.status == JOB_RUNNING),
+            "succeeded": sum(1 for job in jobs if job.status == JOB_SUCCEEDED),
+            "failed": sum(1 for job in jobs if job.status == JOB_FAILED)
+        }
+
+    def purge(self):
+        """
+        Oublie les jobs terminés depuis plus longtemps que la durée de rétention.
+        """
+        limit = time.time() - self.retention_seconds
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < limit]:
+                del self._jobs[job_id]
+
+# Gestionnaire partagé par toutes les routes du worker
+job_manager = JobManager()
@@ -0,0 +1,105 @@
+# app/core/pipeline.py
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+class StagePipeline:
+    """
+    Petit graphe de dépendances entre étapes : chaque étape démarre dès que les étapes
+    dont elle dépend sont terminées, en parallèle des autres (pool de threads).
+    Chaque fonction reçoit en arguments nommés les résultats de ses dépendances.
+    Les durées de chaque étape sont enregistrées pour rendre le chemin critique visible,
+    et `on_event(étape, statut)` est appelé au début ("started") et à la fin ("completed"/"failed") de chacune.
+    """
+    def __init__(self, name: str = "pipeline", max_workers: int = 4, on_event: Callable[[str, str], None] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.on_event = on_event
+        self.stages: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, func: Callable[..., Any], depends_on: Tuple[str, ...] = ()):
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise Exception(f"Étape '{name}' : dépendance inconnue '{dependency}'.")
+        self.stages[name] = (func, tuple(depends_on))
+        return self
+
+    def _notify(self, name: str, status: str):
+        if self.on_event:
+            try:
+                self.on_event(name, status)
+            except Exception as e:
+                print(f"LOG: [{self.name}] Erreur lors du suivi de l'étape '{name}': {e}")
+
+    def _run_stage(self, name: str) -> Any:
+        func, depends_on = self.stages[name]
+        started = time.perf_counter()
+        self.timings[name] = {"start": started - self._origin}
+        print(f"LOG: [{self.name}] Début de l'étape '{name}'.")
+        self._notify(name, "started")
+        try:
+            result = func(**{dependency: self.results[dependency] for dependency in depends_on})
+            self._notify(name, "completed")
+            return result
+        except Exception:
+            self._notify(name, "failed")
+            raise
+        finally:
+            ended = time.perf_counter()
+            self.timings[name].update({"end": ended - self._origin, "duration": ended - started})
+            print(f"LOG: [{self.name}] Fin de l'étape '{name}' en {ended - started:.2f}s.")
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Exécute toutes les étapes et retourne leurs résultats. La première erreur interrompt le pipeline
+        (les étapes déjà démarrées vont jusqu'au bout avant que l'erreur ne soit relevée).
+        """
+        self._origin = time.perf_counter()
+        pending = dict(self.stages)
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        try:
+            while pending or running:
+                for name in [name for name, (_, deps) in pending.items() if all(d in self.results for d in deps)]:
+                    running[executor.submit(self._run_stage, name)] = name
+                    del pending[name]
+
+                if not running:
+                    raise Exception(f"Dépendances circulaires entre les étapes : {', '.join(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    self.results[name] = future.result()
+        finally:
+            # En cas d'erreur, aucune nouvelle étape n'est lancée, mais celles déjà en cours sont attendues :
+            # l'appelant peut alors nettoyer tous les fichiers qu'elles ont produits
+            if running:
+                print(f"LOG: [{self.name}] Attente des étapes en cours avant d'abandonner : {', '.join(running.values())}")
+            executor.shutdown(wait=True)
+
+        self.log_timings()
+        return self.results
+
+    def critical_path(self) -> List[str]:
+        """
+        Chaîne d'étapes qui a déterminé la durée totale : en partant de l'étape terminée en dernier,
+        remonter à chaque fois la dépendance terminée le plus tard.
+        """
+        finished = [name for name in self.timings if "end" in self.timings[name]]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda name: self.timings[name]["end"])]
+        while True:
+            depends_on = [d for d in self.stages[path[-1]][1] if "end" in self.timings.get(d, {})]
+            if not depends_on:
+                break
+            path.append(max(depends_on, key=lambda name: self.timings[name]["end"]))
+        return list(reversed(path))
+
+    def log_timings(self):
+        summary = ", ".join(f"{name}={t['duration']:.2f}s" for name, t in self.timings.items() if "duration" in t)
+        print(f"LOG: [{self.name}] Durées des étapes : {summary}")
+        print(f"LOG: [{self.name}] Chemin critique : {' -> '.join(self.critical_path())}")
@@ -0,0 +1,129 @@
+# app/core/resources.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+from app.core.config_loader import RESOURCE_LIMITS, RESOURCE_QUEUE_LIMITS, RESOURCE_QUEUE_TIMEOUT
+
+class ResourceBusyError(Exception):
+    """
+    Levée quand la file d'attente d'une ressource est pleine (ou l'attente trop longue).
+    `retry_after` est le délai conseillé avant de réessayer, en secondes.
+    """
+    def __init__(self, resource: str, retry_after: int):
+        super().__init__(f"La ressource '{resource}' est saturée. Réessayez dans {retry_after} secondes.")
+        self.resource = resource
+        self.retry_after = retry_after
+
+class ResourceLimiter:
+    """
+    Limite le nombre d'utilisations simultanées d'une ressource (fournisseur externe, rendu...)
+    avec une file d'attente bornée : au-delà, les demandes sont rejetées immédiatement.
+    """
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_hold = 0.0
+        self.released = 0
+
+    def retry_after(self) -> int:
+        """
+        Estimation du délai avant qu'une place se libère, d'après la durée moyenne d'utilisation.
+        """
+        average_hold = self.total_hold / self.released if self.released else 5.0
+        return max(1, int(average_hold * (self.waiting + 1) / self.max_concurrent))
+
+    def check_admission(self):
+        """
+        Rejette immédiatement si la file d'attente est déjà pleine, sans réserver de place.
+        """
+        with self._condition:
+            if self.active >= self.max_concurrent and self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise ResourceBusyError(self.name, self.retry_after())
+
+    @contextmanager
+    def acquire(self):
+        started = time.perf_counter()
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise ResourceBusyError(self.name, self.retry_after())
+                self.waiting += 1
+                try:
+                    available = self._condition.wait_for(lambda: self.active < self.max_concurrent, timeout=self.queue_timeout)
+                finally:
+                    self.waiting -= 1
+                if not available:
+                    self.timeouts += 1
+                    raise ResourceBusyError(self.name, self.retry_after())
+            self.active += 1
+            self.acquired += 1
+            waited = time.perf_counter() - started
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+        if waited > 0.1:
+            print(f"LOG: Attente de {waited:.2f}s pour la ressource '{self.name}'.")
+        held_since = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self.released += 1
+                self.total_hold += time.perf_counter() - held_since
+                self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "avg_wait_seconds": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0,
+                "max_wait_seconds": round(self.max_wait, 4)
+            }
+
+_limiters: Dict[str, ResourceLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name: str) -> ResourceLimiter:
+    """
+    Retourne le limiteur d'une ressource, créé à la demande à partir de la configuration.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = ResourceLimiter(
+                name,
+                max_concurrent=RESOURCE_LIMITS.get(name, RESOURCE_LIMITS.get("default", 4)),
+                max_queue=RESOURCE_QUEUE_LIMITS.get(name, RESOURCE_QUEUE_LIMITS.get("default", 16)),
+                queue_timeout=RESOURCE_QUEUE_TIMEOUT
+            )
+        return _limiters[name]
+
+def limit(name: str):
+    """
+    Raccourci : `with limit("elevenlabs"): ...`
+    """
+    return get_limiter(name).acquire()
+
+def resources_stats() -> Dict[str, Any]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -0,0 +1,171 @@
+# app/core/result_cache.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.core.configs import OUTPUT_DIR, RESULT_CACHE_DIR, WIDTH, HEIGHT, FPS
+from app.core.config_loader import RESULT_CACHE_TTL_SECONDS
+
+# Champs de VideoRequest qui déterminent la vidéo produite
+CACHE_KEY_FIELDS = ("prompt", "tone", "n_images", "category", "lang", "tts_service", "render_engine")
+# À incrémenter quand le rendu change de façon visible, pour ne plus servir les anciennes vidéos
+RESULT_CACHE_VERSION = 1
+
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "shared": 0, "expired": 0}
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+def request_cache_key(request_fields: Dict[str, Any]) -> str:
+    """
+    Empreinte canonique d'une demande de génération : mêmes champs (prompt normalisé) => même clé.
+    """
+    canonical = {field: request_fields.get(field) for field in CACHE_KEY_FIELDS}
+    if isinstance(canonical["prompt"], str):
+        canonical["prompt"] = " ".join(canonical["prompt"].split())
+    canonical["_render"] = {"version": RESULT_CACHE_VERSION, "size": [WIDTH, HEIGHT], "fps": FPS}
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def is_valid_cache_key(key: str) -> bool:
+    return bool(_KEY_PATTERN.match(key or ""))
+
+def _entry_path(key: str) -> str:
+    if not is_valid_cache_key(key):
+        raise ValueError(f"Clé de cache invalide : {key}")
+    return os.path.join(RESULT_CACHE_DIR, f"{key}.json")
+
+def get_cached_result(key: str) -> Optional[str]:
+    """
+    Retourne le chemin de la vidéo déjà générée pour cette clé, si elle existe et n'a pas expiré.
+    """
+    entry_path = _entry_path(key)
+    try:
+        with open(entry_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    video_path = os.path.join(OUTPUT_DIR, entry.get("video", ""))
+    if time.time() - entry.get("created_at", 0) > RESULT_CACHE_TTL_SECONDS or not os.path.isfile(video_path):
+        _count("expired")
+        invalidate_result(key)
+        return None
+    return video_path
+
+def store_result(key: str, video_path: str, request_fields: Dict[str, Any]):
+    entry = {
+        "video": os.path.basename(video_path),
+        "created_at": time.time(),
+        "request": {field: request_fields.get(field) for field in CACHE_KEY_FIELDS}
+    }
+    # Nom unique : deux workers qui terminent la même clé n'écrivent pas dans le même fichier
+    tmp_path = os.path.join(RESULT_CACHE_DIR, f".{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, _entry_path(key))
+
+def invalidate_result(key: str = None) -> int:
+    """
+    Supprime une entrée du cache (ou toutes si `key` est None) et retourne le nombre d'entrées supprimées.
+    Les vidéos elles-mêmes restent dans OUTPUT_DIR.
+    """
+    names = [f"{key}.json"] if key else [name for name in os.listdir(RESULT_CACHE_DIR) if name.endswith('.json')]
+    removed = 0
+    for name in names:
+        try:
+            os.remove(os.path.join(RESULT_CACHE_DIR, name))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+def is_cached(request_fields: Dict[str, Any]) -> bool:
+    """
+    Vrai si une vidéo valide existe déjà en cache pour cette demande.
+    """
+    return get_cached_result(request_cache_key(request_fields)) is not None
+
+def claim_result(key: str) -> Tuple[str, Any]:
+    """
+    Réserve la génération d'une clé. Retourne :
+    - ("cached", chemin) si la vidéo est déjà en cache ;
+    - ("shared", Future) si une génération identique est en cours (son résultat arrivera dans le Future) ;
+    - ("owner", Future) sinon : l'appelant génère la vidéo puis appelle `finish_result`.
+    """
+    cached = get_cached_result(key)
+    if not cached:
+        with _inflight_lock:
+            future = _inflight.get(key)
+            owner = future is None
+            if owner:
+                # Le propriétaire précédent enregistre son résultat avant de quitter _inflight :
+                # relire le cache sous le verrou évite de relancer une génération qui vient de se terminer
+                cached = get_cached_result(key)
+                if not cached:
+                    future = _inflight[key] = Future()
+
+    if cached:
+        _count("hits")
+        print(f"LOG: Vidéo servie depuis le cache de résultats ({key[:12]}).")
+        return "cached", cached
+    if not owner:
+        _count("shared")
+        print(f"LOG: Génération identique déjà en cours ({key[:12]}), attente de son résultat...")
+        return "shared", future
+    _count("misses")
+    return "owner", future
+
+def finish_result(key: str, future: Future, video_path: str = None, error: Exception = None):
+    """
+    Termine une génération réservée par `claim_result` (après `store_result` en cas de succès)
+    et transmet le résultat ou l'erreur aux demandes identiques qui l'attendent.
+    """
+    try:
+        if error is None:
+            future.set_result(video_path)
+        else:
+            future.set_exception(error)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def get_or_generate(request_fields: Dict[str, Any], generate: Callable[[], str]) -> Tuple[str, str, bool]:
+    """
+    Retourne (chemin de la vidéo, clé, servi depuis le cache). Une demande identique à une génération
+    en cours attend et partage son résultat au lieu d'en lancer une seconde.
+    """
+    key = request_cache_key(request_fields)
+    state, value = claim_result(key)
+    if state == "cached":
+        return value, key, True
+    if state == "shared":
+        return value.result(), key, True
+
+    try:
+        video_path = generate()
+        store_result(key, video_path, request_fields)
+    except Exception as e:
+        finish_result(key, value, error=e)
+        raise
+    finish_result(key, value, video_path=video_path)
+    return video_path, key, False
+
+def result_cache_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    with _inflight_lock:
+        stats["in_flight"] = len(_inflight)
+    stats["ttl_seconds"] = RESULT_CACHE_TTL_SECONDS
+    return stats
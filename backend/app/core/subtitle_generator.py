@@ -2,57 +2,142 @@
 import os
 import time
 import uuid
-from moviepy.editor import VideoFileClip
 
 from app.core.configs import OUTPUT_DIR, TEMP_DIR
-from app.utils.deepgram_utils import transcribe_audio_with_deepgram
+from app.core.config_loader import STT_AUDIO_FORMAT, STT_STREAMING, TRANSCRIPT_CACHE_ENABLED
+from app.core.transcript_cache import AudioHasher, get_cached_transcript, store_transcript
+from app.core.resources import ResourceBusyError, limit
+from app.utils.deepgram_utils import transcribe_audio_with_deepgram, transcribe_stream_with_deepgram
 from app.utils.whisper_utils import transcribe_audio_with_whisper
-from app.utils.video_utils import make_video_from_assets
+from app.utils.chunked_transcription import is_long_media, transcribe_in_chunks
+from app.utils.video_utils import make_video_from_assets, RENDER_ENGINES
+from app.utils.ass_utils import burn_subtitles_with_ass
+from app.utils.ffmpeg_utils import extract_audio_for_stt, probe_media, stream_audio_pcm, tee_pcm_to_wav
 
-def process_video_for_subtitles(video_path: str, original_filename: str) -> str:
+# En plus des moteurs de make_video_from_assets, le mode "ass" incruste les sous-titres en une passe ffmpeg
+SUBTITLE_RENDER_ENGINES = RENDER_ENGINES + ("ass",)
+
+def process_video_for_subtitles(video_path: str, original_filename: str, render_engine: str = "moviepy", progress_callback=None,
+                                whisper_model: str = None) -> str:
     """
     Orchestre le processus d'ajout de sous-titres à une vidéo.
+    `progress_callback(étape, statut, fraction)` suit les étapes et la progression du rendu.
+    `whisper_model` choisit la taille du modèle Whisper utilisé si Deepgram échoue.
     """
+    def report(stage, status, fraction=None):
+        if progress_callback:
+            progress_callback(stage, status, fraction)
+
+    if render_engine not in SUBTITLE_RENDER_ENGINES:
+        raise Exception(f"Moteur de rendu inconnu : '{render_engine}'. Valeurs possibles : {', '.join(SUBTITLE_RENDER_ENGINES)}")
+
     base_name = f"subtitled_{uuid.uuid4().hex[:10]}_{os.path.splitext(original_filename)[0]}"
     temp_files = []
 
     try:
         # 1. Extraire l'audio de la vidéo
         print("LOG: Étape 1 - Extraction de l'audio...")
-        audio_path = os.path.join(TEMP_DIR, f"{base_name}.wav")
-        temp_files.append(audio_path)
-
-        with VideoFileClip(video_path) as video_clip:
-            if video_clip.audio is None:
-                raise Exception("La vidéo uploadée ne contient pas de piste audio.")
-            video_clip.audio.write_audiofile(audio_path, codec='pcm_s16le')
-        
-        # DEBUG: Vérifier la taille du fichier audio
-        if not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0:
-            raise Exception(f"Le fichier audio extrait est vide ou n'a pas été créé à {audio_path}")
-        print(f"LOG: Audio extrait avec succès. Taille: {os.path.getsize(audio_path)} bytes.")
+        report("extract_audio", "started")
+        if not probe_media(video_path).get("audio_found"):
+            raise Exception("La vidéo uploadée ne contient pas de piste audio.")
+        # Les longues vidéos sont découpées dans les silences et transcrites en parallèle
+        long_media = is_long_media(video_path)
+        # En mode flux, l'audio est envoyé à Deepgram pendant son extraction (étape 2)
+        streaming = STT_STREAMING and not long_media
+
+        audio_format = "wav" if streaming else STT_AUDIO_FORMAT
+        audio_path = os.path.join(TEMP_DIR, f"{base_name}.{'ogg' if audio_format == 'opus' else 'wav'}")
+        temp_files += [audio_path, f"{audio_path}.part"]
+
+        # Une vidéo déjà sous-titrée (même audio, quel que soit le conteneur) réutilise sa transcription.
+        # L'empreinte est calculée pendant le décodage qui sert déjà à l'extraction, jamais par un décodage à part.
+        hasher = AudioHasher() if TRANSCRIPT_CACHE_ENABLED else None
+        fingerprint = None
+        cached_transcript = None
+
+        if streaming:
+            # Pas de recherche dans le cache : elle obligerait à décoder tout l'audio avant l'envoi.
+            # L'empreinte est calculée pendant l'envoi et la transcription est enregistrée pour les suivants.
+            print("LOG: Extraction de l'audio en flux pendant l'envoi à Deepgram.")
+        else:
+            if hasher:
+                # Un seul décodage : le PCM 16 kHz mono est haché pendant l'écriture du WAV
+                wav_path = audio_path if audio_format == "wav" else os.path.join(TEMP_DIR, f"{base_name}.wav")
+                if wav_path != audio_path:
+                    temp_files += [wav_path, f"{wav_path}.part"]
+                for _ in tee_pcm_to_wav(hasher.passthrough(stream_audio_pcm(video_path)), wav_path):
+                    pass
+                fingerprint = hasher.hexdigest()
+                cached_transcript = get_cached_transcript(fingerprint)
+                if audio_format == "opus" and not cached_transcript:
+                    # L'encodage Opus repart du WAV 16 kHz mono, sans redécoder la vidéo
+                    extract_audio_for_stt(wav_path, audio_path, audio_format="opus")
+            else:
+                # Directement en 16 kHz mono, le format des moteurs de reconnaissance, sans décodage par MoviePy
+                extract_audio_for_stt(video_path, audio_path, audio_format=audio_format)
+
+            # DEBUG: Vérifier la taille du fichier audio
+            if not cached_transcript and (not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0):
+                raise Exception(f"Le fichier audio extrait est vide ou n'a pas été créé à {audio_path}")
+            if os.path.exists(audio_path):
+                print(f"LOG: Audio extrait avec succès. Taille: {os.path.getsize(audio_path)} bytes.")
 
         # 2. Transcrire l'audio pour obtenir les timings
+        report("extract_audio", "completed")
         print("LOG: Étape 2 - Transcription de l'audio...")
+        report("transcription", "started")
         timing_data = []
         detected_lang = 'fr' # Langue par défaut si tout échoue
-        try:
-            print("LOG: Tentative de transcription avec Deepgram (avec détection de langue)...")
-            deepgram_result = transcribe_audio_with_deepgram(audio_path)
-            timing_data = deepgram_result.get("words", [])
-            detected_lang = deepgram_result.get("detected_language", detected_lang)
-            print(f"LOG: Langue détectée par Deepgram : {detected_lang}")
-            if not timing_data:
-                raise Exception("Deepgram n'a retourné aucun mot.")
-        except Exception as e_deepgram:
-            print(f"LOG DEBUG: La transcription Deepgram a échoué avec l'erreur : {e_deepgram}. Tentative avec Whisper...")
+
+        if cached_transcript:
+            timing_data = cached_transcript["words"]
+            detected_lang = cached_transcript["detected_language"] or detected_lang
+            print(f"LOG: Transcription reprise du cache ({len(timing_data)} mots, langue : {detected_lang}).")
+        else:
             try:
-                # On utilise la langue détectée par Deepgram (ou le défaut) pour aider Whisper
-                print(f"LOG: Lancement de Whisper avec la langue : {detected_lang}")
-                timing_data = transcribe_audio_with_whisper(audio_path, language=detected_lang)
-            except Exception as e_whisper:
-                print(f"LOG: Échec de Whisper: {e_whisper}. Impossible d'obtenir les timings.")
-                timing_data = []
+                print("LOG: Tentative de transcription avec Deepgram (avec détection de langue)...")
+                if long_media:
+                    deepgram_result = transcribe_in_chunks(audio_path, engine="deepgram")
+                elif streaming:
+                    # Le WAV est écrit au passage pour un éventuel recours à Whisper
+                    with limit("deepgram"):
+                        chunks = stream_audio_pcm(video_path)
+                        deepgram_result = transcribe_stream_with_deepgram(
+                            tee_pcm_to_wav(hasher.passthrough(chunks) if hasher else chunks, audio_path))
+                else:
+                    with limit("deepgram"):
+                        deepgram_result = transcribe_audio_with_deepgram(audio_path)
+                timing_data = deepgram_result.get("words", [])
+                detected_lang = deepgram_result.get("detected_language", detected_lang)
+                print(f"LOG: Langue détectée par Deepgram : {detected_lang}")
+                if not timing_data:
+                    raise Exception("Deepgram n'a retourné aucun mot.")
+            except Exception as e_deepgram:
+                print(f"LOG DEBUG: La transcription Deepgram a échoué avec l'erreur : {e_deepgram}. Tentative avec Whisper...")
+                try:
+                    # On utilise la langue détectée par Deepgram (ou le défaut) pour aider Whisper
+                    print(f"LOG: Lancement de Whisper avec la langue : {detected_lang}")
+                    if not os.path.exists(audio_path):
+                        # L'extraction en flux s'est arrêtée avec l'envoi à Deepgram
+                        extract_audio_for_stt(video_path, audio_path)
+                    with limit("whisper"):
+                        if long_media:
+                            timing_data = transcribe_in_chunks(audio_path, engine="whisper", language=detected_lang,
+                                                               model_size=whisper_model)["words"]
+                        else:
+                            timing_data = transcribe_audio_with_whisper(audio_path, language=detected_lang, model_size=whisper_model)
+                except ResourceBusyError:
+                    # Saturation : échec explicite plutôt qu'une vidéo sans sous-titres
+                    raise
+                except Exception as e_whisper:
+                    print(f"LOG: Échec de Whisper: {e_whisper}. Impossible d'obtenir les timings.")
+                    timing_data = []
+
+            if streaming and hasher:
+                # None si l'envoi s'est interrompu avant la fin de l'audio
+                fingerprint = hasher.hexdigest()
+            if fingerprint and timing_data:
+                store_transcript(fingerprint, timing_data, detected_lang)
 
         # DEBUG: Vérifier le contenu de timing_data avant le montage
         if not timing_data:
@@ -60,20 +145,31 @@ def process_video_for_subtitles(video_path: str, original_filename: str) -> str:
         else:
             print(f"LOG DEBUG: 'timing_data' contient {len(timing_data)} mots. Premier mot: {timing_data[0]}")
 
+        report("transcription", "completed")
+
         # 3. Monter la vidéo avec les sous-titres
         print("LOG: Étape 3 - Montage de la vidéo avec sous-titres...")
+        report("render", "started")
         output_video_path = os.path.join(OUTPUT_DIR, f"{base_name}.mp4")
 
-        # Réutiliser la fonction de montage existante
-        # Note: 'background_video_url' est maintenant le chemin local de la vidéo originale
-        # 'audio_path' est le chemin de l'audio extrait
-        make_video_from_assets(
-            background_video_url=video_path, 
-            audio_path=audio_path,
-            words_timing=timing_data,
-            out_video=output_video_path,
-            use_original_audio=True # Nouvelle option pour ne pas ré-encoder l'audio
-        )
+        with limit("render"):
+            if render_engine == "ass":
+                # Une seule passe ffmpeg : sous-titres ASS incrustés, audio d'origine copié
+                burn_subtitles_with_ass(video_path, timing_data, output_video_path)
+            else:
+                # Réutiliser la fonction de montage existante
+                # Note: 'background_video_url' est maintenant le chemin local de la vidéo originale
+                # 'audio_path' est le chemin de l'audio extrait
+                make_video_from_assets(
+                    background_video_url=video_path, 
+                    audio_path=audio_path,
+                    words_timing=timing_data,
+                    out_video=output_video_path,
+                    use_original_audio=True, # Nouvelle option pour ne pas ré-encoder l'audio
+                    render_engine=render_engine,
+                    progress_callback=(lambda fraction: report("render", "running", fraction)) if progress_callback else None
+                )
+        report("render", "completed")
 
         print(f"LOG: Vidéo avec sous-titres générée : {output_video_path}")
         return output_video_path
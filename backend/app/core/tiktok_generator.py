@@ -1,169 +1,280 @@
 # app/core/tiktok_generator.py
 import time
 import os
+import uuid
 from app.core.configs import OUTPUT_DIR, TEMP_DIR, FPS
+from app.core.pipeline import StagePipeline
+from app.core.resources import ResourceBusyError, limit
+from app.core.checkpoints import checkpointed, open_checkpoint
+from app.core.tts_router import tts_router
 from app.utils.llm_utils import generate_script_with_openai
-# Import both audio generation options
-from app.utils.elevenlabs_utils import generate_audio_with_timing
-from app.utils.cartesia_utils import generate_audio_with_cartesia
-from app.utils.deepgram_utils import generate_audio_with_deepgram, transcribe_audio_with_deepgram
-from app.utils.gtts_utils import generate_audio_with_gtts
+from app.utils.deepgram_utils import transcribe_audio_with_deepgram
 from app.utils.whisper_utils import transcribe_audio_with_whisper
+from app.utils.alignment_utils import words_from_provider_timing
+from app.utils.forced_alignment import align_script_to_audio
 from app.utils.video_search_utils import search_pexels_video
-from app.utils.video_utils import make_video_from_assets
+from app.utils.video_utils import make_video_from_assets, RENDER_ENGINES
+from app.utils.background_cache import get_cached_background
 import random
 import re
-from app.core.config_loader import CARTESIA_ACCESS_TOKEN
+from app.core.config_loader import BACKGROUND_CACHE_ENABLED, FORCED_ALIGNMENT_ENABLED
 
-def make_tiktok_from_prompt(prompt, n_images=3, category="astuce", lang="fr", tone="percutant", tts_service="auto"):
+# Débit moyen de la narration TTS, utilisé pour estimer la durée de la vidéo avant la synthèse
+WORDS_PER_SECOND = 2.5
+
+def generate_script(prompt, tone):
     """
-    Génère une vidéo TikTok à partir d'un prompt.
-    
-    Args:
-        prompt: Le concept de la vidéo
-        n_images: Nombre d'images à utiliser
-        category: Catégorie de la vidéo (astuce, motivation, lifestyle)
-        lang: Langue du contenu
-        tone: Ton du script
-        tts_service: Service TTS à utiliser ('auto', 'cartesia', 'elevenlabs')
+    Étape 1 : générer le script avec l'IA.
     """
-    
-    timestamp = int(time.time())
-    base_name = f"tiktok_{timestamp}"
-    temp_files = []  # Liste pour suivre les fichiers temporaires à nettoyer en cas d'erreur
-    
-    try:
-        # 1. Générer le script avec l'IA
-        print("LOG: Étape 1 - Génération du script par OpenAI...")
+    print("LOG: Étape 1 - Génération du script par OpenAI...")
+    with limit("openai"):
         script = generate_script_with_openai(prompt=prompt, tone=tone)
-        if not script or len(script.strip()) < 10:
-            raise Exception("Le script généré est trop court ou vide.")
-        print(f"LOG: Script généré : {script}")
-
-        # 2. Chercher une vidéo de fond illustrant le script
-        print("LOG: Étape 2 - Recherche d'une vidéo de fond sur Pexels...")
-        # Nettoyer le texte pour la recherche de vidéo
-        video_query = re.sub(r'[^\w\s]', '', script).split()[:5]
-        video_query = " ".join(video_query)
-        if not video_query or len(video_query.strip()) < 3:
-            video_query = prompt  # Utiliser le prompt original si le script nettoyé est trop court
-        
-        background_video_url = search_pexels_video(query=video_query)
+    if not script or len(script.strip()) < 10:
+        raise Exception("Le script généré est trop court ou vide.")
+    print(f"LOG: Script généré : {script}")
+    return script
+
+def find_background_video(script, prompt, category, search_func=search_pexels_video):
+    """
+    Étape 2 : chercher une vidéo de fond illustrant le script et la précharger dans le cache.
+    Retourne un chemin local (ou l'URL si le cache est désactivé).
+    `search_func` permet de remplacer la recherche Pexels, par exemple par une version mémorisée pour un lot.
+    """
+    print("LOG: Étape 2 - Recherche d'une vidéo de fond sur Pexels...")
+    # Nettoyer le texte pour la recherche de vidéo
+    video_query = re.sub(r'[^\w\s]', '', script).split()[:5]
+    video_query = " ".join(video_query)
+    if not video_query or len(video_query.strip()) < 3:
+        video_query = prompt  # Utiliser le prompt original si le script nettoyé est trop court
+
+    # Durée attendue de la narration, pour préférer une vidéo assez longue pour ne pas boucler
+    expected_duration = len(script.split()) / WORDS_PER_SECOND
+    with limit("pexels"):
+        background_video_url = search_func(query=video_query, target_duration=expected_duration)
+
+    if not background_video_url:
+        print("LOG: Impossible de trouver une vidéo de fond. Tentative avec des termes génériques...")
+        # Essayer avec des termes génériques liés à la catégorie
+        generic_terms = {
+            "astuce": "tips advice",
+            "motivation": "motivation success",
+            "lifestyle": "lifestyle daily routine"
+        }
+        with limit("pexels"):
+            background_video_url = search_func(query=generic_terms.get(category, "background"), target_duration=expected_duration)
 
         if not background_video_url:
-            print("LOG: Impossible de trouver une vidéo de fond. Tentative avec des termes génériques...")
-            # Essayer avec des termes génériques liés à la catégorie
-            generic_terms = {
-                "astuce": "tips advice",
-                "motivation": "motivation success",
-                "lifestyle": "lifestyle daily routine"
-            }
-            background_video_url = search_pexels_video(query=generic_terms.get(category, "background"))
-            
-            if not background_video_url:
-                raise Exception("Impossible de trouver une vidéo de fond après plusieurs tentatives.")
-        
-        print(f"LOG: Vidéo de fond trouvée : {background_video_url}")
+            raise Exception("Impossible de trouver une vidéo de fond après plusieurs tentatives.")
 
-        # 3. Générer l'audio avec Cartesia ou ElevenLabs
-        audio_path = os.path.join(OUTPUT_DIR, f"{base_name}.mp3")
-        
-        # Déterminer quelle API utiliser pour la génération audio
-        audio_response = None
+    print(f"LOG: Vidéo de fond trouvée : {background_video_url}")
 
-        # Logique de génération audio avec fallback
-        print("LOG: Étape 3 - Tentative de génération audio...")
-        audio_response = None
+    # Télécharger (et transcoder) le fond pendant que l'audio est généré
+    if BACKGROUND_CACHE_ENABLED:
+        return get_cached_background(background_video_url)
+    return background_video_url
 
-        if lang == 'fr':
-            print("LOG: Langue française détectée. Tentative de génération audio...")
-            # 1. Essayer ElevenLabs
-            try:
-                print("LOG: Tentative avec ElevenLabs (prioritaire pour le français)...")
-                audio_response = generate_audio_with_timing(text=script)
-            except Exception as e_elevenlabs:
-                print(f"LOG: Échec d'ElevenLabs: {e_elevenlabs}. Tentative avec Cartesia...")
-                # 2. Essayer Cartesia
-                try:
-                    audio_response = generate_audio_with_cartesia(text=script, lang=lang)
-                except Exception as e_cartesia:
-                    print(f"LOG: Échec de Cartesia: {e_cartesia}. Tentative avec gTTS...")
-                    # 3. Essayer gTTS en dernier recours
-                    try:
-                        audio_response = generate_audio_with_gtts(text=script, lang=lang)
-                    except Exception as e_gtts:
-                        print(f"LOG: Échec de gTTS: {e_gtts}. La génération audio a échoué.")
-                        raise Exception("Tous les services de génération audio français ont échoué.")
-        else: # Pour l'anglais et autres langues supportées par Deepgram
-            print("LOG: Langue anglaise détectée. Priorité à Deepgram pour le TTS.")
-            try:
-                audio_response = generate_audio_with_deepgram(text=script, lang=lang)
-            except Exception as e_deepgram:
-                print(f"LOG: Échec de Deepgram TTS: {e_deepgram}. Tentative avec gTTS...")
-                try:
-                    audio_response = generate_audio_with_gtts(text=script, lang=lang)
-                except Exception as e_gtts:
-                    print(f"LOG: Échec de gTTS: {e_gtts}. La génération audio a échoué.")
-                    raise Exception("Tous les services de génération audio ont échoué.")
-        
-        if not audio_response or not audio_response.get("audio_data"):
-            raise Exception("La génération audio a échoué ou n'a retourné aucune donnée.")
+def generate_audio(script, lang, audio_path, temp_files):
+    """
+    Étape 3 : générer l'audio avec le premier service TTS disponible et l'enregistrer.
+    Le routeur TTS choisit le fournisseur (ElevenLabs, Cartesia puis gTTS en français ; Deepgram puis gTTS sinon)
+    en sautant ceux dont le disjoncteur est ouvert.
+    Retourne {"path": chemin de l'audio, "words": timings des mots fournis par le service TTS (liste vide sinon)}.
+    """
+    print("LOG: Étape 3 - Tentative de génération audio...")
+    audio_response = tts_router.synthesize(script, lang)
+    print(f"LOG: Audio généré par {audio_response['provider']}.")
+
+    if not audio_response or not audio_response.get("audio_data"):
+        raise Exception("La génération audio a échoué ou n'a retourné aucune donnée.")
 
-        # Extraire les données audio
-        audio_data = audio_response["audio_data"]
+    # Extraire les données audio
+    audio_data = audio_response["audio_data"]
 
-        # Sauvegarde du fichier audio
+    # Sauvegarde du fichier audio
+    try:
+        with open(audio_path, 'wb') as f:
+            f.write(audio_data)
+        temp_files.append(audio_path)  # Ajouter à la liste des fichiers temporaires
+        print(f"LOG: Audio généré et sauvegardé : {audio_path}")
+    except Exception as e:
+        print(f"LOG: Erreur lors de la sauvegarde de l'audio : {str(e)}")
+        raise Exception(f"Erreur lors de la sauvegarde de l'audio : {str(e)}")
+
+    # ElevenLabs fournit l'alignement des caractères : inutile de retranscrire l'audio
+    words = words_from_provider_timing(audio_response.get("timing_data"))
+    if words:
+        print(f"LOG: {len(words)} timings de mots fournis par {audio_response['provider']}.")
+    return {"path": audio_path, "words": words}
+
+def restore_or_generate_audio(script, lang, audio_path, temp_files, checkpoint=None):
+    """
+    Étape 3 avec reprise : recopie l'audio du checkpoint s'il existe, sinon le génère et l'enregistre.
+    """
+    if checkpoint and checkpoint.restore_file("audio", audio_path):
+        temp_files.append(audio_path)
+        print(f"LOG: Étape 'audio' reprise depuis le checkpoint {checkpoint.key[:12]}.")
+        _, saved = checkpoint.load("audio")
+        return {"path": audio_path, "words": (saved or {}).get("words", [])}
+    if checkpoint:
+        # Les timings d'un ancien audio ne correspondraient plus
+        checkpoint.invalidate("timings")
+    audio = generate_audio(script, lang, audio_path, temp_files)
+    if checkpoint:
+        checkpoint.save_file("audio", audio_path)
+        checkpoint.save("audio", {"words": audio["words"]})
+    return audio
+
+def word_timings(audio, script, lang):
+    """
+    Étape 3.5 : timings des mots, repris du service TTS quand il les fournit, sinon obtenus
+    en alignant localement le script sur l'audio, et en dernier recours par transcription.
+    """
+    if audio["words"]:
+        print("LOG: Étape 3.5 - Timings fournis par le service TTS, transcription inutile.")
+        return audio["words"]
+    if FORCED_ALIGNMENT_ENABLED:
         try:
-            with open(audio_path, 'wb') as f:
-                f.write(audio_data)
-            temp_files.append(audio_path)  # Ajouter à la liste des fichiers temporaires
-            print(f"LOG: Audio généré et sauvegardé : {audio_path}")
+            print("LOG: Étape 3.5 - Alignement local du script sur l'audio...")
+            words = align_script_to_audio(script, audio["path"])
+            if words:
+                print(f"LOG: {len(words)} mots alignés localement.")
+                return words
+            print("LOG: Alignement local inutilisable (aucune parole détectée ou timings invraisemblables), passage à la transcription.")
         except Exception as e:
-            print(f"LOG: Erreur lors de la sauvegarde de l'audio : {str(e)}")
-            raise Exception(f"Erreur lors de la sauvegarde de l'audio : {str(e)}")
+            print(f"LOG: Échec de l'alignement local: {e}. Passage à la transcription.")
+    return transcribe_audio(audio["path"], lang)
 
-        # NOUVELLE ÉTAPE : Transcription pour obtenir les timings
-        print("LOG: Étape 3.5 - Tentative de transcription pour la synchronisation...")
-        try:
-            print("LOG: Tentative avec Deepgram (prioritaire)...")
+def transcribe_audio(audio_path, lang):
+    """
+    Transcrire l'audio pour obtenir les timings des mots.
+    """
+    print("LOG: Étape 3.5 - Tentative de transcription pour la synchronisation...")
+    try:
+        print("LOG: Tentative avec Deepgram (prioritaire)...")
+        with limit("deepgram"):
             deepgram_result = transcribe_audio_with_deepgram(audio_path, lang=lang)
-            timing_data = deepgram_result.get("words", [])
-        except Exception as e_deepgram_stt:
-            print(f"LOG: Échec de Deepgram STT: {e_deepgram_stt}. Tentative avec Whisper...")
-            try:
+        timing_data = deepgram_result.get("words", [])
+    except Exception as e_deepgram_stt:
+        print(f"LOG: Échec de Deepgram STT: {e_deepgram_stt}. Tentative avec Whisper...")
+        try:
+            with limit("whisper"):
                 timing_data = transcribe_audio_with_whisper(audio_path)
-            except Exception as e_whisper:
-                print(f"LOG: Échec de Whisper: {e_whisper}. Impossible d'obtenir les timings.")
-                timing_data = [] # Continuer sans sous-titres
+        except ResourceBusyError:
+            # Saturation : faire échouer l'étape plutôt que produire (et mettre en cache) une vidéo sans sous-titres
+            raise
+        except Exception as e_whisper:
+            print(f"LOG: Échec de Whisper: {e_whisper}. Impossible d'obtenir les timings.")
+            timing_data = [] # Continuer sans sous-titres
+    return timing_data
+
+def new_base_name():
+    """
+    Nom de base unique des fichiers d'une vidéo (plusieurs vidéos peuvent démarrer dans la même seconde).
+    """
+    return f"tiktok_{int(time.time())}_{uuid.uuid4().hex[:6]}"
 
-        # 4. Monter la vidéo
-        print("LOG: Étape 4 - Montage de la vidéo...")
-        out_video = os.path.join(OUTPUT_DIR, f"{base_name}.mp4")
+def add_asset_stages(pipeline, prompt, category, lang, tone, audio_path, temp_files, search_func=search_pexels_video, checkpoint=None):
+    """
+    Ajoute au pipeline les étapes qui préparent les ressources d'une vidéo (script, fond, audio, timings).
+    Avec un `checkpoint`, les étapes déjà réussies lors d'une tentative précédente ne sont pas rejouées.
+    """
+    pipeline.add("script", checkpointed(checkpoint, "script", lambda: generate_script(prompt, tone),
+                                        invalidates=("background", "audio", "timings")))
+    pipeline.add("background", checkpointed(checkpoint, "background",
+                                            lambda script: find_background_video(script, prompt, category, search_func),
+                                            is_valid=lambda path: path.startswith(("http://", "https://")) or os.path.exists(path)),
+                 depends_on=("script",))
+    pipeline.add("audio", lambda script: restore_or_generate_audio(script, lang, audio_path, temp_files, checkpoint), depends_on=("script",))
+    pipeline.add("timings", checkpointed(checkpoint, "timings", lambda audio, script: word_timings(audio, script, lang)),
+                 depends_on=("audio", "script"))
+    return pipeline
+
+def check_render_engine(render_engine):
+    if render_engine not in RENDER_ENGINES:
+        raise ValueError(f"Moteur de rendu inconnu : '{render_engine}'. Valeurs possibles : {', '.join(RENDER_ENGINES)}")
+
+def render_tiktok_video(background, audio_path, timings, out_video, render_engine="moviepy", progress_callback=None):
+    """
+    Étape 4 : monter la vidéo à partir des ressources préparées.
+    """
+    print("LOG: Étape 4 - Montage de la vidéo...")
+    with limit("render"):
         make_video_from_assets(
-            background_video_url=background_video_url,
+            background_video_url=background,
             audio_path=audio_path,
-            words_timing=timing_data, # Passer les timings de Whisper
-            out_video=out_video
+            words_timing=timings, # Passer les timings de la transcription
+            out_video=out_video,
+            render_engine=render_engine,
+            progress_callback=(lambda fraction: progress_callback("render", "running", fraction)) if progress_callback else None
         )
-        print("LOG: Montage terminé.")
+    print("LOG: Montage terminé.")
+
+    # Vérifier que le fichier vidéo existe et a une taille non nulle
+    if not os.path.exists(out_video) or os.path.getsize(out_video) == 0:
+        raise Exception("La vidéo générée est vide ou n'a pas été créée correctement.")
+    return out_video
+
+def cleanup_temp_files(temp_files):
+    # Nettoyer les fichiers temporaires en cas d'erreur
+    for temp_file in temp_files:
+        if os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+                print(f"LOG: Fichier temporaire supprimé : {temp_file}")
+            except:
+                pass
 
-        # Vérifier que le fichier vidéo existe et a une taille non nulle
-        if not os.path.exists(out_video) or os.path.getsize(out_video) == 0:
-            raise Exception("La vidéo générée est vide ou n'a pas été créée correctement.")
+def make_tiktok_from_prompt(prompt, n_images=3, category="astuce", lang="fr", tone="percutant", tts_service="auto", render_engine="moviepy", progress_callback=None):
+    """
+    Génère une vidéo TikTok à partir d'un prompt.
+
+    Les étapes s'exécutent comme un graphe de dépendances : une fois le script écrit,
+    la recherche et le téléchargement du fond se font en parallèle du TTS puis de la transcription,
+    et le montage démarre dès que le fond et les timings sont prêts.
+    
+    Args:
+        prompt: Le concept de la vidéo
+        n_images: Nombre d'images à utiliser
+        category: Catégorie de la vidéo (astuce, motivation, lifestyle)
+        lang: Langue du contenu
+        tone: Ton du script
+        tts_service: Service TTS à utiliser ('auto', 'cartesia', 'elevenlabs')
+        render_engine: Moteur de rendu vidéo ('moviepy', 'ffmpeg', 'ffmpeg_parallel')
+        progress_callback: Fonction optionnelle (étape, statut, fraction) appelée à chaque changement d'étape
+            et pendant le rendu avec la fraction d'images écrites
+    """
+    # Vérifié avant toute étape payante (script, fond, TTS, STT) plutôt qu'au montage
+    check_render_engine(render_engine)
+
+    base_name = new_base_name()
+    temp_files = []  # Liste pour suivre les fichiers temporaires à nettoyer en cas d'erreur
+    audio_path = os.path.join(OUTPUT_DIR, f"{base_name}.mp3")
+    out_video = os.path.join(OUTPUT_DIR, f"{base_name}.mp4")
+    # Une nouvelle tentative de la même demande reprend après la dernière étape réussie
+    checkpoint = open_checkpoint(dict(prompt=prompt, n_images=n_images, category=category, lang=lang,
+                                      tone=tone, tts_service=tts_service))
 
+    pipeline = StagePipeline(name=base_name, on_event=progress_callback)
+    add_asset_stages(pipeline, prompt, category, lang, tone, audio_path, temp_files, checkpoint=checkpoint)
+    pipeline.add(
+        "render",
+        lambda background, timings, audio: render_tiktok_video(background, audio["path"], timings, out_video, render_engine, progress_callback),
+        depends_on=("background", "timings", "audio")
+    )
+
+    try:
+        pipeline.run()
+        if checkpoint:
+            checkpoint.discard()
         return out_video
         
     except Exception as e:
         print(f"LOG: Erreur dans le processus de génération de vidéo : {str(e)}")
-        
-        # Nettoyer les fichiers temporaires en cas d'erreur
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                    print(f"LOG: Fichier temporaire supprimé : {temp_file}")
-                except:
-                    pass
-        
+        if checkpoint:
+            print(f"LOG: Étapes terminées conservées dans le checkpoint {checkpoint.key[:12]} pour une nouvelle tentative.")
+        cleanup_temp_files(temp_files)
         # Relancer l'exception pour la gestion d'erreur en amont
-        raise
\ No newline at end of file
+        raise
+    finally:
+        if checkpoint:
+            checkpoint.release()
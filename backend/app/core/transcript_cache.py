@@ -0,0 +1,136 @@
+# app/core/transcript_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from app.core.configs import TRANSCRIPT_CACHE_DIR
+from app.core.config_loader import TRANSCRIPT_CACHE_MAX_ENTRIES, TRANSCRIPT_CACHE_TTL_SECONDS
+from app.utils.ffmpeg_utils import stream_audio_pcm
+
+# À incrémenter si le décodage servant à l'empreinte change
+FINGERPRINT_VERSION = b"pcm_s16le-16000-mono-v1"
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stored": 0}
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+class AudioHasher:
+    """
+    Calcule l'empreinte des blocs PCM 16 kHz mono qui le traversent, pour hacher l'audio
+    pendant un décodage qui sert déjà à autre chose (écriture du WAV, envoi à Deepgram).
+    """
+    def __init__(self):
+        self._digest = hashlib.sha256(FINGERPRINT_VERSION)
+        self.complete = False
+
+    def passthrough(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self._digest.update(chunk)
+            yield chunk
+        # Un flux interrompu ne donne qu'une empreinte partielle, inutilisable
+        self.complete = True
+
+    def hexdigest(self) -> Optional[str]:
+        return self._digest.hexdigest() if self.complete else None
+
+def audio_fingerprint(media_path: str) -> str:
+    """
+    Empreinte du contenu audio : SHA-256 des échantillons décodés en PCM 16 kHz mono.
+    Un même son dans un autre conteneur ou avec d'autres métadonnées donne la même empreinte.
+    Le décodage est haché au fil de l'eau, sans garder l'audio en mémoire.
+    """
+    hasher = AudioHasher()
+    for _ in hasher.passthrough(stream_audio_pcm(media_path)):
+        pass
+    return hasher.hexdigest()
+
+def _entry_path(fingerprint: str) -> str:
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{fingerprint}.json")
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+PRUNE_INTERVAL_SECONDS = min(TRANSCRIPT_CACHE_TTL_SECONDS, 600)
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+def prune_transcript_cache(now: float = None) -> int:
+    """
+    Supprime les transcriptions plus vieilles que TRANSCRIPT_CACHE_TTL_SECONDS, puis les plus
+    anciennes au-delà de TRANSCRIPT_CACHE_MAX_ENTRIES. Retourne le nombre d'entrées supprimées.
+    """
+    now = now if now is not None else time.time()
+    entries = []
+    for name in os.listdir(TRANSCRIPT_CACHE_DIR):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(TRANSCRIPT_CACHE_DIR, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    entries.sort()
+    expired = [path for mtime, path in entries if now - mtime > TRANSCRIPT_CACHE_TTL_SECONDS]
+    fresh = [path for mtime, path in entries if now - mtime <= TRANSCRIPT_CACHE_TTL_SECONDS]
+    # Triées de la plus ancienne à la plus récente
+    overflow = fresh[:max(0, len(fresh) - TRANSCRIPT_CACHE_MAX_ENTRIES)]
+    for path in expired + overflow:
+        _remove(path)
+    if expired or overflow:
+        print(f"LOG: Cache des transcriptions : {len(expired)} entrées expirées et {len(overflow)} en trop supprimées.")
+    return len(expired) + len(overflow)
+
+def get_cached_transcript(fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Retourne {"words", "detected_language"} déjà transcrits pour cet audio, ou None.
+    """
+    try:
+        with open(_entry_path(fingerprint), 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        _count("misses")
+        return None
+    if time.time() - entry.get("created_at", 0) > TRANSCRIPT_CACHE_TTL_SECONDS:
+        _remove(_entry_path(fingerprint))
+        _count("misses")
+        return None
+    _count("hits")
+    return {"words": entry.get("words", []), "detected_language": entry.get("detected_language", "")}
+
+def store_transcript(fingerprint: str, words: List[Dict[str, Any]], detected_language: str):
+    entry = {"words": words, "detected_language": detected_language, "created_at": time.time()}
+    tmp_path = os.path.join(TRANSCRIPT_CACHE_DIR, f".{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, _entry_path(fingerprint))
+        _count("stored")
+    except Exception as e:
+        print(f"LOG: Impossible d'enregistrer la transcription en cache : {e}")
+        _remove(tmp_path)
+        return
+
+    global _last_prune
+    with _prune_lock:
+        prune_due = time.time() - _last_prune >= PRUNE_INTERVAL_SECONDS
+        if prune_due:
+            _last_prune = time.time()
+    if prune_due:
+        prune_transcript_cache()
+
+def transcript_cache_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["entries"] = sum(1 for name in os.listdir(TRANSCRIPT_CACHE_DIR) if name.endswith('.json'))
+    stats["ttl_seconds"] = TRANSCRIPT_CACHE_TTL_SECONDS
+    stats["max_entries"] = TRANSCRIPT_CACHE_MAX_ENTRIES
+    return stats
@@ -0,0 +1,247 @@
+# app/core/tts_router.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.config_loader import (
+    TTS_HEDGING_ENABLED, TTS_HEDGE_DEFAULT_DELAY, TTS_HEDGE_MIN_SAMPLES,
+    TTS_BREAKER_WINDOW, TTS_BREAKER_MIN_CALLS, TTS_BREAKER_ERROR_RATE,
+    TTS_BREAKER_COOLDOWN, TTS_BREAKER_SLOW_CALL_SECONDS
+)
+from app.core.resources import ResourceBusyError, limit
+from app.utils.elevenlabs_utils import generate_audio_with_timing
+from app.utils.cartesia_utils import generate_audio_with_cartesia
+from app.utils.deepgram_utils import generate_audio_with_deepgram
+from app.utils.gtts_utils import generate_audio_with_gtts
+
+# États d'un disjoncteur
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Suit les derniers appels d'un fournisseur (succès et latence) sur une fenêtre glissante.
+    Le disjoncteur s'ouvre quand la proportion d'échecs dépasse le seuil (un appel trop lent compte
+    comme un échec) ; après `cooldown` secondes, un seul appel d'essai est autorisé pour le refermer.
+    """
+    def __init__(self, name: str, window: int = TTS_BREAKER_WINDOW, min_calls: int = TTS_BREAKER_MIN_CALLS,
+                 error_rate: float = TTS_BREAKER_ERROR_RATE, cooldown: float = TTS_BREAKER_COOLDOWN,
+                 slow_call_seconds: float = TTS_BREAKER_SLOW_CALL_SECONDS):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate
+        self.cooldown = cooldown
+        self.slow_call_seconds = slow_call_seconds
+        self._calls: deque = deque(maxlen=window)  # (succès, latence)
+        self._lock = threading.Lock()
+        self.state = BREAKER_CLOSED
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == BREAKER_OPEN and time.time() - self.opened_at >= self.cooldown:
+                self.state = BREAKER_HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """
+        Libère l'appel d'essai réservé par `allow()` quand il n'a finalement pas eu lieu.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record(self, success: bool, latency: float):
+        failed = not success or latency > self.slow_call_seconds
+        with self._lock:
+            self.calls += 1
+            self.failures += int(failed)
+            self._calls.append((not failed, latency))
+            if self.state == BREAKER_HALF_OPEN:
+                self._probe_in_flight = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = BREAKER_CLOSED
+                    self._calls.clear()
+                    self._calls.append((True, latency))
+            elif self.state == BREAKER_CLOSED and len(self._calls) >= self.min_calls \
+                    and self._error_rate() >= self.error_rate_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = BREAKER_OPEN
+        self.opened_at = time.time()
+        self.opened += 1
+        print(f"LOG: Disjoncteur TTS '{self.name}' ouvert pour {self.cooldown:.0f}s.")
+
+    def _error_rate(self) -> float:
+        return sum(1 for ok, _ in self._calls if not ok) / len(self._calls) if self._calls else 0.0
+
+    def p95_latency(self) -> Optional[float]:
+        """
+        95e centile de la latence des appels réussis récents (None tant qu'il y a trop peu d'échantillons).
+        """
+        with self._lock:
+            latencies = sorted(latency for ok, latency in self._calls if ok)
+        if len(latencies) < TTS_HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))]
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.p95_latency()
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "window_error_rate": round(self._error_rate(), 3),
+                "p95_latency_seconds": round(p95, 3) if p95 is not None else None,
+                "opened": self.opened
+            }
+
+class TTSRouter:
+    """
+    Choisit le fournisseur TTS pour chaque synthèse à partir d'une liste ordonnée par langue.
+
+    Les fournisseurs dont le disjoncteur est ouvert sont sautés. Si le fournisseur principal n'a pas
+    répondu après sa latence p95, une requête de couverture (« hedged request ») est envoyée au suivant
+    et la première réponse valide l'emporte ; un échec passe immédiatement au fournisseur suivant.
+    """
+    def __init__(self, providers: Dict[str, Callable[[str, str], Dict[str, Any]]],
+                 routes: Dict[str, List[str]], hedging: bool = TTS_HEDGING_ENABLED):
+        self.providers = providers
+        self.routes = routes
+        self.hedging = hedging
+        self.breakers = {name: CircuitBreaker(name) for name in providers}
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tts")
+        self._lock = threading.Lock()
+        self.counters = {name: {"selected": 0, "won": 0, "hedged": 0, "skipped_open": 0, "busy": 0} for name in providers}
+
+    def _count(self, provider: str, counter: str):
+        with self._lock:
+            self.counters[provider][counter] += 1
+
+    def route(self, lang: str) -> List[str]:
+        return self.routes.get(lang, self.routes["default"])
+
+    def _call(self, provider: str, text: str, lang: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            with limit(provider):
+                started = time.perf_counter()
+                response = self.providers[provider](text, lang)
+            if not response or not response.get("audio_data"):
+                raise Exception(f"{provider} n'a retourné aucune donnée audio.")
+        except ResourceBusyError:
+            # Saturation locale : ne dit rien de la santé du fournisseur
+            self._count(provider, "busy")
+            self.breakers[provider].release()
+            raise
+        except Exception:
+            self.breakers[provider].record(False, time.perf_counter() - started)
+            raise
+        self.breakers[provider].record(True, time.perf_counter() - started)
+        return dict(response, provider=provider)
+
+    def _hedge_delay(self, provider: str) -> float:
+        p95 = self.breakers[provider].p95_latency()
+        return p95 if p95 is not None else TTS_HEDGE_DEFAULT_DELAY
+
+    def synthesize(self, text: str, lang: str) -> Dict[str, Any]:
+        """
+        Retourne la réponse du premier fournisseur qui réussit, avec son nom sous la clé "provider".
+        """
+        candidates = list(self.route(lang))
+        errors: List[Tuple[str, str]] = []
+        busy: List[ResourceBusyError] = []
+        running = {}
+        force = False
+
+        def launch(hedge: bool = False) -> bool:
+            while candidates:
+                provider = candidates.pop(0)
+                if not force and not self.breakers[provider].allow():
+                    self._count(provider, "skipped_open")
+                    continue
+                self._count(provider, "hedged" if hedge else "selected")
+                print(f"LOG: {'Requête de couverture' if hedge else 'Tentative'} TTS avec {provider}...")
+                running[self._executor.submit(self._call, provider, text, lang)] = (provider, time.perf_counter())
+                return True
+            return False
+
+        if not launch():
+            # Tous les disjoncteurs sont ouverts : mieux vaut essayer quand même que d'échouer sans appel
+            print("LOG: Tous les fournisseurs TTS sont coupés, tentative dans l'ordre habituel.")
+            candidates.extend(self.route(lang))
+            force = True
+            launch()
+
+        while running:
+            # Délai de couverture : p95 du fournisseur lancé le plus récemment
+            latest_provider, latest_started = max(running.values(), key=lambda item: item[1])
+            timeout = None
+            if self.hedging and candidates:
+                timeout = max(0.0, latest_started + self._hedge_delay(latest_provider) - time.perf_counter())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                launch(hedge=True)
+                continue
+
+            for future in done:
+                provider, _ = running.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    print(f"LOG: Échec de {provider} TTS : {e}")
+                    errors.append((provider, str(e)))
+                    if isinstance(e, ResourceBusyError):
+                        busy.append(e)
+                    # Passer tout de suite au suivant, même si une requête de couverture est encore en cours
+                    launch()
+                    continue
+                self._count(provider, "won")
+                if running:
+                    print(f"LOG: {provider} a répondu en premier, les autres requêtes TTS sont ignorées.")
+                return response
+
+        if busy and len(busy) == len(errors):
+            # Tous les fournisseurs sont saturés localement : 503 avec Retry-After plutôt qu'une erreur 500
+            raise min(busy, key=lambda error: error.retry_after)
+        details = "; ".join(f"{provider}: {error}" for provider, error in errors)
+        raise Exception(f"Tous les services de génération audio ont échoué ({details}).")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {name: dict(values) for name, values in self.counters.items()}
+        return {
+            "hedging": self.hedging,
+            "routes": self.routes,
+            "providers": {name: dict(self.breakers[name].stats(), **counters[name]) for name in self.providers}
+        }
+
+tts_router = TTSRouter(
+    providers={
+        "elevenlabs": lambda text, lang: generate_audio_with_timing(text=text),
+        "cartesia": lambda text, lang: generate_audio_with_cartesia(text=text, lang=lang),
+        "deepgram": lambda text, lang: generate_audio_with_deepgram(text=text, lang=lang),
+        "gtts": lambda text, lang: generate_audio_with_gtts(text=text, lang=lang)
+    },
+    routes={
+        "fr": ["elevenlabs", "cartesia", "gtts"],
+        # Anglais et autres langues supportées par Deepgram
+        "default": ["deepgram", "gtts"]
+    }
+)
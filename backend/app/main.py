@@ -13,6 +13,9 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import router
+from app.core.config_loader import WHISPER_PRELOAD
+from app.utils.whisper_utils import model_registry
+from starlette.concurrency import run_in_threadpool
 import os
 
 app = FastAPI(
@@ -26,7 +29,7 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Permettre toutes les origines (à ajuster en production)
     allow_credentials=True,
-    allow_methods=["GET", "POST"],
+    allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["*"],
 )
 
@@ -42,6 +45,12 @@ app.mount("/videos", StaticFiles(directory=output_dir), name="videos")
 # Inclure les routes de l'API
 app.include_router(router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def preload_models():
+    # Charger Whisper avant la première requête plutôt qu'au moment où Deepgram échoue
+    if WHISPER_PRELOAD:
+        await run_in_threadpool(model_registry.preload)
+
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Bienvenue sur l'API AI Video Generator"}
\ No newline at end of file
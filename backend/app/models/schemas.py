@@ -1,6 +1,6 @@
 # app/models/schemas.py
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Dict, Any, List, Literal
 
 class VideoRequest(BaseModel):
     prompt: str = Field(..., example="Une astuce pour mémoriser des noms")
@@ -9,6 +9,33 @@ class VideoRequest(BaseModel):
     category: str = Field("astuce", example="astuce")
     lang: str = Field("fr", example="fr")
     tts_service: str = Field("auto", example="auto", description="Service TTS à utiliser: 'auto', 'cartesia' ou 'elevenlabs'")
+    render_engine: Literal["moviepy", "ffmpeg", "ffmpeg_parallel"] = Field("moviepy", example="moviepy", description="Moteur de rendu: 'moviepy', 'ffmpeg' ou 'ffmpeg_parallel'")
+    use_cache: bool = Field(False, example=False, description="Réutiliser une vidéo déjà générée pour une demande identique")
+
+class BatchRequest(BaseModel):
+    items: List[VideoRequest] = Field(..., min_length=1, max_length=500)
 
 class VideoResponse(BaseModel):
-    video_url: str = Field(..., example="http://localhost:8000/videos/tiktok_1234567890.mp4")
\ No newline at end of file
+    video_url: str = Field(..., example="http://localhost:8000/videos/tiktok_1234567890.mp4")
+    cache_key: Optional[str] = Field(None, description="Clé du cache de résultats (si use_cache)")
+    cached: bool = Field(False, description="Vidéo servie depuis le cache ou partagée avec une génération identique")
+
+class JobSubmitResponse(BaseModel):
+    job_id: str = Field(..., example="3f2b9c0d8e7a4b1c9d6e5f4a3b2c1d0e")
+    status: str = Field(..., example="queued")
+    status_url: str = Field(..., example="http://localhost:8000/api/v1/jobs/3f2b9c0d8e7a4b1c9d6e5f4a3b2c1d0e")
+    events_url: str = Field(..., example="http://localhost:8000/api/v1/jobs/3f2b9c0d8e7a4b1c9d6e5f4a3b2c1d0e/events")
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str = Field(..., example="generate-video")
+    status: str = Field(..., example="running", description="'queued', 'running', 'succeeded' ou 'failed'")
+    stage: Optional[str] = Field(None, example="render")
+    progress: float = Field(0.0, example=0.42, description="Fraction des images déjà rendues")
+    stages: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    video_url: Optional[str] = None
+    manifest: Optional[Dict[str, Any]] = Field(None, description="Résultats d'un lot (/generate-batch)")
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
@@ -0,0 +1,122 @@
+# app/utils/alignment_utils.py
+from typing import Any, Dict, List, Tuple
+
+def alignment_to_words(alignment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Convertit l'alignement caractère par caractère d'ElevenLabs
+    (`characters`, `character_start_times_seconds`, `character_end_times_seconds`)
+    en liste de mots {'word', 'start', 'end'} utilisable pour les sous-titres.
+    Un mot commence au premier caractère non blanc et se termine au dernier avant un espace.
+    """
+    characters = alignment.get("characters") or []
+    starts = alignment.get("character_start_times_seconds") or []
+    ends = alignment.get("character_end_times_seconds") or []
+    if not (len(characters) == len(starts) == len(ends)):
+        raise ValueError("Alignement incohérent : les listes de caractères et de temps n'ont pas la même longueur.")
+
+    words = []
+    current = []
+    for character, start, end in zip(characters, starts, ends):
+        if character.isspace():
+            if current:
+                words.append(current)
+                current = []
+            continue
+        current.append((character, float(start), float(end)))
+    if current:
+        words.append(current)
+
+    return [
+        {"word": "".join(c for c, _, _ in word), "start": word[0][1], "end": max(word[-1][2], word[0][1])}
+        for word in words
+    ]
+
+def words_from_provider_timing(timing_data: Any) -> List[Dict[str, Any]]:
+    """
+    Timings des mots fournis directement par le service TTS, ou liste vide s'il n'en fournit pas
+    (il faut alors les retrouver à partir de l'audio).
+    """
+    if isinstance(timing_data, dict) and timing_data.get("characters"):
+        try:
+            return alignment_to_words(timing_data)
+        except ValueError as e:
+            print(f"LOG: Alignement du service TTS inutilisable : {e}")
+    return []
+
+def script_words(script: str) -> List[str]:
+    """
+    Mots prononcés du script : les éléments sans lettre ni chiffre (emojis, tirets isolés) sont ignorés.
+    """
+    return [token for token in script.split() if any(c.isalnum() for c in token)]
+
+def distribute_words(words: List[str], regions: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+    """
+    Répartit des mots connus sur des zones de parole (début, fin) en secondes,
+    proportionnellement à leur nombre de caractères. Chaque mot est d'abord attribué à une zone
+    d'après sa position dans le temps de parole cumulé, puis les mots d'une même zone la remplissent.
+    """
+    regions = [(start, end) for start, end in regions if end > start]
+    if not words or not regions:
+        return []
+
+    weights = [max(1, sum(1 for c in word if c.isalnum())) for word in words]
+    total_weight = sum(weights)
+    voiced = sum(end - start for start, end in regions)
+
+    # Fin de chaque zone sur l'axe « temps de parole cumulé »
+    boundaries = []
+    elapsed = 0.0
+    for start, end in regions:
+        elapsed += end - start
+        boundaries.append(elapsed)
+
+    groups: List[List[int]] = [[] for _ in regions]
+    cumulative = 0.0
+    for index, weight in enumerate(weights):
+        middle = (cumulative + weight / 2) * voiced / total_weight
+        cumulative += weight
+        region = next((k for k, boundary in enumerate(boundaries) if middle < boundary), len(regions) - 1)
+        groups[region].append(index)
+
+    timings: List[Dict[str, Any]] = []
+    for (start, end), group in zip(regions, groups):
+        group_weight = sum(weights[index] for index in group)
+        position = start
+        for index in group:
+            word_end = position + (end - start) * weights[index] / group_weight
+            timings.append({"word": words[index], "start": round(position, 3), "end": round(word_end, 3)})
+            position = word_end
+    return timings
+
+# Débit plausible d'une voix de synthèse, en secondes par caractère prononcé (environ 4 à 40 caractères/s)
+MIN_SECONDS_PER_CHAR = 0.025
+MAX_SECONDS_PER_CHAR = 0.25
+PAUSE_PUNCTUATION = (".", ",", ";", ":", "!", "?", "…")
+SENTENCE_PUNCTUATION = (".", "!", "?", "…")
+
+def _ends_with(word: str, punctuation: Tuple[str, ...]) -> bool:
+    return word.rstrip("\"'»)").endswith(punctuation)
+
+def alignment_is_plausible(words: List[str], regions: List[Tuple[float, float]], timings: List[Dict[str, Any]]) -> bool:
+    """
+    Contrôle de vraisemblance des timings de `distribute_words` avant de les préférer à une transcription :
+    - chaque mot doit avoir une durée compatible avec un débit de parole réel ;
+    - les silences détectés doivent correspondre aux pauses du script : une voix de synthèse s'arrête
+      aux fins de phrase, et bien plus de silences que de ponctuations signifie que la détection
+      d'activité vocale coupe au milieu des mots (bruit, musique de fond).
+    """
+    if not timings or len(timings) != len(words):
+        return False
+    for word, timing in zip(words, timings):
+        characters = max(1, sum(1 for c in word if c.isalnum()))
+        if not MIN_SECONDS_PER_CHAR <= (timing["end"] - timing["start"]) / characters <= MAX_SECONDS_PER_CHAR:
+            return False
+
+    script_pauses = sum(1 for word in words[:-1] if _ends_with(word, PAUSE_PUNCTUATION))
+    sentence_breaks = sum(1 for word in words[:-1] if _ends_with(word, SENTENCE_PUNCTUATION))
+    detected_pauses = len(regions) - 1
+    if detected_pauses > script_pauses + 1 + len(words) // 10:
+        return False
+    if sentence_breaks >= 2 and detected_pauses == 0:
+        return False
+    return True
@@ -0,0 +1,129 @@
+# app/utils/ass_utils.py
+import os
+import uuid
+from typing import List, Dict, Any, Optional
+from app.core.configs import FPS, WIDTH, HEIGHT, TEMP_DIR
+from app.utils.ffmpeg_utils import probe_audio_codec, run_ffmpeg
+from app.utils.render_cache import get_font
+from app.utils.subtitle_utils import (
+    FONT_PATH, SUBTITLE_FONT_SIZE, SUBTITLE_VERTICAL_OFFSET, SUBTITLE_BG_PADDING,
+    SUBTITLE_BG_COLOR, SUBTITLE_TEXT_COLOR
+)
+
+def format_ass_time(seconds: float) -> str:
+    """
+    Formate un temps en secondes au format ASS (H:MM:SS.cc).
+    """
+    centiseconds = int(round(max(0.0, seconds) * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+def ass_color(rgb: tuple, alpha: int = 255) -> str:
+    """
+    Convertit une couleur RGB(A) Pillow en couleur ASS (&HAABBGGRR, où AA est la transparence).
+    """
+    r, g, b = rgb[:3]
+    return f"&H{255 - alpha:02X}{b:02X}{g:02X}{r:02X}"
+
+def escape_ass_text(text: str) -> str:
+    """
+    Neutralise les caractères interprétés par libass dans le texte d'un dialogue.
+    """
+    return text.replace('\\', '\\\\').replace('{', '(').replace('}', ')').replace('\n', ' ')
+
+def build_ass_subtitles(words_timing: List[Dict[str, Any]], size: tuple = (WIDTH, HEIGHT)) -> str:
+    """
+    Génère un fichier ASS reproduisant le style karaoké (texte jaune sur boîte sombre, un mot à la fois).
+    """
+    # La taille de police ASS correspond à la hauteur de ligne (ascendante + descendante),
+    # alors que Pillow utilise la taille du cadratin : convertir pour obtenir des glyphes identiques.
+    ascent, descent = get_font(FONT_PATH, SUBTITLE_FONT_SIZE).getmetrics()
+    font_size = ascent + descent
+
+    x = size[0] // 2
+    y = size[1] // 2 + SUBTITLE_VERTICAL_OFFSET
+    text_color = ass_color(SUBTITLE_TEXT_COLOR)
+    box_color = ass_color(SUBTITLE_BG_COLOR, SUBTITLE_BG_COLOR[3])
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {size[0]}",
+        f"PlayResY: {size[1]}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, "
+        "Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        # BorderStyle 3 : boîte opaque dessinée avec OutlineColour, Outline = marge autour du texte
+        f"Style: Karaoke,Montserrat,{font_size},{text_color},{text_color},{box_color},{box_color},-1,0,0,0,100,100,0,0,3,{SUBTITLE_BG_PADDING},0,5,0,0,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+
+    for item in words_timing or []:
+        word = item.get('word') or item.get('punctuated_word')
+        start = item.get('start')
+        end = item.get('end')
+        if word and start is not None and end is not None and end > start:
+            lines.append(
+                f"Dialogue: 0,{format_ass_time(start)},{format_ass_time(end)},Karaoke,,0,0,0,,"
+                f"{{\\an5\\pos({x},{y})}}{escape_ass_text(word)}"
+            )
+
+    return "\n".join(lines) + "\n"
+
+# Codecs audio qu'un MP4 peut contenir tels quels ; les autres (Opus, Vorbis, PCM...) sont ré-encodés en AAC
+MP4_COPY_AUDIO_CODECS = ("aac", "mp3", "alac", "ac3", "eac3")
+
+def audio_codec_args(codec: Optional[str]) -> List[str]:
+    """
+    Copie la piste audio quand le conteneur MP4 l'accepte, sinon la ré-encode en AAC.
+    """
+    return ['-c:a', 'copy'] if codec in MP4_COPY_AUDIO_CODECS else ['-c:a', 'aac']
+
+def burn_subtitles_with_ass(video_path: str, words_timing: List[Dict[str, Any]], out_video: str) -> str:
+    """
+    Incruste les sous-titres en une seule passe ffmpeg (filtre `ass`), en copiant la piste audio d'origine.
+    """
+    ass_name = f"subtitles_{uuid.uuid4().hex}.ass"
+    ass_path = os.path.join(TEMP_DIR, ass_name)
+    fonts_dir = os.path.dirname(FONT_PATH)
+
+    try:
+        with open(ass_path, 'w', encoding='utf-8') as f:
+            f.write(build_ass_subtitles(words_timing))
+        print(f"LOG: Fichier ASS généré avec {len(words_timing or [])} mots : {ass_path}")
+
+        # ffmpeg est lancé depuis TEMP_DIR avec des chemins relatifs pour éviter
+        # l'échappement des chemins (':' et '\' sous Windows) dans le graphe de filtres.
+        video_filter = (
+            f"scale={WIDTH}:{HEIGHT},"
+            f"ass={ass_name}:fontsdir={os.path.relpath(fonts_dir, TEMP_DIR).replace(os.sep, '/')}"
+        )
+        base_args = [
+            '-i', video_path,
+            '-map', '0:v:0', '-map', '0:a:0',
+            '-vf', video_filter, '-r', str(FPS),
+            '-c:v', 'libx264', '-preset', 'medium', '-pix_fmt', 'yuv420p',
+        ]
+
+        # Le codec est vérifié avant l'encodage : un échec de ffmpeg n'est jamais suivi d'une seconde passe complète
+        audio_codec = probe_audio_codec(video_path)
+        audio_args = audio_codec_args(audio_codec)
+        print(f"LOG: Incrustation des sous-titres avec ffmpeg (audio {audio_codec or 'inconnu'} "
+              f"{'copié' if audio_args[-1] == 'copy' else 'ré-encodé en AAC'})...")
+        run_ffmpeg(base_args + audio_args + [out_video], cwd=TEMP_DIR)
+
+        return out_video
+
+    finally:
+        if os.path.exists(ass_path):
+            try:
+                os.remove(ass_path)
+            except Exception as e:
+                print(f"LOG: Erreur lors de la suppression du fichier {ass_path}: {e}")
@@ -0,0 +1,230 @@
+# app/utils/background_cache.py
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Any
+from app.core.configs import BACKGROUND_CACHE_DIR, FPS, WIDTH, HEIGHT
+from app.core.config_loader import (
+    BACKGROUND_CACHE_MAX_BYTES, BACKGROUND_CACHE_LOCK_TIMEOUT, BACKGROUND_MEZZANINE_ENABLED, BACKGROUND_PROGRESSIVE_FETCH
+)
+from app.utils.download_utils import download_file, ProgressiveDownload, is_streamable_mp4
+from app.utils.ffmpeg_utils import run_ffmpeg
+
+# Format mezzanine : exactement la taille et le FPS de sortie, une image clé par seconde
+# (découpe et bouclage sans décodage superflu). Fait partie de la clé de cache.
+MEZZANINE_PROFILE = f"{WIDTH}x{HEIGHT}@{FPS}-gop{FPS}" if BACKGROUND_MEZZANINE_ENABLED else "source"
+
+# Verrous par fichier pour les threads d'un même processus ; les autres processus
+# se coordonnent via un fichier .lock créé de façon exclusive.
+_key_locks: Dict[str, threading.Lock] = {}
+_key_locks_guard = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "waits": 0,
+    "evictions": 0,
+    "bytes_saved": 0,
+    "bytes_downloaded": 0
+}
+
+def _count(name: str, value: int = 1):
+    with _stats_lock:
+        _stats[name] += value
+
+def background_cache_key(url: str) -> str:
+    """
+    Clé de cache d'une vidéo de fond : empreinte SHA-256 de son URL et du format mezzanine.
+    """
+    return hashlib.sha256(f"{url}|{MEZZANINE_PROFILE}".encode('utf-8')).hexdigest()
+
+# Octets lus au début du téléchargement pour savoir si la vidéo peut être décodée en flux
+STREAMABLE_PROBE_BYTES = 1024 * 1024
+
+def transcode_to_mezzanine(source_path: str, out_path: str, stdin_chunks=None):
+    """
+    Transcode une vidéo de fond une seule fois dans le format attendu par les rendus
+    (WIDTH x HEIGHT, FPS, sans audio), pour qu'ils n'aient plus à la redimensionner.
+    Avec `stdin_chunks`, la source est lue depuis l'entrée standard ('pipe:0').
+    """
+    print(f"LOG: Transcodage de la vidéo de fond au format mezzanine {MEZZANINE_PROFILE}...")
+    run_ffmpeg([
+        '-i', source_path,
+        '-an', '-vf', f'fps={FPS},scale={WIDTH}:{HEIGHT}:flags=lanczos',
+        '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p',
+        '-g', str(FPS), '-keyint_min', str(FPS), '-sc_threshold', '0',
+        '-movflags', '+faststart', '-f', 'mp4',
+        out_path
+    ], stdin_chunks=stdin_chunks)
+
+def fetch_mezzanine(url: str, source_path: str, out_path: str):
+    """
+    Télécharge une vidéo de fond et la transcode au format mezzanine. Si le MP4 a son index en tête,
+    le transcodage démarre pendant le téléchargement au lieu d'attendre sa fin.
+    Le fichier source partiel est conservé en cas d'échec pour que la tentative suivante reprenne le transfert.
+    """
+    if not BACKGROUND_PROGRESSIVE_FETCH:
+        download_file(url, source_path, resume=True)
+        _transcode_complete_source(source_path, out_path)
+        return
+
+    download = ProgressiveDownload(url, source_path).start()
+    if is_streamable_mp4(download.read_head(STREAMABLE_PROBE_BYTES)):
+        print("LOG: Vidéo de fond décodable en flux, transcodage pendant le téléchargement...")
+        try:
+            transcode_to_mezzanine('pipe:0', out_path, stdin_chunks=download.follow())
+            download.wait()
+            return
+        except Exception as e:
+            print(f"LOG: Échec du transcodage progressif ({e}). Transcodage après le téléchargement complet...")
+    else:
+        print("LOG: Index MP4 en fin de fichier, transcodage après le téléchargement complet...")
+
+    download.wait()
+    _transcode_complete_source(source_path, out_path)
+
+def _transcode_complete_source(source_path: str, out_path: str):
+    try:
+        transcode_to_mezzanine(source_path, out_path)
+    except Exception:
+        # Source complète mais illisible : ne pas la reprendre telle quelle à la prochaine tentative
+        os.remove(source_path)
+        raise
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _acquire_file_lock(lock_path: str, watched_paths: tuple) -> bool:
+    """
+    Prend le verrou inter-processus. Retourne False si un autre worker télécharge déjà le fichier
+    (après avoir attendu la fin de son téléchargement), True si ce processus doit télécharger.
+    """
+    waited = False
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+        except FileExistsError:
+            pass
+
+        if not waited:
+            print("LOG: Vidéo de fond en cours de téléchargement par un autre worker, attente...")
+            _count("waits")
+            waited = True
+
+        # Un verrou dont le téléchargement ne progresse plus est considéré comme abandonné
+        try:
+            last_activity = max(
+                os.path.getmtime(path) for path in (lock_path,) + watched_paths if os.path.exists(path)
+            )
+            if time.time() - last_activity > BACKGROUND_CACHE_LOCK_TIMEOUT:
+                print("LOG: Verrou de téléchargement abandonné, reprise du téléchargement.")
+                os.remove(lock_path)
+                continue
+        except (ValueError, FileNotFoundError):
+            # Verrou libéré entre-temps
+            continue
+
+        time.sleep(0.5)
+        if not os.path.exists(lock_path):
+            return False
+
+def _touch(path: str):
+    """
+    Met à jour la date d'accès/modification utilisée pour l'éviction LRU.
+    """
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+def evict_backgrounds(keep: str = None):
+    """
+    Supprime les vidéos les moins récemment utilisées tant que le cache dépasse sa taille maximale.
+    """
+    entries = []
+    for name in os.listdir(BACKGROUND_CACHE_DIR):
+        path = os.path.join(BACKGROUND_CACHE_DIR, name)
+        if name.endswith('.mp4') and os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= BACKGROUND_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            _count("evictions")
+            print(f"LOG: Vidéo de fond évincée du cache : {path}")
+        except OSError as e:
+            # Fichier encore ouvert par un rendu (Windows) : on le garde pour cette fois
+            print(f"LOG: Impossible d'évincer {path}: {e}")
+
+def get_cached_background(url: str) -> str:
+    """
+    Retourne le chemin local d'une vidéo de fond, en ne la téléchargeant qu'une seule fois
+    même si plusieurs workers la demandent en même temps.
+    """
+    key = background_cache_key(url)
+    final_path = os.path.join(BACKGROUND_CACHE_DIR, f"{key}.mp4")
+    part_path = final_path + ".part"
+    source_path = final_path + ".source"
+    lock_path = final_path + ".lock"
+
+    with _key_lock(key):
+        while True:
+            if os.path.exists(final_path):
+                _count("hits")
+                _count("bytes_saved", os.path.getsize(final_path))
+                _touch(final_path)
+                print(f"LOG: Vidéo de fond trouvée dans le cache : {final_path}")
+                return final_path
+
+            # Le téléchargement puis le transcodage font progresser ces fichiers
+            if _acquire_file_lock(lock_path, (source_path, part_path)):
+                break
+            # Un autre worker vient de terminer (ou d'échouer) : revérifier le cache
+
+        try:
+            # Le fichier a pu être ajouté juste avant la prise du verrou
+            if not os.path.exists(final_path):
+                _count("misses")
+                print("LOG: Vidéo de fond absente du cache, téléchargement...")
+                if BACKGROUND_MEZZANINE_ENABLED:
+                    fetch_mezzanine(url, source_path, part_path)
+                    _count("bytes_downloaded", os.path.getsize(source_path))
+                else:
+                    download_file(url, part_path, resume=True)
+                    _count("bytes_downloaded", os.path.getsize(part_path))
+                # Renommage atomique : les autres workers ne voient jamais un fichier partiel
+                os.replace(part_path, final_path)
+                evict_backgrounds(keep=final_path)
+            if os.path.exists(source_path):
+                os.remove(source_path)
+            return final_path
+        finally:
+            # Un téléchargement partiel est conservé pour être repris à la prochaine tentative ;
+            # seule une sortie de transcodage incomplète est supprimée.
+            for path in (lock_path, part_path) if BACKGROUND_MEZZANINE_ENABLED else (lock_path,):
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+def background_cache_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    stats["max_bytes"] = BACKGROUND_CACHE_MAX_BYTES
+    return stats
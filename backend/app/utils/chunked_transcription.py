@@ -0,0 +1,128 @@
+# app/utils/chunked_transcription.py
+import multiprocessing
+import os
+import threading
+import uuid
+import wave
+import numpy as np
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List
+from app.core.configs import TEMP_DIR
+from app.core.config_loader import (
+    STT_LONG_MEDIA_SECONDS, STT_CHUNK_SECONDS, STT_CHUNK_MAX_SECONDS, STT_CHUNK_WORKERS, STT_WHISPER_PROCESSES
+)
+from app.core.resources import limit
+from app.utils.ffmpeg_utils import decode_audio_pcm, probe_media
+from app.utils.forced_alignment import SAMPLE_RATE, voiced_regions
+from app.utils.transcript_chunks import plan_chunks, stitch_chunks
+from app.utils.deepgram_utils import transcribe_audio_with_deepgram
+from app.utils.whisper_utils import model_registry
+
+def is_long_media(audio_path: str) -> bool:
+    """
+    Vrai si l'audio est assez long pour être transcrit par morceaux en parallèle.
+    """
+    try:
+        return probe_media(audio_path).get("duration", 0) >= STT_LONG_MEDIA_SECONDS
+    except Exception as e:
+        print(f"LOG: Impossible de lire la durée de {audio_path}: {e}")
+        return False
+
+def _write_wav(path: str, pcm: np.ndarray):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+
+def _transcribe_chunk_with_deepgram(path: str, language: str = None) -> Dict[str, Any]:
+    with limit("deepgram"):
+        return transcribe_audio_with_deepgram(path, lang=language)
+
+def _init_whisper_worker(model_size: str = None):
+    """
+    Initialisation d'un processus du pool : le modèle est chargé une fois pour toute sa durée de vie.
+    """
+    model_registry.preload(model_size, warm_up=False)
+
+def _transcribe_chunk_with_whisper(path: str, language: str = None, model_size: str = None) -> List[Dict[str, Any]]:
+    """
+    Point d'entrée exécuté dans le pool de processus. Contrairement à transcribe_audio_with_whisper,
+    une erreur est levée : un morceau perdu laisserait plusieurs minutes sans sous-titres.
+    """
+    with model_registry.use(model_size) as model:
+        return model_registry.engine.transcribe(model, path, language=language)
+
+# Pools de processus Whisper, un par taille de modèle, gardés pour toute la durée du worker
+_whisper_pools: Dict[str, ProcessPoolExecutor] = {}
+_whisper_pools_lock = threading.Lock()
+
+def _whisper_pool(model_size: str = None) -> ProcessPoolExecutor:
+    with _whisper_pools_lock:
+        pool = _whisper_pools.get(model_size)
+        if pool is None:
+            # "spawn" : ne pas hériter par fork des verrous et de l'état torch/OpenMP d'un serveur multithread
+            pool = _whisper_pools[model_size] = ProcessPoolExecutor(
+                max_workers=STT_WHISPER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_whisper_worker,
+                initargs=(model_size,)
+            )
+        return pool
+
+def _drop_whisper_pool(model_size: str = None):
+    with _whisper_pools_lock:
+        pool = _whisper_pools.pop(model_size, None)
+    if pool:
+        pool.shutdown(wait=False)
+
+def transcribe_in_chunks(audio_path: str, engine: str = "deepgram", language: str = None, model_size: str = None) -> Dict[str, Any]:
+    """
+    Transcrit un long audio en morceaux coupés dans les silences (détection d'activité vocale par énergie),
+    en parallèle : requêtes Deepgram concurrentes, ou pool de processus pour Whisper.
+    Retourne {"words": [...], "detected_language": ...} comme transcribe_audio_with_deepgram,
+    avec des timings absolus et sans doublon aux coupures.
+    """
+    pcm = np.frombuffer(decode_audio_pcm(audio_path, SAMPLE_RATE), dtype='<i2')
+    duration = len(pcm) / SAMPLE_RATE
+    regions = voiced_regions(pcm.astype(np.float32) / 32768.0, SAMPLE_RATE)
+    chunks = plan_chunks(regions, duration, STT_CHUNK_SECONDS, STT_CHUNK_MAX_SECONDS)
+    print(f"LOG: Transcription par morceaux ({engine}) : {duration:.0f}s d'audio en {len(chunks)} morceaux.")
+
+    base_name = uuid.uuid4().hex[:10]
+    paths = []
+    try:
+        for index, chunk in enumerate(chunks):
+            path = os.path.join(TEMP_DIR, f"stt_{base_name}_{index}.wav")
+            _write_wav(path, pcm[int(chunk["start"] * SAMPLE_RATE):int(chunk["end"] * SAMPLE_RATE)])
+            paths.append(path)
+
+        if engine == "deepgram":
+            with ThreadPoolExecutor(max_workers=STT_CHUNK_WORKERS, thread_name_prefix="stt") as executor:
+                responses = list(executor.map(lambda path: _transcribe_chunk_with_deepgram(path, language), paths))
+            chunk_words = [response.get("words", []) for response in responses]
+            languages = Counter(response.get("detected_language") for response in responses if response.get("detected_language"))
+            detected_language = languages.most_common(1)[0][0] if languages else ""
+        elif engine == "whisper":
+            try:
+                chunk_words = list(_whisper_pool(model_size).map(_transcribe_chunk_with_whisper, paths,
+                                                                 [language] * len(paths), [model_size] * len(paths)))
+            except BrokenProcessPool:
+                # Un processus est mort (mémoire...) : recréer le pool à la prochaine demande
+                _drop_whisper_pool(model_size)
+                raise
+            detected_language = language or ""
+        else:
+            raise Exception(f"Moteur de transcription inconnu : '{engine}'.")
+    finally:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    words = stitch_chunks(list(zip(chunks, chunk_words)))
+    print(f"LOG: Transcription par morceaux terminée, {len(words)} mots.")
+    return {"words": words, "detected_language": detected_language}
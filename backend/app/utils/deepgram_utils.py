@@ -1,7 +1,9 @@
 # app/utils/deepgram_utils.py
 import os
+import requests
 from deepgram import DeepgramClient, SpeakOptions, PrerecordedOptions
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable
+from app.core.config_loader import DEEPGRAM_API_KEY, DEEPGRAM_API_URL
 
 # Initialiser le client Deepgram une seule fois
 # Le SDK lira automatiquement la variable d'environnement DEEPGRAM_API_KEY
@@ -46,6 +48,30 @@ def generate_audio_with_deepgram(text: str, lang: str = 'en') -> Dict[str, Any]:
         print(f"LOG: Erreur lors de la génération audio avec Deepgram: {e}")
         raise
 
+def parse_transcription(response_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extrait les mots (avec leurs timings) et la langue détectée d'une réponse de l'API /listen.
+    """
+    words = []
+    detected_language = ""
+    if response_dict.get('results'):
+        channels = response_dict['results'].get('channels', [])
+        if channels:
+            alternatives = channels[0].get('alternatives', [])
+            if alternatives:
+                detected_language = alternatives[0].get('detected_language', '')
+                transcript_words = alternatives[0].get('words', [])
+                for word in transcript_words:
+                    words.append({
+                        'word': word.get('punctuated_word', word.get('word')),
+                        'start': word.get('start'),
+                        'end': word.get('end')
+                    })
+    return {
+        "words": words,
+        "detected_language": detected_language
+    }
+
 def transcribe_audio_with_deepgram(audio_path: str, lang: str = None) -> Dict[str, Any]:
     """
     Transcrire un fichier audio en utilisant le service Speech-to-Text de Deepgram.
@@ -77,31 +103,66 @@ def transcribe_audio_with_deepgram(audio_path: str, lang: str = None) -> Dict[st
             timeout=600 # Timeout de 10 minutes pour les fichiers longs
         )
 
-        response_dict = response.to_dict()
-        
-        # Extraire les informations utiles
-        words = []
-        detected_language = ""
-        if response_dict.get('results'):
-            channels = response_dict['results'].get('channels', [])
-            if channels:
-                alternatives = channels[0].get('alternatives', [])
-                if alternatives:
-                    detected_language = alternatives[0].get('detected_language', '')
-                    transcript_words = alternatives[0].get('words', [])
-                    for word in transcript_words:
-                        words.append({
-                            'word': word.get('punctuated_word', word.get('word')),
-                            'start': word.get('start'),
-                            'end': word.get('end')
-                        })
-
-        print(f"LOG: Transcription Deepgram réussie, {len(words)} mots trouvés. Langue détectée: {detected_language}")
-        return {
-            "words": words,
-            "detected_language": detected_language
-        }
+        result = parse_transcription(response.to_dict())
+        print(f"LOG: Transcription Deepgram réussie, {len(result['words'])} mots trouvés. Langue détectée: {result['detected_language']}")
+        return result
 
     except Exception as e:
         print(f"LOG: Erreur lors de la transcription avec Deepgram: {e}")
         raise
+
+def transcribe_stream_with_deepgram(chunks: Iterable[bytes], lang: str = None, sample_rate: int = 16000,
+                                    on_word: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+    """
+    Transcrire de l'audio PCM 16 bits mono envoyé en flux (transfert HTTP chunked) à mesure qu'il est produit,
+    sans jamais charger tout le fichier en mémoire. `on_word` est appelé pour chaque mot reçu.
+    Retourne le même format que transcribe_audio_with_deepgram.
+    """
+    if not DEEPGRAM_API_KEY:
+        raise Exception("Clé API Deepgram non configurée.")
+
+    params = {
+        "model": "nova-2",
+        "smart_format": "true",
+        "punctuate": "true",
+        "utterances": "true",
+        "diarize": "true",
+        "encoding": "linear16",
+        "sample_rate": str(sample_rate),
+        "channels": "1"
+    }
+    if lang:
+        params["language"] = lang
+    else:
+        params["detect_language"] = "true"
+
+    print(f"LOG: Envoi en flux de l'audio à Deepgram ({DEEPGRAM_API_URL})...")
+    sent = 0
+
+    def counted():
+        nonlocal sent
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+
+    try:
+        # Un générateur comme corps de requête : requests l'envoie en Transfer-Encoding: chunked
+        response = requests.post(
+            DEEPGRAM_API_URL,
+            params=params,
+            headers={"Authorization": f"Token {DEEPGRAM_API_KEY}", "Content-Type": "application/octet-stream"},
+            data=counted(),
+            timeout=(10, 600)
+        )
+        response.raise_for_status()
+        result = parse_transcription(response.json())
+    except Exception as e:
+        print(f"LOG: Erreur lors de la transcription en flux avec Deepgram: {e}")
+        raise
+
+    if on_word:
+        for word in result["words"]:
+            on_word(word)
+    print(f"LOG: Transcription Deepgram en flux réussie ({sent} octets envoyés), {len(result['words'])} mots trouvés. "
+          f"Langue détectée: {result['detected_language']}")
+    return result
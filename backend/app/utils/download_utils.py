@@ -0,0 +1,158 @@
+# app/utils/download_utils.py
+import os
+import struct
+import threading
+import time
+import requests
+from typing import Callable, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT = (10, 60)  # (connexion, lecture) : un transfert bloqué est repris plutôt qu'attendu indéfiniment
+
+def download_file(url: str, local_path: str, resume: bool = False, max_retries: int = 3,
+                  on_restart: Callable[[], None] = None):
+    """
+    Télécharge un fichier depuis une URL et l'enregistre localement.
+    Avec `resume=True`, un fichier partiel existant est complété avec une requête HTTP Range,
+    et un transfert interrompu reprend là où il s'est arrêté au lieu de recommencer.
+    `on_restart` est appelé si le fichier doit être réécrit depuis le début.
+    """
+    print(f"LOG: Téléchargement du fichier depuis {url}...")
+    retry_delay = 2
+
+    for attempt in range(max_retries):
+        offset = os.path.getsize(local_path) if resume and os.path.exists(local_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with requests.get(url, stream=True, headers=headers, timeout=DOWNLOAD_TIMEOUT) as response:
+                if offset and response.status_code == 416:
+                    # Plage non satisfiable : le fichier local est déjà complet
+                    print("LOG: Téléchargement déjà complet.")
+                    return
+                response.raise_for_status() # Lève une exception pour les codes d'erreur HTTP
+
+                if offset and response.status_code != 206:
+                    print("LOG: Le serveur ne gère pas les requêtes Range, téléchargement depuis le début.")
+                    offset = 0
+                    if on_restart:
+                        on_restart()
+                elif offset:
+                    print(f"LOG: Reprise du téléchargement à l'octet {offset}.")
+
+                with open(local_path, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        # Rendre les octets visibles aux lecteurs du fichier en cours de téléchargement
+                        f.flush()
+            print("LOG: Téléchargement terminé.")
+            return
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            if resume and attempt < max_retries - 1:
+                print(f"LOG: Téléchargement interrompu ({e}). Reprise dans {retry_delay} secondes...")
+                time.sleep(retry_delay)
+                retry_delay *= 2  # Backoff exponentiel
+                continue
+            print(f"LOG: Erreur lors du téléchargement: {e}")
+            raise
+        except requests.exceptions.RequestException as e:
+            print(f"LOG: Erreur lors du téléchargement: {e}")
+            raise
+
+def is_streamable_mp4(head: bytes) -> Optional[bool]:
+    """
+    Indique si un MP4 peut être décodé pendant son téléchargement, c'est-à-dire si l'atome `moov`
+    (index) précède les données `mdat`. Retourne None si l'en-tête fourni ne suffit pas à le dire.
+    """
+    position = 0
+    while position + 8 <= len(head):
+        size, box_type = struct.unpack('>I4s', head[position:position + 8])
+        if box_type == b'moov':
+            return True
+        if box_type == b'mdat':
+            return False
+        if size == 1:
+            if position + 16 > len(head):
+                return None
+            size = struct.unpack('>Q', head[position + 8:position + 16])[0]
+        if size < 8:
+            return False
+        position += size
+    return None
+
+class ProgressiveDownload:
+    """
+    Téléchargement en arrière-plan dont le fichier peut être lu pendant qu'il se remplit,
+    pour que le décodage des premières secondes chevauche le téléchargement du reste.
+    """
+    def __init__(self, url: str, local_path: str):
+        self.url = url
+        self.local_path = local_path
+        self.error = None
+        self.restarted = False
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "ProgressiveDownload":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            download_file(self.url, self.local_path, resume=True, on_restart=self._on_restart)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def _on_restart(self):
+        self.restarted = True
+
+    def wait(self):
+        """
+        Attend la fin du téléchargement et relance son éventuelle erreur.
+        """
+        self._done.wait()
+        if self.error:
+            raise self.error
+
+    def _size(self) -> int:
+        return os.path.getsize(self.local_path) if os.path.exists(self.local_path) else 0
+
+    def read_head(self, n_bytes: int) -> bytes:
+        """
+        Attend que les `n_bytes` premiers octets soient disponibles (ou la fin du téléchargement) et les retourne.
+        """
+        while self._size() < n_bytes and not self._done.is_set():
+            time.sleep(0.05)
+        if not os.path.exists(self.local_path):
+            return b''
+        with open(self.local_path, 'rb') as f:
+            return f.read(n_bytes)
+
+    def follow(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Lit le fichier au fur et à mesure de son téléchargement, jusqu'à sa fin.
+        """
+        while not os.path.exists(self.local_path) and not self._done.is_set():
+            time.sleep(0.05)
+        if self.error:
+            raise self.error
+
+        with open(self.local_path, 'rb') as f:
+            while True:
+                if self.restarted:
+                    raise Exception("Le téléchargement a redémarré depuis le début, lecture progressive abandonnée.")
+                chunk = f.read(chunk_size)
+                if chunk:
+                    yield chunk
+                    continue
+                if self._done.is_set():
+                    # Dernière lecture : des octets ont pu être écrits juste avant la fin
+                    chunk = f.read()
+                    if chunk:
+                        yield chunk
+                    if self.error:
+                        raise self.error
+                    return
+                time.sleep(0.05)
@@ -0,0 +1,302 @@
+# app/utils/ffmpeg_renderer.py
+import multiprocessing
+import os
+import shutil
+import subprocess
+import uuid
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Tuple
+from PIL import Image
+from app.core.configs import FPS, WIDTH, HEIGHT, TEMP_DIR
+from app.core.config_loader import RENDER_MAX_WORKERS, PARALLEL_MIN_SEGMENT_SECONDS
+from app.utils.ffmpeg_utils import ffmpeg_command, probe_media, run_ffmpeg
+from app.utils.subtitle_utils import blend_sprite, prepare_subtitle_sprites
+from app.utils.subtitle_timeline import SubtitleTimeline
+
+def count_frames(duration: float, fps: int = FPS) -> int:
+    """
+    Nombre d'images écrites pour une durée donnée, comme `iter_frames` de MoviePy.
+    """
+    return len(np.arange(0, duration, 1.0 / fps))
+
+def _read_frame(stream, buffer: memoryview) -> bool:
+    """
+    Remplit entièrement le tampon avec la prochaine image brute. Retourne False en fin de flux.
+    """
+    filled = 0
+    while filled < len(buffer):
+        n = stream.readinto(buffer[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+class SourceFrameReader:
+    """
+    Lit la vidéo de fond comme le FFMPEG_VideoReader de MoviePy, pour que les deux moteurs
+    montrent les mêmes images : décodage à la cadence d'origine, conversion RGB bicubique par ffmpeg,
+    image de l'instant t = numéro int(fps * t + 0.00001), dernière image répétée en fin de flux.
+    Un retour en arrière (boucle) ou un saut de plus de 100 images relance ffmpeg sur l'image voulue.
+    """
+    def __init__(self, path: str):
+        infos = probe_media(path)
+        self.path = path
+        self.size = tuple(infos['video_size'])
+        self.fps = infos['video_fps']
+        self.duration = infos['duration']
+        self.buffer = bytearray(self.size[0] * self.size[1] * 3)
+        self.view = memoryview(self.buffer)
+        self.frame = np.frombuffer(self.buffer, dtype=np.uint8).reshape((self.size[1], self.size[0], 3))
+        self.process = None
+        self.index = -1  # Numéro de l'image présente dans le tampon
+        self.has_frame = False
+
+    def frame_index(self, t: float) -> int:
+        return int(self.fps * t + 0.00001)
+
+    def _open(self, index: int):
+        self.close()
+        # Recherche précise : ffmpeg décode depuis l'image clé précédente et ne garde que les images
+        # à partir de `index` (le demi-intervalle absorbe l'arrondi des horodatages)
+        seek = max(0.0, (index - 0.5) / self.fps)
+        self.process = subprocess.Popen(ffmpeg_command([
+            '-ss', f'{seek:.6f}', '-i', self.path, '-an',
+            '-vf', f'scale={self.size[0]}:{self.size[1]}', '-sws_flags', 'bicubic',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'
+        ]), stdout=subprocess.PIPE)
+        self.index = index - 1
+
+    def frame_at(self, t: float) -> np.ndarray:
+        index = self.frame_index(t)
+        if self.process is None or index < self.index or index > self.index + 100:
+            self._open(index)
+        while self.index < index:
+            if not _read_frame(self.process.stdout, self.view):
+                if not self.has_frame:
+                    raise Exception(f"Le décodage du fond n'a produit aucune image à t={t:.3f}s.")
+                # Fin du flux avant l'image attendue : MoviePy répète la dernière image lue
+                self.index = index
+                break
+            self.has_frame = True
+            self.index += 1
+        return self.frame
+
+    def close(self):
+        if self.process:
+            if self.process.poll() is None:
+                self.process.kill()
+                self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+
+def render_frames(background_path: str, words_timing: List[Dict[str, Any]], out_video: str, duration: float,
+                  audio_path: str = None, use_original_audio: bool = False,
+                  start_time: float = 0.0, n_frames: int = None, total_duration: float = None,
+                  progress_callback=None):
+    """
+    Décode la vidéo de fond avec ffmpeg, incruste les sous-titres dans un tampon NumPy réutilisé
+    et envoie les images brutes à un processus ffmpeg/libx264 qui reste ouvert pendant tout le rendu.
+
+    Les images sont choisies et redimensionnées comme dans le chemin MoviePy (`SourceFrameReader`,
+    puis Lanczos de PIL comme `resize`), et le fond boucle comme `loop` s'il est plus court que la vidéo.
+    `start_time` permet de ne rendre qu'un segment de la timeline (les timings de mots sont alors
+    relatifs au début du segment) ; `total_duration` est la durée de la vidéo complète.
+    `progress_callback(fraction)` est appelé environ une fois par seconde de vidéo écrite.
+    """
+    n_frames = n_frames if n_frames is not None else count_frames(duration)
+    total_duration = total_duration if total_duration is not None else start_time + duration
+    subtitles = SubtitleTimeline(prepare_subtitle_sprites(words_timing, size=(WIDTH, HEIGHT)))
+    print(f"LOG: Rendu ffmpeg de {n_frames} images avec {len(subtitles)} sous-titres...")
+
+    source = SourceFrameReader(background_path)
+    # Comme make_video_from_assets : boucle si le fond est plus court, sinon simple coupe
+    loop_duration = source.duration if source.duration < total_duration else None
+    resize = source.size != (WIDTH, HEIGHT)
+
+    encoder_args = [
+        '-y',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{WIDTH}x{HEIGHT}', '-r', str(FPS), '-i', '-'
+    ]
+    if use_original_audio:
+        encoder_args += ['-i', background_path, '-map', '0:v', '-map', '1:a:0?']
+    elif audio_path:
+        encoder_args += ['-i', audio_path, '-map', '0:v', '-map', '1:a:0']
+    # Mêmes réglages d'encodage que write_videofile de MoviePy
+    encoder_args += ['-c:v', 'libx264', '-preset', 'medium', '-pix_fmt', 'yuv420p']
+    if use_original_audio or audio_path:
+        encoder_args += ['-c:a', 'aac', '-t', f'{duration:.3f}']
+    else:
+        encoder_args += ['-an']
+    encoder_args += [out_video]
+    encoder_cmd = ffmpeg_command(encoder_args)
+
+    encoder = subprocess.Popen(encoder_cmd, stdin=subprocess.PIPE)
+    try:
+        # Un seul tampon de sortie pour toute la durée du rendu : une image source peut servir plusieurs
+        # fois (fond à une cadence plus basse), les sous-titres sont donc incrustés sur une copie
+        buffer = bytearray(WIDTH * HEIGHT * 3)
+        frame = np.frombuffer(buffer, dtype=np.uint8).reshape((HEIGHT, WIDTH, 3))
+        view = memoryview(buffer)
+
+        for index in range(n_frames):
+            t = start_time + index / FPS
+            source_frame = source.frame_at(t % loop_duration if loop_duration else t)
+            if resize:
+                np.copyto(frame, np.asarray(Image.fromarray(source_frame).resize((WIDTH, HEIGHT), Image.LANCZOS)))
+            else:
+                np.copyto(frame, source_frame)
+            for subtitle in subtitles.at(index / FPS):
+                blend_sprite(frame, subtitle["sprite"], subtitle["position"])
+            encoder.stdin.write(view)
+            if progress_callback and ((index + 1) % FPS == 0 or index + 1 == n_frames):
+                progress_callback((index + 1) / n_frames)
+
+        encoder.stdin.close()
+        if encoder.wait() != 0:
+            raise Exception(f"L'encodage ffmpeg a échoué (code {encoder.returncode}).")
+    finally:
+        source.close()
+        if encoder.poll() is None:
+            encoder.kill()
+            encoder.wait()
+
+    return out_video
+
+def _output_duration(background_path: str, audio_path: str, use_original_audio: bool) -> float:
+    """
+    La vidéo finale dure autant que la piste audio utilisée.
+    """
+    if use_original_audio:
+        infos = probe_media(background_path)
+        if not infos.get('audio_found'):
+            raise Exception("Impossible de charger le clip audio.")
+        return infos['duration']
+    return probe_media(audio_path)['duration']
+
+def render_video_with_ffmpeg(background_path: str, audio_path: str, words_timing: List[Dict[str, Any]], out_video: str,
+                             use_original_audio: bool = False, progress_callback=None):
+    """
+    Moteur de rendu alternatif à CompositeVideoClip : même résultat, sans passer par MoviePy image par image.
+    """
+    duration = _output_duration(background_path, audio_path, use_original_audio)
+
+    print("LOG: Écriture de la vidéo finale avec le moteur ffmpeg...")
+    return render_frames(background_path, words_timing, out_video, duration,
+                         audio_path=audio_path, use_original_audio=use_original_audio,
+                         progress_callback=progress_callback)
+
+def choose_segment_count(duration: float) -> int:
+    """
+    Nombre de segments à rendre en parallèle selon la durée de la vidéo et les cœurs libres.
+    """
+    cpu_count = os.cpu_count() or 1
+    free_cores = cpu_count
+    if hasattr(os, 'getloadavg'):
+        # Ne compter que les cœurs qui ne sont pas déjà occupés par d'autres rendus
+        free_cores = max(1, int(cpu_count - os.getloadavg()[0]))
+    max_workers = RENDER_MAX_WORKERS or cpu_count
+    by_duration = int(duration // PARALLEL_MIN_SEGMENT_SECONDS)
+    return max(1, min(free_cores, max_workers, by_duration))
+
+def plan_segments(n_frames: int, n_segments: int) -> List[Tuple[int, int]]:
+    """
+    Découpe la timeline en segments (première image, nombre d'images) alignés sur des multiples de FPS,
+    c'est-à-dire sur des limites d'une seconde où chaque segment commence par une image clé.
+    """
+    n_segments = max(1, min(n_segments, n_frames // FPS or 1))
+    seconds = -(-n_frames // FPS)
+    boundaries = [round(i * seconds / n_segments) * FPS for i in range(n_segments)] + [n_frames]
+    return [(boundaries[i], boundaries[i + 1] - boundaries[i])
+            for i in range(n_segments) if boundaries[i + 1] > boundaries[i]]
+
+def _words_for_segment(words_timing: List[Dict[str, Any]], start: float, end: float) -> List[Dict[str, Any]]:
+    """
+    Sélectionne les mots visibles pendant [start, end) avec des timings relatifs au début du segment.
+    """
+    subset = []
+    for item in words_timing or []:
+        word_start, word_end = item.get('start'), item.get('end')
+        if word_start is None or word_end is None or word_end <= start or word_start >= end:
+            continue
+        subset.append({
+            'word': item.get('word') or item.get('punctuated_word'),
+            'start': word_start - start,
+            'end': word_end - start
+        })
+    return subset
+
+def _render_segment(job: Dict[str, Any]) -> str:
+    """
+    Point d'entrée exécuté dans le pool de processus pour rendre un segment (vidéo seule).
+    """
+    return render_frames(
+        job["background_path"], job["words_timing"], job["out_video"], job["n_frames"] / FPS,
+        start_time=job["start_time"], n_frames=job["n_frames"], total_duration=job["total_duration"]
+    )
+
+def render_video_parallel(background_path: str, audio_path: str, words_timing: List[Dict[str, Any]], out_video: str,
+                          use_original_audio: bool = False, n_segments: int = None, progress_callback=None):
+    """
+    Rend la vidéo en plusieurs segments en parallèle (pool de processus), les assemble avec le
+    démultiplexeur concat de ffmpeg sans ré-encodage puis ajoute l'audio en une seule fois.
+    """
+    duration = _output_duration(background_path, audio_path, use_original_audio)
+    n_frames = count_frames(duration)
+    segments = plan_segments(n_frames, n_segments or choose_segment_count(duration))
+
+    if len(segments) <= 1:
+        print("LOG: Vidéo trop courte ou aucun cœur libre : rendu en un seul segment.")
+        return render_frames(background_path, words_timing, out_video, duration,
+                             audio_path=audio_path, use_original_audio=use_original_audio,
+                             progress_callback=progress_callback)
+
+    segments_dir = os.path.join(TEMP_DIR, f"segments_{uuid.uuid4().hex}")
+    os.makedirs(segments_dir, exist_ok=True)
+
+    try:
+        jobs = []
+        for index, (first_frame, frame_count) in enumerate(segments):
+            start = first_frame / FPS
+            jobs.append({
+                "background_path": background_path,
+                "words_timing": _words_for_segment(words_timing, start, (first_frame + frame_count) / FPS),
+                "out_video": os.path.join(segments_dir, f"segment_{index:03d}.mp4"),
+                "start_time": start,
+                "n_frames": frame_count,
+                "total_duration": duration
+            })
+
+        print(f"LOG: Rendu parallèle de {len(jobs)} segments...")
+        rendered_frames = 0
+        # "spawn" : un processus forké depuis un serveur multithread peut hériter d'un verrou
+        # (cache de sprites ou de polices) tenu par un autre rendu et rester bloqué
+        with ProcessPoolExecutor(max_workers=len(jobs), mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {executor.submit(_render_segment, job): job for job in jobs}
+            for future in as_completed(futures):
+                future.result()
+                rendered_frames += futures[future]["n_frames"]
+                if progress_callback:
+                    progress_callback(rendered_frames / n_frames)
+        segment_paths = [job["out_video"] for job in jobs]
+
+        list_path = os.path.join(segments_dir, "segments.txt")
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for path in segment_paths:
+                f.write(f"file '{os.path.basename(path)}'\n")
+
+        # Les segments partagent les mêmes paramètres d'encodage : concaténation sans ré-encodage,
+        # l'audio est multiplexé une seule fois sur la timeline complète pour éviter toute dérive.
+        print("LOG: Assemblage des segments et ajout de l'audio...")
+        audio_source = background_path if use_original_audio else audio_path
+        run_ffmpeg([
+            '-f', 'concat', '-safe', '0', '-i', list_path,
+            '-i', audio_source,
+            '-map', '0:v', '-map', '1:a:0',
+            '-c:v', 'copy', '-c:a', 'aac', '-t', f'{duration:.3f}',
+            out_video
+        ])
+        return out_video
+
+    finally:
+        shutil.rmtree(segments_dir, ignore_errors=True)
@@ -0,0 +1,136 @@
+# app/utils/ffmpeg_utils.py
+# Importer config_loader en premier pour configurer MoviePy avant de lire ses réglages
+from app.core import config_loader
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+import os
+import re
+import subprocess
+import threading
+import wave
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+# Utiliser le même binaire ffmpeg que MoviePy (imageio-ffmpeg ou FFMPEG_BINARY)
+FFMPEG_BINARY = get_setting("FFMPEG_BINARY")
+
+def ffmpeg_command(args: List[str]) -> List[str]:
+    """
+    Construit une ligne de commande ffmpeg silencieuse (seules les erreurs sont affichées).
+    """
+    return [FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-nostdin'] + args
+
+def _feed_stdin(process: subprocess.Popen, chunks: Iterable[bytes], errors: list):
+    try:
+        for chunk in chunks:
+            process.stdin.write(chunk)
+    except BrokenPipeError:
+        pass  # ffmpeg s'est arrêté : son code de retour porte l'erreur
+    except Exception as e:
+        errors.append(e)
+    finally:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+def run_ffmpeg(args: List[str], cwd: str = None, stdin_chunks: Iterable[bytes] = None):
+    """
+    Exécute ffmpeg jusqu'au bout et lève une exception avec sa sortie d'erreur en cas d'échec.
+    `stdin_chunks` alimente l'entrée standard (entrée 'pipe:0') depuis un thread dédié.
+    """
+    if stdin_chunks is None:
+        result = subprocess.run(ffmpeg_command(['-y'] + args), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, cwd=cwd)
+        returncode, stderr = result.returncode, result.stderr
+    else:
+        process = subprocess.Popen(ffmpeg_command(['-y'] + args), stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, cwd=cwd)
+        feed_errors = []
+        feeder = threading.Thread(target=_feed_stdin, args=(process, stdin_chunks, feed_errors), daemon=True)
+        feeder.start()
+        stderr = process.stderr.read()
+        returncode = process.wait()
+        feeder.join()
+        if feed_errors:
+            raise feed_errors[0]
+
+    if returncode != 0:
+        error = stderr.decode('utf-8', errors='replace').strip()
+        raise Exception(f"ffmpeg a échoué (code {returncode}): {error}")
+
+def probe_media(path: str) -> Dict[str, Any]:
+    """
+    Retourne les informations d'un fichier média (durée, taille, fps, présence d'audio...).
+    """
+    return ffmpeg_parse_infos(path)
+
+def probe_audio_codec(path: str) -> Optional[str]:
+    """
+    Nom du codec de la première piste audio (ex. 'aac', 'opus', 'pcm_s16le'), ou None si introuvable.
+    """
+    # Sans fichier de sortie, ffmpeg se termine en erreur après avoir décrit les flux d'entrée
+    result = subprocess.run([FFMPEG_BINARY, '-hide_banner', '-nostdin', '-i', path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    match = re.search(r"Stream #\d+:\d+.*?: Audio: (\w+)", result.stderr.decode('utf-8', errors='replace'))
+    return match.group(1) if match else None
+
+def decode_audio_pcm(path: str, sample_rate: int = 16000) -> bytes:
+    """
+    Décode la piste audio d'un fichier en PCM 16 bits mono à `sample_rate` Hz (octets bruts, little-endian).
+    """
+    result = subprocess.run(
+        ffmpeg_command(['-i', path, '-vn', '-map', '0:a:0', '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1']),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', errors='replace').strip()
+        raise Exception(f"ffmpeg a échoué (code {result.returncode}): {error}")
+    return result.stdout
+
+def extract_audio_for_stt(video_path: str, out_path: str, sample_rate: int = 16000, audio_format: str = "wav"):
+    """
+    Extrait la piste audio directement au format utilisé par la reconnaissance vocale, en un seul appel ffmpeg :
+    mono à `sample_rate` Hz, en WAV PCM 16 bits ou en Opus (encore plus compact pour l'envoi à Deepgram).
+    """
+    codec_args = ['-c:a', 'libopus', '-b:a', '24k'] if audio_format == "opus" else ['-c:a', 'pcm_s16le']
+    run_ffmpeg(['-i', video_path, '-vn', '-sn', '-dn', '-map', '0:a:0', '-ac', '1', '-ar', str(sample_rate)] + codec_args + [out_path])
+
+def stream_audio_pcm(path: str, sample_rate: int = 16000, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Décode la piste audio en PCM 16 bits mono et la produit par blocs au fil du décodage,
+    pour l'envoyer (ou la hacher) sans attendre la fin de l'extraction ni tout garder en mémoire.
+    """
+    process = subprocess.Popen(
+        ffmpeg_command(['-i', path, '-vn', '-map', '0:a:0', '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1']),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        stderr = process.stderr.read()
+        returncode = process.wait()
+        if returncode != 0:
+            error = stderr.decode('utf-8', errors='replace').strip()
+            raise Exception(f"ffmpeg a échoué (code {returncode}): {error}")
+    finally:
+        # Le consommateur peut s'arrêter avant la fin (erreur réseau) : ne pas laisser ffmpeg tourner
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+def tee_pcm_to_wav(chunks: Iterable[bytes], wav_path: str, sample_rate: int = 16000) -> Iterator[bytes]:
+    """
+    Laisse passer les blocs PCM tout en les écrivant dans un fichier WAV. Le fichier n'apparaît
+    sous `wav_path` qu'une fois le flux entièrement lu (sinon seul `wav_path`.part reste).
+    """
+    part_path = f"{wav_path}.part"
+    with wave.open(part_path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        for chunk in chunks:
+            wav_file.writeframes(chunk)
+            yield chunk
+    os.replace(part_path, wav_path)
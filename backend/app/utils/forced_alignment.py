@@ -0,0 +1,62 @@
+# app/utils/forced_alignment.py
+import numpy as np
+from typing import Any, Dict, List, Tuple
+from app.utils.ffmpeg_utils import decode_audio_pcm
+from app.utils.alignment_utils import alignment_is_plausible, distribute_words, script_words
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+MIN_SILENCE_SECONDS = 0.12  # Pause plus courte : considérée comme faisant partie de la parole
+MIN_VOICED_SECONDS = 0.05   # Zone de parole plus courte : bruit ignoré
+
+def voiced_regions(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Tuple[float, float]]:
+    """
+    Détection d'activité vocale par énergie : une trame de 20 ms est voisée si son niveau RMS dépasse
+    un seuil placé entre le bruit de fond et le niveau de la parole. Les courtes pauses sont fusionnées.
+    """
+    frame = int(sample_rate * FRAME_SECONDS)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return []
+    rms = np.sqrt(np.mean(samples[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    noise, speech = np.percentile(rms, 10), np.percentile(rms, 90)
+    if speech <= 0:
+        return []
+    voiced = rms > max(noise + 0.1 * (speech - noise), 1e-4)
+
+    regions = []
+    start = None
+    for index, active in enumerate(voiced):
+        if active and start is None:
+            start = index
+        elif not active and start is not None:
+            regions.append([start * FRAME_SECONDS, index * FRAME_SECONDS])
+            start = None
+    if start is not None:
+        regions.append([start * FRAME_SECONDS, n_frames * FRAME_SECONDS])
+
+    merged: List[List[float]] = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] < MIN_SILENCE_SECONDS:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+    return [(start, end) for start, end in merged if end - start >= MIN_VOICED_SECONDS]
+
+def align_script_to_audio(script: str, audio_path: str) -> List[Dict[str, Any]]:
+    """
+    Alignement forcé local d'un script connu sur l'audio synthétisé, sans réseau ni modèle de reconnaissance.
+    Heuristique (pas d'alignement phonétique) : les mots du script sont répartis sur les zones de parole
+    détectées, proportionnellement à leur longueur. Les mots gardent l'orthographe exacte du script.
+    Retourne une liste vide si aucune parole n'est détectée ou si le résultat échoue au contrôle
+    `alignment_is_plausible` : l'appelant passe alors à la transcription.
+    """
+    pcm = decode_audio_pcm(audio_path, SAMPLE_RATE)
+    samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768.0
+    regions = voiced_regions(samples, SAMPLE_RATE)
+    words = script_words(script)
+    timings = distribute_words(words, regions)
+    if timings and not alignment_is_plausible(words, regions, timings):
+        print(f"LOG: Alignement local invraisemblable ({len(regions)} zones de parole pour {len(words)} mots), ignoré.")
+        return []
+    return timings
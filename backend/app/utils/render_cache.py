@@ -0,0 +1,93 @@
+# app/utils/render_cache.py
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+from PIL import ImageFont
+from app.core.config_loader import SUBTITLE_SPRITE_CACHE_SIZE
+
+# Registre des polices partagé par tout le processus : (chemin, taille) -> police chargée
+_fonts: Dict[tuple, Any] = {}
+_fonts_lock = threading.Lock()
+
+def get_font(font_path: str, font_size: int):
+    """
+    Retourne la police demandée en ne la chargeant qu'une seule fois par processus.
+    Utilise la police par défaut de Pillow si le fichier est introuvable.
+    """
+    key = (font_path, font_size)
+    font = _fonts.get(key)
+    if font is not None:
+        return font
+
+    with _fonts_lock:
+        font = _fonts.get(key)
+        if font is None:
+            try:
+                font = ImageFont.truetype(font_path, font_size)
+            except IOError:
+                print(f"LOG: Police '{font_path}' non trouvée, utilisation de la police par défaut.")
+                font = ImageFont.load_default()
+            _fonts[key] = font
+    return font
+
+class LRUCache:
+    """
+    Cache LRU borné et thread-safe qui compte ses succès (hits) et échecs (misses).
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max(0, max_size)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        if not self.max_size:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+
+        # Le rendu se fait hors du verrou pour ne pas bloquer les autres rendus
+        value = factory()
+        self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+# Cache des sprites de mots rendus, partagé par tous les rendus du worker
+sprite_cache = LRUCache(SUBTITLE_SPRITE_CACHE_SIZE)
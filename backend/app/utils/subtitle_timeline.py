@@ -0,0 +1,51 @@
+# app/utils/subtitle_timeline.py
+from bisect import bisect_right
+from typing import List, Dict, Any, Tuple
+
+class SubtitleTimeline:
+    """
+    Index d'intervalles des sous-titres : retrouve les éléments visibles à l'instant t en O(log n).
+
+    La timeline est découpée en intervalles élémentaires entre deux bornes (début ou fin d'un élément),
+    et la liste des éléments actifs est précalculée pour chacun d'eux. Les timings désordonnés ou qui se
+    chevauchent (fréquents avec Whisper) sont acceptés ; les éléments sans durée sont ignorés.
+    Les éléments actifs sont rendus dans leur ordre d'origine, comme les calques d'un CompositeVideoClip.
+    """
+    def __init__(self, items: List[Dict[str, Any]]):
+        intervals = []
+        for index, item in enumerate(items or []):
+            start, end = item.get('start'), item.get('end')
+            if start is None or end is None:
+                continue
+            start, end = max(0.0, float(start)), float(end)
+            if end > start:
+                intervals.append((start, end, index, item))
+
+        self.size = len(intervals)
+        self._bounds: List[float] = sorted({t for start, end, _, _ in intervals for t in (start, end)})
+        self._active: List[Tuple[Dict[str, Any], ...]] = []
+
+        # Balayage des bornes : chaque intervalle élémentaire [bounds[i], bounds[i+1]) garde ses éléments actifs
+        starts = sorted(intervals, key=lambda interval: interval[0])
+        active = {}
+        next_start = 0
+        for bound in self._bounds:
+            while next_start < len(starts) and starts[next_start][0] <= bound:
+                interval = starts[next_start]
+                active[interval[2]] = interval
+                next_start += 1
+            for index in [index for index, interval in active.items() if interval[1] <= bound]:
+                del active[index]
+            self._active.append(tuple(active[index][3] for index in sorted(active)))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def at(self, t: float) -> Tuple[Dict[str, Any], ...]:
+        """
+        Retourne les éléments visibles à l'instant t (début inclus, fin exclue).
+        """
+        position = bisect_right(self._bounds, t) - 1
+        if position < 0:
+            return ()
+        return self._active[position]
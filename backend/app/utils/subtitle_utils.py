@@ -0,0 +1,108 @@
+# app/utils/subtitle_utils.py
+import os
+import numpy as np
+from PIL import Image, ImageDraw
+from typing import List, Dict, Any, Tuple
+from app.core.configs import WIDTH, HEIGHT, BACKEND_DIR
+from app.utils.render_cache import get_font, sprite_cache
+
+# Construire le chemin absolu vers la police en utilisant la racine du projet
+FONT_PATH = os.path.join(BACKEND_DIR, 'assets', 'fonts', 'Montserrat', 'static', 'Montserrat-Bold.ttf')
+
+# Paramètres de style des sous-titres karaoké
+SUBTITLE_FONT_SIZE = 130
+SUBTITLE_VERTICAL_OFFSET = 300  # Décalage vertical depuis le centre. Augmentez cette valeur pour descendre le texte.
+SUBTITLE_BG_PADDING = 15
+SUBTITLE_BG_RADIUS = 10
+SUBTITLE_BG_COLOR = (0, 0, 0, 150)  # Noir avec ~60% d'opacité
+SUBTITLE_TEXT_COLOR = (255, 255, 0)  # Jaune vif pour un bon contraste
+# Tout changement de style doit invalider les sprites en cache
+SUBTITLE_STYLE = (SUBTITLE_VERTICAL_OFFSET, SUBTITLE_BG_PADDING, SUBTITLE_BG_RADIUS, SUBTITLE_BG_COLOR, SUBTITLE_TEXT_COLOR)
+
+def render_subtitle_sprite(text: str, font_path: str = FONT_PATH, size: tuple = (WIDTH, HEIGHT)):
+    """
+    Dessine un mot de sous-titre dans une image RGBA recadrée sur sa boîte englobante.
+    Retourne le tableau NumPy du sprite et sa position (x, y) dans une image de taille `size`.
+    """
+    font = get_font(font_path, SUBTITLE_FONT_SIZE)
+
+    # Obtenir la taille du texte pour le centrer
+    text_bbox = font.getbbox(text)
+    text_width = text_bbox[2] - text_bbox[0]
+    text_height = text_bbox[3] - text_bbox[1]
+
+    # Position du texte dans l'image complète : centré, avec un décalage vers le bas
+    text_x = (size[0] - text_width) / 2
+    text_y = ((size[1] - text_height) / 2) + SUBTITLE_VERTICAL_OFFSET
+
+    # Boîte d'arrière-plan semi-transparente autour du texte
+    bg_box = [
+        text_x - SUBTITLE_BG_PADDING,
+        text_y - SUBTITLE_BG_PADDING,
+        text_x + text_width + SUBTITLE_BG_PADDING,
+        text_y + text_height + SUBTITLE_BG_PADDING
+    ]
+
+    # Le sprite couvre la boîte et les glyphes (qui peuvent déborder sous la boîte),
+    # limité au cadre de l'image. Une origine entière conserve le rendu au pixel près.
+    left = max(0, int(np.floor(bg_box[0])))
+    top = max(0, int(np.floor(bg_box[1])))
+    right = min(size[0], int(np.ceil(max(bg_box[2], text_x + text_bbox[2]))))
+    bottom = min(size[1], int(np.ceil(max(bg_box[3], text_y + text_bbox[3]))))
+
+    img = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+    draw.rounded_rectangle(
+        [bg_box[0] - left, bg_box[1] - top, bg_box[2] - left, bg_box[3] - top],
+        radius=SUBTITLE_BG_RADIUS,
+        fill=SUBTITLE_BG_COLOR
+    )
+    draw.text((text_x - left, text_y - top), text, font=font, fill=SUBTITLE_TEXT_COLOR)
+
+    sprite = np.array(img)
+    # Le sprite est partagé via le cache : le protéger contre toute modification
+    sprite.setflags(write=False)
+    return sprite, (left, top)
+
+def get_subtitle_sprite(text: str, font_path: str = FONT_PATH, size: tuple = (WIDTH, HEIGHT)):
+    """
+    Retourne le sprite d'un mot depuis le cache partagé, en le rendant au premier usage.
+    """
+    key = (text, font_path, SUBTITLE_FONT_SIZE, tuple(size), SUBTITLE_STYLE)
+    return sprite_cache.get_or_create(key, lambda: render_subtitle_sprite(text, font_path=font_path, size=size))
+
+def blend_sprite(frame: np.ndarray, sprite: np.ndarray, position: Tuple[int, int]):
+    """
+    Mélange un sprite RGBA dans une image RGB, en place et uniquement sur la zone du sprite.
+    Reprend le calcul de `blit` de MoviePy pour obtenir exactement les mêmes pixels.
+    """
+    x, y = position
+    frame_height, frame_width = frame.shape[:2]
+    x1, y1 = max(0, x), max(0, y)
+    x2 = min(frame_width, x + sprite.shape[1])
+    y2 = min(frame_height, y + sprite.shape[0])
+    if x1 >= x2 or y1 >= y2:
+        return
+
+    visible = sprite[y1 - y:y2 - y, x1 - x:x2 - x]
+    mask = 1.0 * visible[:, :, 3:4] / 255
+    region = frame[y1:y2, x1:x2]
+    region[...] = (mask * visible[:, :, :3] + (1.0 - mask) * region).astype('uint8')
+
+def prepare_subtitle_sprites(words_timing: List[Dict[str, Any]], size: tuple = (WIDTH, HEIGHT)) -> List[Dict[str, Any]]:
+    """
+    Convertit les timings de mots en liste de sprites positionnés avec leur intervalle d'affichage.
+    """
+    subtitles = []
+    for item in words_timing or []:
+        word = item.get('word') or item.get('punctuated_word')
+        start = item.get('start')
+        end = item.get('end')
+        if word and start is not None and end is not None:
+            try:
+                sprite, position = get_subtitle_sprite(word, size=size)
+            except Exception as e:
+                print(f"LOG: Erreur lors de la création du sous-titre avec Pillow: {e}")
+                continue
+            subtitles.append({"start": start, "end": end, "sprite": sprite, "position": position})
+    return subtitles
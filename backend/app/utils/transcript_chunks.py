@@ -0,0 +1,70 @@
+# app/utils/transcript_chunks.py
+from typing import Any, Dict, List, Tuple
+
+def plan_chunks(regions: List[Tuple[float, float]], duration: float, target_seconds: float,
+                max_seconds: float, overlap_seconds: float = 1.0) -> List[Dict[str, float]]:
+    """
+    Découpe un audio en morceaux d'environ `target_seconds` pour les transcrire séparément.
+    Les coupures tombent au milieu des silences entre zones de parole (`regions`) ; faute de silence
+    avant `max_seconds`, la coupure est forcée et les deux morceaux se recouvrent de `overlap_seconds`.
+    Chaque morceau indique la plage audio à transcrire (start, end) et la plage dont il fait foi
+    (own_start, own_end), qui sert à éliminer les doublons au recollage.
+    """
+    if duration <= 0:
+        return []
+    silences = [(previous[1] + current[0]) / 2 for previous, current in zip(regions, regions[1:])
+                if current[0] > previous[1]]
+
+    cuts: List[Tuple[float, bool]] = []  # (instant, coupure forcée)
+    position = 0.0
+    while duration - position > max_seconds:
+        ideal = position + target_seconds
+        candidates = [s for s in silences if position + target_seconds / 2 < s <= position + max_seconds]
+        if candidates:
+            cut = min(candidates, key=lambda s: abs(s - ideal))
+            cuts.append((cut, False))
+        else:
+            cut = min(ideal, position + max_seconds)
+            cuts.append((cut, True))
+        position = cut
+
+    chunks = []
+    boundaries = [(0.0, False)] + cuts + [(duration, False)]
+    for (own_start, forced_start), (own_end, forced_end) in zip(boundaries, boundaries[1:]):
+        chunks.append({
+            "start": max(0.0, own_start - (overlap_seconds / 2 if forced_start else 0.0)),
+            "end": min(duration, own_end + (overlap_seconds / 2 if forced_end else 0.0)),
+            "own_start": own_start,
+            "own_end": own_end
+        })
+    return chunks
+
+def _normalize(word: str) -> str:
+    return "".join(c for c in word.lower() if c.isalnum())
+
+def stitch_chunks(results: List[Tuple[Dict[str, float], List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    Recolle les mots transcrits morceau par morceau : les timings (relatifs au début du morceau)
+    sont décalés, chaque mot n'est gardé que par le morceau dont la plage propre contient son milieu,
+    et un mot identique répété au même instant de part et d'autre d'une coupure n'est gardé qu'une fois.
+    """
+    words = []
+    last_index = len(results) - 1
+    for index, (chunk, chunk_words) in enumerate(results):
+        for word in chunk_words:
+            start = word["start"] + chunk["start"]
+            end = word["end"] + chunk["start"]
+            middle = (start + end) / 2
+            if middle < chunk["own_start"] and index > 0:
+                continue
+            if middle >= chunk["own_end"] and index < last_index:
+                continue
+            words.append(dict(word, start=start, end=end))
+
+    words.sort(key=lambda w: w["start"])
+    stitched: List[Dict[str, Any]] = []
+    for word in words:
+        if stitched and _normalize(word["word"]) == _normalize(stitched[-1]["word"]) and word["start"] < stitched[-1]["end"]:
+            continue
+        stitched.append(word)
+    return stitched
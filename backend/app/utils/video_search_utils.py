@@ -1,11 +1,98 @@
 # app/utils/video_search_utils.py
+import math
 import requests
 import random
 import time
+from typing import List, Dict, Any, Optional
 from app.core.config_loader import PEXELS_API_KEY
+from app.core.configs import FPS, WIDTH, HEIGHT
+from app.utils.render_cache import LRUCache
 
-def search_pexels_video(query: str) -> str:
+# Métadonnées des fichiers vidéo déjà vus, par URL : évite un nouvel appel à l'API pour les décisions suivantes
+_video_metadata = LRUCache(1024)
+
+# Poids des critères de classement des fichiers (un score plus faible est meilleur)
+RANK_WEIGHTS = {
+    "resolution": 1.0,  # Écart (logarithmique) à la hauteur cible, pénalisé davantage sous la cible
+    "aspect": 2.0,      # Écart au format portrait cible
+    "fps": 0.5,         # Écart relatif au FPS de sortie
+    "duration": 1.5,    # Part de la narration à combler en bouclant la vidéo
+    "size": 0.2         # Poids du fichier à télécharger (par tranche de 100 Mo)
+}
+
+def _file_metadata(video: Dict[str, Any], file: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "link": file.get('link'),
+        "video_id": video.get('id'),
+        "page_url": video.get('url'),
+        "width": file.get('width') or 0,
+        "height": file.get('height') or 0,
+        "fps": file.get('fps'),
+        "duration": video.get('duration') or 0,
+        "file_size": file.get('size'),
+        "quality": file.get('quality'),
+        "file_type": file.get('file_type')
+    }
+
+def score_video_file(metadata: Dict[str, Any], target_duration: float = None) -> float:
+    """
+    Score d'un fichier Pexels : proche de la résolution cible, en portrait, au bon FPS,
+    assez long pour la narration et léger à télécharger. Plus le score est bas, meilleur est le fichier.
+    """
+    width, height = metadata["width"], metadata["height"]
+    if not width or not height:
+        return math.inf
+
+    resolution = abs(math.log(height / HEIGHT))
+    if height < HEIGHT:
+        resolution *= 2  # Agrandir dégrade l'image, réduire ne coûte que du décodage
+    aspect = abs(width / height - WIDTH / HEIGHT)
+    fps = abs(metadata["fps"] - FPS) / FPS if metadata.get("fps") else 0.5
+
+    duration = 0.0
+    if target_duration and metadata["duration"] < target_duration:
+        duration = (target_duration - metadata["duration"]) / target_duration
+
+    file_size = metadata.get("file_size")
+    if not file_size:
+        # Estimation grossière à partir de la résolution et de la durée (~0,1 bit par pixel)
+        file_size = width * height * (metadata.get("fps") or FPS) * max(metadata["duration"], 1) * 0.1 / 8
+    size = file_size / (100 * 1024 ** 2)
+
+    return (RANK_WEIGHTS["resolution"] * resolution + RANK_WEIGHTS["aspect"] * aspect + RANK_WEIGHTS["fps"] * fps
+            + RANK_WEIGHTS["duration"] * duration + RANK_WEIGHTS["size"] * size)
+
+def rank_video_files(videos: List[Dict[str, Any]], target_duration: float = None) -> List[Dict[str, Any]]:
+    """
+    Classe tous les fichiers de tous les résultats Pexels, du meilleur au moins bon.
+    """
+    candidates = []
+    for video in videos:
+        for file in video.get('video_files', []):
+            if not file.get('link'):
+                continue
+            metadata = _file_metadata(video, file)
+            metadata["score"] = score_video_file(metadata, target_duration)
+            if metadata["score"] != math.inf:
+                candidates.append(metadata)
+    return sorted(candidates, key=lambda candidate: candidate["score"])
+
+def get_video_metadata(link: str) -> Optional[Dict[str, Any]]:
+    """
+    Retourne les métadonnées connues d'un fichier vidéo déjà proposé par une recherche.
+    """
+    return _video_metadata.get(link)
+
+def search_pexels_video(query: str, target_duration: float = None) -> str:
     """Recherche une vidéo sur Pexels et retourne son URL."""
+    metadata = search_pexels_video_with_metadata(query, target_duration=target_duration)
+    return metadata["link"] if metadata else None
+
+def search_pexels_video_with_metadata(query: str, target_duration: float = None) -> Optional[Dict[str, Any]]:
+    """
+    Recherche une vidéo sur Pexels et retourne le meilleur fichier et ses métadonnées.
+    `target_duration` est la durée attendue de la narration, en secondes.
+    """
     # Nettoyer la clé API (supprimer les espaces éventuels)
     api_key = PEXELS_API_KEY.strip() if PEXELS_API_KEY else ""
     
@@ -41,18 +128,17 @@ def search_pexels_video(query: str) -> str:
                         params["query"] = " ".join(words[:1])  # Prendre juste le premier mot
                     continue
             
-            # Si nous avons des vidéos, choisir une au hasard
+            # Si nous avons des vidéos, classer tous leurs fichiers et garder le meilleur
             if data.get('videos'):
-                video = random.choice(data['videos'])
-                # Chercher une vidéo d'une taille appropriée (par ex. "hd" ou "sd")
-                suitable_files = []
-                for file in video['video_files']:
-                    if file.get('width', 0) >= 1080:
-                        suitable_files.append(file)
-                
-                if suitable_files:
-                    print(f"LOG: Vidéo trouvée avec succès: {suitable_files[0]['link']}")
-                    return suitable_files[0]['link']
+                candidates = rank_video_files(data['videos'], target_duration)
+                for candidate in candidates:
+                    _video_metadata.set(candidate["link"], candidate)
+
+                if candidates:
+                    best = candidates[0]
+                    print(f"LOG: Vidéo trouvée avec succès ({best['width']}x{best['height']}, "
+                          f"{best['fps']} fps, {best['duration']}s, score {best['score']:.3f}): {best['link']}")
+                    return best
             
             print("LOG: Aucune vidéo de taille appropriée trouvée.")
             return None
@@ -1,98 +1,78 @@
 # app/utils/video_utils.py
 # Importer config_loader en premier pour configurer ImageMagick avant d'importer moviepy
 from app.core import config_loader
-from moviepy.editor import VideoFileClip, AudioFileClip, ImageClip, CompositeVideoClip
-from PIL import Image, ImageDraw, ImageFont
-from app.core.configs import FPS, WIDTH, HEIGHT, TEMP_DIR, BACKEND_DIR
+from moviepy.editor import VideoFileClip, AudioFileClip
+from proglog import ProgressBarLogger
+from app.core.configs import FPS, WIDTH, HEIGHT, TEMP_DIR
+from app.utils.subtitle_utils import blend_sprite, prepare_subtitle_sprites
+from app.utils.subtitle_timeline import SubtitleTimeline
+from app.utils.ffmpeg_renderer import render_video_with_ffmpeg, render_video_parallel
+from app.utils.download_utils import download_file
+from app.utils.background_cache import get_cached_background
+from app.core.config_loader import BACKGROUND_CACHE_ENABLED
 import uuid
 import os
-import numpy as np
 from typing import List, Dict, Any
-import requests # Importer la bibliothèque requests
 
-def download_file(url: str, local_path: str):
+def add_subtitle_track(video_clip, words_timing: List[Dict[str, Any]]):
     """
-    Télécharge un fichier depuis une URL et l'enregistre localement.
+    Incruste tous les sous-titres via un seul filtre d'image adossé à un index d'intervalles,
+    au lieu d'un calque par mot : le coût par image ne dépend plus du nombre de mots.
     """
-    print(f"LOG: Téléchargement du fichier depuis {url}...")
-    try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status() # Lève une exception pour les codes d'erreur HTTP
-        with open(local_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print("LOG: Téléchargement terminé.")
-    except requests.exceptions.RequestException as e:
-        print(f"LOG: Erreur lors du téléchargement: {e}")
-        raise
-    
-# Construire le chemin absolu vers la police en utilisant la racine du projet
-FONT_PATH = os.path.join(BACKEND_DIR, 'assets', 'fonts', 'Montserrat', 'static', 'Montserrat-Bold.ttf')
-
-def create_karaoke_subtitle_clip(text: str, start: float, end: float, font_path: str = FONT_PATH, size: tuple = (WIDTH, HEIGHT)) -> ImageClip:
+    timeline = SubtitleTimeline(prepare_subtitle_sprites(words_timing, size=(WIDTH, HEIGHT)))
+    print(f"LOG: Piste de sous-titres créée avec {len(timeline)} mots.")
+
+    def draw_subtitles(get_frame, t):
+        frame = get_frame(t)
+        active = timeline.at(t)
+        if active:
+            # Le lecteur MoviePy peut réutiliser son tableau : travailler sur une copie
+            frame = frame.copy()
+            for subtitle in active:
+                blend_sprite(frame, subtitle["sprite"], subtitle["position"])
+        return frame
+
+    return video_clip.fl(draw_subtitles, apply_to=[])
+
+class FrameProgressLogger(ProgressBarLogger):
     """
-    Crée un clip de sous-titre en utilisant Pillow pour dessiner le texte.
-    Cette méthode ne dépend pas d'ImageMagick.
+    Logger MoviePy qui transmet la fraction d'images écrites par write_videofile.
     """
-    try:
-        # Définir la police et la taille
-        try:
-            font = ImageFont.truetype(font_path, 130)
-        except IOError:
-            print(f"LOG: Police '{font_path}' non trouvée, utilisation de la police par défaut.")
-            font = ImageFont.load_default()
-
-        # Créer une image transparente
-        img = Image.new('RGBA', size, (255, 255, 255, 0))
-        draw = ImageDraw.Draw(img)
-
-        # Obtenir la taille du texte pour le centrer
-        text_bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
-        
-        # Positionner le texte au centre, mais avec un décalage vers le bas
-        text_x = (size[0] - text_width) / 2
-        
-        # Décalage vertical depuis le centre. Augmentez cette valeur pour descendre le texte.
-        vertical_offset = 300 
-        text_y = ((size[1] - text_height) / 2) + vertical_offset
-
-        # Ajouter un arrière-plan semi-transparent
-        bg_padding = 15
-        bg_box = [
-            text_x - bg_padding,
-            text_y - bg_padding,
-            text_x + text_width + bg_padding,
-            text_y + text_height + bg_padding
-        ]
-        # Utiliser un rectangle avec des coins arrondis
-        draw.rounded_rectangle(bg_box, radius=10, fill=(0, 0, 0, 150)) # Noir avec ~60% d'opacité
-
-        # Dessiner le texte principal (jaune vif pour un bon contraste)
-        draw.text((text_x, text_y), text, font=font, fill=(255, 255, 0))
-
-        # Convertir l'image Pillow en tableau NumPy que MoviePy peut utiliser
-        image_array = np.array(img)
-        return ImageClip(image_array).set_start(start).set_duration(end - start).set_pos(('center', 'center'))
-
-    except Exception as e:
-        print(f"LOG: Erreur lors de la création du sous-titre avec Pillow: {e}")
-        return None
-
-def make_video_from_assets(background_video_url: str, audio_path: str, words_timing: List[Dict[str, Any]], out_video: str, use_original_audio: bool = False):
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        # La barre 't' de MoviePy suit l'écriture des images vidéo
+        if bar == 't' and attr == 'index':
+            total = self.bars[bar].get('total')
+            if total:
+                self.callback(min(1.0, (value + 1) / total))
+
+# Moteurs de rendu disponibles pour make_video_from_assets
+RENDER_ENGINES = ("moviepy", "ffmpeg", "ffmpeg_parallel")
+
+def make_video_from_assets(background_video_url: str, audio_path: str, words_timing: List[Dict[str, Any]], out_video: str, use_original_audio: bool = False, render_engine: str = "moviepy", progress_callback=None):
     """
     Monte une vidéo à partir d'une vidéo de fond, d'un fichier audio et de données de timing.
+    `render_engine` choisit entre la composition MoviePy ("moviepy"), le rendu par pipe ffmpeg ("ffmpeg")
+    et le rendu ffmpeg découpé en segments rendus en parallèle ("ffmpeg_parallel").
+    `progress_callback(fraction)` reçoit la progression de l'écriture des images.
     """
+    if render_engine not in RENDER_ENGINES:
+        raise Exception(f"Moteur de rendu inconnu : '{render_engine}'. Valeurs possibles : {', '.join(RENDER_ENGINES)}")
+
     temp_files = []
     video_clip = None
     audio_clip = None
     final_clip = None
-    subtitle_clips = []
 
     try:
         # 1. Préparer la vidéo de fond
-        if background_video_url.startswith('http'):
+        if background_video_url.startswith('http') and BACKGROUND_CACHE_ENABLED:
+            # Le fichier reste dans le cache partagé : il ne doit pas être supprimé après le rendu
+            background_video_path = get_cached_background(background_video_url)
+        elif background_video_url.startswith('http'):
             print("LOG: Téléchargement de la vidéo de fond depuis une URL...")
             background_video_path = os.path.join(TEMP_DIR, f"background_{uuid.uuid4().hex}.mp4")
             download_file(background_video_url, background_video_path)
@@ -101,6 +81,13 @@ def make_video_from_assets(background_video_url: str, audio_path: str, words_tim
             print("LOG: Utilisation de la vidéo locale comme fond...")
             background_video_path = background_video_url # C'est déjà un chemin local
 
+        if render_engine == "ffmpeg":
+            return render_video_with_ffmpeg(background_video_path, audio_path, words_timing, out_video,
+                                            use_original_audio=use_original_audio, progress_callback=progress_callback)
+        if render_engine == "ffmpeg_parallel":
+            return render_video_parallel(background_video_path, audio_path, words_timing, out_video,
+                                         use_original_audio=use_original_audio, progress_callback=progress_callback)
+
         # 2. Charger et normaliser le clip vidéo
         print("LOG: Chargement et normalisation du clip vidéo...")
         video_clip = VideoFileClip(background_video_path)
@@ -123,33 +110,27 @@ def make_video_from_assets(background_video_url: str, audio_path: str, words_tim
         else:
             video_clip = video_clip.subclip(0, audio_clip.duration)
 
-        # 3. Créer les sous-titres dynamiques
+        # 3. Créer la piste de sous-titres dynamiques
         if words_timing:
-            print(f"LOG: Création de {len(words_timing)} clips de sous-titres...")
-            for item in words_timing:
-                word = item.get('word') or item.get('punctuated_word')
-                start = item.get('start')
-                end = item.get('end')
-                if word and start is not None and end is not None:
-                    clip = create_karaoke_subtitle_clip(word, start, end)
-                    if clip:
-                        subtitle_clips.append(clip)
-
-        # 4. Combiner tous les clips
-        print("LOG: Combinaison des clips...")
-        final_clip = CompositeVideoClip([video_clip] + subtitle_clips)
-        final_clip.audio = audio_clip
+            print(f"LOG: Création de la piste de {len(words_timing)} sous-titres...")
+            final_clip = add_subtitle_track(video_clip, words_timing)
+        else:
+            final_clip = video_clip
+
+        # 4. Ajouter l'audio
+        final_clip = final_clip.set_audio(audio_clip)
 
         # 5. Écrire la vidéo finale
         print("LOG: Écriture de la vidéo finale...")
-        final_clip.write_videofile(out_video, codec="libx264", audio_codec="aac", fps=FPS)
+        logger = FrameProgressLogger(progress_callback) if progress_callback else 'bar'
+        final_clip.write_videofile(out_video, codec="libx264", audio_codec="aac", fps=FPS, logger=logger)
 
         return out_video
 
     finally:
         # 6. Nettoyage
         print("LOG: Fermeture des clips MoviePy...")
-        clips_to_close = [video_clip, audio_clip, final_clip] + subtitle_clips
+        clips_to_close = [video_clip, audio_clip, final_clip]
         for clip in clips_to_close:
             if clip:
                 try:
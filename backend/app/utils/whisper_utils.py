@@ -1,32 +1,225 @@
 # app/utils/whisper_utils.py
+import threading
+import time
 import whisper
+import numpy as np
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from typing import List, Dict, Any
+from app.core.config_loader import (
+    WHISPER_DEFAULT_MODEL, WHISPER_MEMORY_LIMIT_MB, WHISPER_BACKEND, WHISPER_BEAM_SIZE,
+    WHISPER_THREADS, WHISPER_COMPUTE_TYPE
+)
 
-def transcribe_audio_with_whisper(audio_path: str, language: str = None) -> List[Dict[str, Any]]:
+# Backend optionnel : CTranslate2, quantifié en int8 sur CPU
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+# Tailles de modèles acceptées dans les requêtes
+WHISPER_MODEL_SIZES = ("tiny", "base", "small", "medium", "large", "tiny.en", "base.en", "small.en", "medium.en")
+
+class STTEngine(ABC):
     """
-    Transcrire un fichier audio en utilisant Whisper et retourner les segments de mots avec leurs timings.
+    Moteur de transcription locale : charge un modèle d'une taille donnée et transcrit un fichier
+    en liste de mots {'word', 'start', 'end'}. Un moteur incomplet ne peut pas être instancié.
+    """
+    name = "base"
+
+    @abstractmethod
+    def load(self, size: str):
+        ...
+
+    @abstractmethod
+    def transcribe(self, model, audio_path: str, language: str = None) -> List[Dict[str, Any]]:
+        ...
+
+    def warm_up(self, model):
+        self.transcribe(model, np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32))
+
+    @abstractmethod
+    def model_bytes(self, model, size: str) -> int:
+        ...
+
+class OpenAIWhisperEngine(STTEngine):
     """
-    print("LOG: Chargement du modèle Whisper...")
-    # Utiliser le modèle 'base' qui est un bon compromis entre vitesse et précision.
-    # Pour une meilleure précision (mais plus lent), on pourrait utiliser 'medium'.
-    model = whisper.load_model("base")
-    
-    print(f"LOG: Transcription de l'audio : {audio_path}")
-    try:
+    Modèle PyTorch de référence (openai-whisper), en fp32 sur CPU.
+    """
+    name = "openai-whisper"
+
+    def load(self, size: str):
+        if WHISPER_THREADS > 0:
+            import torch
+            torch.set_num_threads(WHISPER_THREADS)
+        return whisper.load_model(size)
+
+    def transcribe(self, model, audio_path, language: str = None) -> List[Dict[str, Any]]:
         # Lancer la transcription avec l'option word_timestamps=True
-        result = model.transcribe(audio_path, word_timestamps=True, language=language)
-        
-        # Extraire les segments de mots
-        word_segments = result.get('segments', [])
-        
-        # Aplatir la liste de mots
+        result = model.transcribe(audio_path, word_timestamps=True, language=language,
+                                  beam_size=WHISPER_BEAM_SIZE, fp16=False)
+        # Aplatir la liste de mots des segments
         all_words = []
-        for segment in word_segments:
+        for segment in result.get('segments', []):
             all_words.extend(segment['words'])
-            
-        print(f"LOG: Transcription Whisper terminée. {len(all_words)} mots trouvés.")
         return all_words
-        
-    except Exception as e:
-        print(f"LOG: Erreur lors de la transcription avec Whisper: {e}")
-        return []
+
+    def model_bytes(self, model, size: str) -> int:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+
+class FasterWhisperEngine(STTEngine):
+    """
+    Mêmes modèles convertis pour CTranslate2 (faster-whisper), quantifiés en int8 : plusieurs fois plus rapide sur CPU.
+    """
+    name = "faster-whisper"
+    # Empreinte mémoire approximative des modèles int8 (CTranslate2 ne l'expose pas)
+    APPROX_MEGABYTES = {"tiny": 45, "base": 80, "small": 250, "medium": 800, "large": 1600}
+
+    def load(self, size: str):
+        return WhisperModel(size, device="cpu", compute_type=WHISPER_COMPUTE_TYPE, cpu_threads=max(0, WHISPER_THREADS))
+
+    def transcribe(self, model, audio_path, language: str = None) -> List[Dict[str, Any]]:
+        options = {"beam_size": WHISPER_BEAM_SIZE} if WHISPER_BEAM_SIZE else {}
+        segments, _ = model.transcribe(audio_path, language=language, word_timestamps=True, **options)
+        # Les segments sont générés à la demande : la transcription a lieu pendant ce parcours
+        return [
+            {"word": word.word, "start": word.start, "end": word.end, "probability": word.probability}
+            for segment in segments for word in (segment.words or [])
+        ]
+
+    def model_bytes(self, model, size: str) -> int:
+        return self.APPROX_MEGABYTES.get(size.split(".")[0], 500) * 1024 * 1024
+
+def select_engine(backend: str = WHISPER_BACKEND) -> STTEngine:
+    if backend == FasterWhisperEngine.name:
+        if WhisperModel is not None:
+            return FasterWhisperEngine()
+        print("LOG: faster-whisper n'est pas installé, utilisation d'openai-whisper.")
+    elif backend != OpenAIWhisperEngine.name:
+        print(f"LOG: Backend Whisper inconnu '{backend}', utilisation d'openai-whisper.")
+    return OpenAIWhisperEngine()
+
+class WhisperModelRegistry:
+    """
+    Modèles Whisper chargés une seule fois par worker et partagés entre les requêtes.
+    Au-delà de `memory_limit_mb`, les modèles inutilisés depuis le plus longtemps sont déchargés
+    (un modèle en cours d'utilisation n'est jamais évincé).
+    """
+    def __init__(self, engine: STTEngine, memory_limit_mb: float = WHISPER_MEMORY_LIMIT_MB):
+        self.engine = engine
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def _load(self, size: str, reserve: bool = False) -> Dict[str, Any]:
+        """
+        Charge un modèle s'il ne l'est pas déjà. Avec `reserve`, le modèle est marqué utilisé sous le même
+        verrou que son insertion, pour qu'une éviction concurrente ne le décharge pas avant son utilisation.
+        """
+        with self._lock:
+            entry = self._models.get(size)
+            if entry:
+                entry["in_use"] += int(reserve)
+                return entry
+            load_lock = self._load_locks.setdefault(size, threading.Lock())
+        # Un seul chargement par taille, même si plusieurs requêtes la demandent en même temps
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(size)
+                if entry:
+                    entry["in_use"] += int(reserve)
+                    return entry
+            print(f"LOG: Chargement du modèle Whisper '{size}' ({self.engine.name})...")
+            started = time.perf_counter()
+            model = self.engine.load(size)
+            entry = {"model": model, "bytes": self.engine.model_bytes(model, size), "in_use": int(reserve), "last_used": time.time()}
+            print(f"LOG: Modèle Whisper '{size}' chargé en {time.perf_counter() - started:.1f}s "
+                  f"({entry['bytes'] / 1024 ** 2:.0f} Mo).")
+            with self._lock:
+                self._models[size] = entry
+                self.loads += 1
+                self._evict(keep=size)
+            return entry
+
+    def _evict(self, keep: str = None):
+        """
+        Décharge les modèles inutilisés les plus anciens tant que la limite mémoire est dépassée.
+        Doit être appelée avec self._lock.
+        """
+        total = sum(entry["bytes"] for entry in self._models.values())
+        idle = sorted((entry["last_used"], size) for size, entry in self._models.items()
+                      if size != keep and entry["in_use"] == 0)
+        for _, size in idle:
+            if total <= self.memory_limit:
+                break
+            total -= self._models.pop(size)["bytes"]
+            self.evictions += 1
+            print(f"LOG: Modèle Whisper '{size}' déchargé (limite mémoire de {self.memory_limit / 1024 ** 2:.0f} Mo).")
+
+    @contextmanager
+    def use(self, size: str = None):
+        """
+        Fournit le modèle demandé (chargé à la première utilisation) et le protège de l'éviction pendant l'usage.
+        """
+        size = size or WHISPER_DEFAULT_MODEL
+        if size not in WHISPER_MODEL_SIZES:
+            raise ValueError(f"Modèle Whisper inconnu : '{size}'. Valeurs possibles : {', '.join(WHISPER_MODEL_SIZES)}")
+        with self._lock:
+            entry = self._models.get(size)
+            if entry:
+                entry["in_use"] += 1
+        if not entry:
+            entry = self._load(size, reserve=True)
+        try:
+            yield entry["model"]
+        finally:
+            with self._lock:
+                entry["in_use"] -= 1
+                entry["last_used"] = time.time()
+                if entry["in_use"] == 0:
+                    # Les modèles qui étaient en cours d'utilisation lors des chargements peuvent maintenant être déchargés
+                    self._evict()
+
+    def preload(self, size: str = None, warm_up: bool = True):
+        """
+        Charge un modèle au démarrage et, si demandé, exécute une inférence sur une seconde de silence
+        pour que la première vraie requête ne paie pas l'initialisation.
+        """
+        with self.use(size) as model:
+            if warm_up:
+                started = time.perf_counter()
+                self.engine.warm_up(model)
+                print(f"LOG: Préchauffage de Whisper terminé en {time.perf_counter() - started:.1f}s.")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.engine.name,
+                "loaded": {size: {"megabytes": round(entry["bytes"] / 1024 ** 2, 1), "in_use": entry["in_use"]}
+                           for size, entry in self._models.items()},
+                "memory_limit_mb": round(self.memory_limit / 1024 ** 2),
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
+
+model_registry = WhisperModelRegistry(select_engine())
+
+def transcribe_audio_with_whisper(audio_path: str, language: str = None, model_size: str = None) -> List[Dict[str, Any]]:
+    """
+    Transcrire un fichier audio en utilisant Whisper et retourner les segments de mots avec leurs timings.
+    `model_size` choisit le modèle ('base' par défaut, voir WHISPER_DEFAULT_MODEL) ; il reste chargé pour les appels suivants.
+    Le moteur (openai-whisper ou faster-whisper en int8) est choisi par WHISPER_BACKEND.
+    """
+    with model_registry.use(model_size) as model:
+        print(f"LOG: Transcription de l'audio : {audio_path}")
+        try:
+            all_words = model_registry.engine.transcribe(model, audio_path, language=language)
+            print(f"LOG: Transcription Whisper terminée. {len(all_words)} mots trouvés.")
+            return all_words
+            
+        except Exception as e:
+            print(f"LOG: Erreur lors de la transcription avec Whisper: {e}")
+            return []
@@ -0,0 +1,48 @@
+from app.utils.alignment_utils import (
+    alignment_is_plausible, alignment_to_words, distribute_words, script_words, words_from_provider_timing
+)
+
+def test_characters_are_grouped_into_words_on_whitespace():
+    text = " Salut  à tous!"
+    alignment = {
+        "characters": list(text),
+        "character_start_times_seconds": [i * 0.1 for i in range(len(text))],
+        "character_end_times_seconds": [i * 0.1 + 0.1 for i in range(len(text))],
+    }
+    words = alignment_to_words(alignment)
+    assert [w["word"] for w in words] == ["Salut", "à", "tous!"]
+    assert words[0]["start"] == 0.1 and round(words[0]["end"], 3) == 0.6
+    assert round(words[2]["start"], 3) == 1.0 and round(words[2]["end"], 3) == 1.5
+
+def test_providers_without_alignment_yield_no_words():
+    assert words_from_provider_timing({}) == []
+    assert words_from_provider_timing(None) == []
+    assert words_from_provider_timing({"characters": ["a"], "character_start_times_seconds": [],
+                                       "character_end_times_seconds": []}) == []
+
+def test_known_script_is_spread_over_voiced_regions_by_length():
+    words = script_words("Bonjour 🔥 le monde !")
+    assert words == ["Bonjour", "le", "monde"]
+    timings = distribute_words(words, [(0.5, 1.5), (2.0, 2.7)])
+    assert [w["word"] for w in timings] == words
+    assert timings[0]["start"] == 0.5
+    # "monde" tombe dans la seconde zone, après le silence
+    assert timings[2]["start"] == 2.0 and timings[2]["end"] == 2.7
+    assert all(w["start"] <= w["end"] for w in timings)
+    assert distribute_words(words, []) == []
+
+def test_alignment_matching_the_script_pauses_is_accepted():
+    words = script_words("Bonjour à tous. Voici une astuce simple.")
+    regions = [(0.1, 1.0), (1.3, 2.9)]
+    assert alignment_is_plausible(words, regions, distribute_words(words, regions))
+
+def test_alignment_with_implausible_word_durations_is_rejected():
+    words = script_words("Bonjour à tous.")
+    # Trois mots courts étalés sur six secondes : la détection de parole a englobé du bruit
+    regions = [(0.0, 6.0)]
+    assert not alignment_is_plausible(words, regions, distribute_words(words, regions))
+
+def test_alignment_with_more_silences_than_pauses_is_rejected():
+    words = script_words("Voici une astuce vraiment très simple pour retenir")
+    regions = [(i * 0.5, i * 0.5 + 0.3) for i in range(8)]
+    assert not alignment_is_plausible(words, regions, distribute_words(words, regions))
@@ -13,4 +13,11 @@ def test_generate_video():
     })
     assert response.status_code == 200
     assert "video_path" in response.json()
-    assert response.json()["video_path"].endswith(".mp4")
\ No newline at end of file
+    assert response.json()["video_path"].endswith(".mp4")
+def test_unknown_render_engine_is_rejected_before_generation():
+    response = client.post("/api/v1/generate-video", json={"prompt": "Une astuce", "render_engine": "ffmpg"})
+    assert response.status_code == 422
+
+def test_batch_item_with_unknown_render_engine_is_rejected():
+    response = client.post("/api/v1/generate-batch", json={"items": [{"prompt": "Une astuce", "render_engine": "ffmpg"}]})
+    assert response.status_code == 422
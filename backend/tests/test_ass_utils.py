@@ -0,0 +1,30 @@
+from app.utils.ass_utils import format_ass_time, ass_color, build_ass_subtitles, audio_codec_args
+
+def test_format_ass_time():
+    assert format_ass_time(0) == "0:00:00.00"
+    assert format_ass_time(1.234) == "0:00:01.23"
+    assert format_ass_time(3725.5) == "1:02:05.50"
+
+def test_ass_color_is_bgr_with_inverted_alpha():
+    assert ass_color((255, 255, 0)) == "&H0000FFFF"
+    assert ass_color((0, 0, 0, 150), 150) == "&H69000000"
+
+def test_build_ass_subtitles_one_dialogue_per_word():
+    words = [
+        {"word": "Bonjour", "start": 0.0, "end": 0.5},
+        {"punctuated_word": "{le}", "start": 0.5, "end": 0.8},
+        {"word": "vide", "start": 1.0, "end": 1.0},
+    ]
+    ass = build_ass_subtitles(words)
+    dialogues = [line for line in ass.splitlines() if line.startswith("Dialogue:")]
+    assert len(dialogues) == 2
+    assert dialogues[0].startswith("Dialogue: 0,0:00:00.00,0:00:00.50,Karaoke")
+    assert dialogues[0].endswith("Bonjour")
+    assert dialogues[1].endswith("(le)")
+
+def test_audio_is_copied_only_when_mp4_accepts_the_codec():
+    assert audio_codec_args("aac") == ["-c:a", "copy"]
+    assert audio_codec_args("mp3") == ["-c:a", "copy"]
+    assert audio_codec_args("opus") == ["-c:a", "aac"]
+    assert audio_codec_args("pcm_s16le") == ["-c:a", "aac"]
+    assert audio_codec_args(None) == ["-c:a", "aac"]
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+from app.utils import background_cache
+
+URL = "https://videos.example/fond.mp4"
+
+def use_tmp_cache(monkeypatch, tmp_path, download):
+    monkeypatch.setattr(background_cache, "BACKGROUND_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(background_cache, "BACKGROUND_MEZZANINE_ENABLED", False)
+    monkeypatch.setattr(background_cache, "download_file", download)
+
+def slow_download(calls):
+    def download(url, path, resume=False):
+        calls.append(url)
+        time.sleep(0.2)
+        with open(path, "wb") as f:
+            f.write(b"video")
+    return download
+
+def test_concurrent_requests_download_the_background_once(monkeypatch, tmp_path):
+    calls = []
+    use_tmp_cache(monkeypatch, tmp_path, slow_download(calls))
+    paths = []
+
+    threads = [threading.Thread(target=lambda: paths.append(background_cache.get_cached_background(URL)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [URL]
+    assert len(set(paths)) == 1 and os.path.isfile(paths[0])
+    assert not os.path.exists(paths[0] + ".lock")
+
+def test_waits_for_a_download_locked_by_another_worker(monkeypatch, tmp_path):
+    calls = []
+    use_tmp_cache(monkeypatch, tmp_path, slow_download(calls))
+    final_path = os.path.join(str(tmp_path), f"{background_cache.background_cache_key(URL)}.mp4")
+    # Un autre processus a pris le verrou et termine son téléchargement un peu plus tard
+    with open(final_path + ".lock", "w") as f:
+        f.write("12345")
+
+    def other_worker():
+        time.sleep(0.3)
+        with open(final_path, "wb") as f:
+            f.write(b"video")
+        os.remove(final_path + ".lock")
+
+    worker = threading.Thread(target=other_worker)
+    worker.start()
+    assert background_cache.get_cached_background(URL) == final_path
+    worker.join()
+    assert calls == []
+
+def test_stale_lock_is_taken_over(monkeypatch, tmp_path):
+    calls = []
+    use_tmp_cache(monkeypatch, tmp_path, slow_download(calls))
+    monkeypatch.setattr(background_cache, "BACKGROUND_CACHE_LOCK_TIMEOUT", 1)
+    final_path = os.path.join(str(tmp_path), f"{background_cache.background_cache_key(URL)}.mp4")
+    with open(final_path + ".lock", "w") as f:
+        f.write("12345")
+    # Worker arrêté brutalement : le verrou ne bouge plus depuis longtemps
+    old = time.time() - 60
+    os.utime(final_path + ".lock", (old, old))
+
+    assert background_cache.get_cached_background(URL) == final_path
+    assert calls == [URL]
+    assert not os.path.exists(final_path + ".lock")
+
+def test_eviction_removes_least_recently_used_first(monkeypatch, tmp_path):
+    monkeypatch.setattr(background_cache, "BACKGROUND_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(background_cache, "BACKGROUND_CACHE_MAX_BYTES", 250)
+    now = time.time()
+    paths = {}
+    for age, name in ((300, "oldest"), (200, "older"), (100, "recent")):
+        paths[name] = str(tmp_path / f"{name}.mp4")
+        with open(paths[name], "wb") as f:
+            f.write(b"x" * 100)
+        os.utime(paths[name], (now - age, now - age))
+
+    # Le fichier à conserver est sauté même s'il est le plus ancien
+    background_cache.evict_backgrounds(keep=paths["oldest"])
+
+    assert os.path.exists(paths["oldest"])
+    assert not os.path.exists(paths["older"])
+    assert os.path.exists(paths["recent"])
+
+def test_cache_hit_refreshes_recency(monkeypatch, tmp_path):
+    calls = []
+    use_tmp_cache(monkeypatch, tmp_path, slow_download(calls))
+    path = background_cache.get_cached_background(URL)
+    old = time.time() - 1000
+    os.utime(path, (old, old))
+
+    background_cache.get_cached_background(URL)
+
+    assert calls == [URL]
+    assert os.path.getmtime(path) > old + 500
@@ -0,0 +1,61 @@
+import os
+import time
+
+from app.core import checkpoints
+
+REQUEST = {"prompt": "Une astuce", "tone": "percutant", "n_images": 3, "category": "astuce",
+           "lang": "fr", "tts_service": "auto", "render_engine": "moviepy"}
+
+def use_tmp_checkpoints(monkeypatch, tmp_path):
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(checkpoints, "CHECKPOINTS_ENABLED", True)
+
+def test_checkpoint_is_reserved_for_one_generation(monkeypatch, tmp_path):
+    use_tmp_checkpoints(monkeypatch, tmp_path)
+    first = checkpoints.open_checkpoint(REQUEST)
+    assert first is not None
+
+    # Même demande (le moteur de rendu ne compte pas) pendant que la première est en cours : pas de partage
+    assert checkpoints.open_checkpoint(dict(REQUEST, render_engine="ffmpeg")) is None
+
+    first.release()
+    second = checkpoints.open_checkpoint(REQUEST)
+    assert second is not None and second.key == first.key
+    second.release()
+
+def test_stale_reservation_is_taken_over(monkeypatch, tmp_path):
+    use_tmp_checkpoints(monkeypatch, tmp_path)
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_TTL_SECONDS", 60)
+    abandoned = checkpoints.open_checkpoint(REQUEST)
+    old = time.time() - 120
+    os.utime(abandoned.lock_path, (old, old))
+
+    resumed = checkpoints.open_checkpoint(REQUEST)
+    assert resumed is not None
+    resumed.release()
+
+def test_completed_stages_are_resumed_and_dependents_invalidated(monkeypatch, tmp_path):
+    use_tmp_checkpoints(monkeypatch, tmp_path)
+    checkpoint = checkpoints.open_checkpoint(REQUEST)
+    calls = []
+
+    def stage(name, value):
+        def run(**dependencies):
+            calls.append(name)
+            return value
+        return run
+
+    script = checkpoints.checkpointed(checkpoint, "script", stage("script", "texte"), invalidates=("audio",))
+    audio = checkpoints.checkpointed(checkpoint, "audio", stage("audio", {"path": "a.mp3"}))
+    assert script() == "texte" and audio() == {"path": "a.mp3"}
+
+    # Nouvelle tentative : les deux étapes sont reprises sans être relancées
+    assert script() == "texte" and audio() == {"path": "a.mp3"}
+    assert calls == ["script", "audio"]
+
+    # Une étape rejouée supprime les checkpoints qui en dérivent
+    checkpoint.invalidate("script")
+    script()
+    assert checkpoint.load("audio") == (False, None)
+    assert calls == ["script", "audio", "script"]
+    checkpoint.release()
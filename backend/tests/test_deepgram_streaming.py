@@ -0,0 +1,71 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.utils import deepgram_utils
+
+RESPONSE = {
+    "results": {"channels": [{"alternatives": [{
+        "detected_language": "fr",
+        "words": [
+            {"word": "bonjour", "punctuated_word": "Bonjour", "start": 0.1, "end": 0.5},
+            {"word": "tous", "punctuated_word": "tous.", "start": 0.6, "end": 0.9},
+        ],
+    }]}]}
+}
+
+class MockListenHandler(BaseHTTPRequestHandler):
+    received = {}
+
+    def do_POST(self):
+        body = b""
+        chunk_count = 0
+        # Corps envoyé en Transfer-Encoding: chunked, à décoder à la main
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            if size == 0:
+                self.rfile.readline()
+                break
+            body += self.rfile.read(size)
+            self.rfile.readline()
+            chunk_count += 1
+        MockListenHandler.received = {
+            "path": self.path,
+            "headers": dict(self.headers),
+            "body": body,
+            "chunks": chunk_count,
+        }
+        payload = json.dumps(RESPONSE).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+def test_audio_is_streamed_in_chunks_and_words_are_reported(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockListenHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        monkeypatch.setattr(deepgram_utils, "DEEPGRAM_API_URL", f"http://127.0.0.1:{server.server_port}/v1/listen")
+        monkeypatch.setattr(deepgram_utils, "DEEPGRAM_API_KEY", "test-key")
+        chunks = [b"\x00\x01" * 100, b"\x02\x03" * 50, b"\x04\x05" * 10]
+        heard = []
+
+        result = deepgram_utils.transcribe_stream_with_deepgram(iter(chunks), on_word=heard.append)
+
+        received = MockListenHandler.received
+        assert received["headers"].get("Transfer-Encoding") == "chunked"
+        assert received["headers"].get("Authorization") == "Token test-key"
+        assert "encoding=linear16" in received["path"] and "detect_language=true" in received["path"]
+        assert received["body"] == b"".join(chunks)
+        assert received["chunks"] == len(chunks)
+        assert [w["word"] for w in result["words"]] == ["Bonjour", "tous."]
+        assert result["detected_language"] == "fr"
+        assert heard == result["words"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,56 @@
+import subprocess
+
+import numpy as np
+
+from app.core.configs import WIDTH, HEIGHT
+from app.utils.ffmpeg_utils import ffmpeg_command, run_ffmpeg
+from app.utils.video_utils import make_video_from_assets
+
+# Écart moyen toléré par pixel (0-255) entre les deux moteurs : bruit de l'encodage libx264
+# et du mélange des sous-titres, une image mal choisie donne un écart bien supérieur
+MEAN_TOLERANCE = 3.0
+
+def decode_frames(path):
+    raw = subprocess.run(ffmpeg_command(['-i', path, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-']),
+                         stdout=subprocess.PIPE, check=True).stdout
+    return np.frombuffer(raw, dtype=np.uint8).reshape((-1, HEIGHT, WIDTH, 3)).astype(np.int16)
+
+def render_both(tmp_path, source, words, audio_path=None):
+    outputs = {}
+    for engine in ("moviepy", "ffmpeg"):
+        outputs[engine] = str(tmp_path / f"{engine}.mp4")
+        make_video_from_assets(source, audio_path, words, outputs[engine],
+                               use_original_audio=audio_path is None, render_engine=engine)
+    return decode_frames(outputs["moviepy"]), decode_frames(outputs["ffmpeg"])
+
+def make_source(tmp_path, video_seconds, audio_seconds):
+    # Fond animé à une autre cadence et une autre taille que la sortie : sélection d'images et redimensionnement
+    source = str(tmp_path / "source.mp4")
+    run_ffmpeg([
+        '-f', 'lavfi', '-i', f'testsrc2=size=320x240:rate=25:duration={video_seconds}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={audio_seconds}',
+        '-c:v', 'libx264', '-g', '10', '-pix_fmt', 'yuv420p', '-c:a', 'aac', source
+    ])
+    return source
+
+def assert_same_frames(reference, candidate):
+    assert reference.shape == candidate.shape
+    for index in range(len(reference)):
+        diff = np.abs(reference[index] - candidate[index]).mean()
+        assert diff <= MEAN_TOLERANCE, f"image {index} : écart moyen {diff:.2f}"
+        if index + 1 < len(reference) and np.abs(reference[index + 1] - reference[index]).mean() > MEAN_TOLERANCE:
+            # L'image suivante est plus éloignée : c'est bien la même image source qui a été choisie
+            assert diff < np.abs(reference[index + 1] - candidate[index]).mean()
+
+def test_ffmpeg_engine_matches_moviepy_frames(tmp_path):
+    source = make_source(tmp_path, 1.5, 1.5)
+    words = [{"word": "Bonjour", "start": 0.2, "end": 0.9}]
+
+    assert_same_frames(*render_both(tmp_path, source, words))
+
+def test_ffmpeg_engine_loops_background_like_moviepy(tmp_path):
+    source = make_source(tmp_path, 1.0, 1.0)
+    audio_path = str(tmp_path / "voice.wav")
+    run_ffmpeg(['-f', 'lavfi', '-i', 'sine=frequency=220:duration=2.5', audio_path])
+
+    assert_same_frames(*render_both(tmp_path, source, [], audio_path=audio_path))
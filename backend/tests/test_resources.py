@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from app.core.resources import ResourceBusyError, ResourceLimiter
+
+def hold(limiter, started, release):
+    with limiter.acquire():
+        started.set()
+        release.wait(5)
+
+def test_full_queue_is_rejected_with_retry_after():
+    limiter = ResourceLimiter("render", max_concurrent=1, max_queue=1, queue_timeout=5)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold, args=(limiter, started, release))
+    holder.start()
+    started.wait(5)
+    waiter = threading.Thread(target=hold, args=(limiter, threading.Event(), release))
+    waiter.start()
+    while limiter.waiting < 1:
+        time.sleep(0.01)
+    # Durée moyenne d'utilisation de 10 s : une place se libère dans 10 s par demande en file
+    limiter.total_hold, limiter.released = 30.0, 3
+
+    with pytest.raises(ResourceBusyError) as rejected:
+        with limiter.acquire():
+            pass
+    with pytest.raises(ResourceBusyError):
+        limiter.check_admission()
+
+    release.set()
+    holder.join()
+    waiter.join()
+    assert rejected.value.retry_after == 20
+    assert limiter.rejected == 2
+    assert limiter.acquired == 2
+    limiter.check_admission()
+
+def test_queue_wait_times_out():
+    limiter = ResourceLimiter("deepgram", max_concurrent=1, max_queue=4, queue_timeout=0.1)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold, args=(limiter, started, release))
+    holder.start()
+    started.wait(5)
+
+    with pytest.raises(ResourceBusyError) as timed_out:
+        with limiter.acquire():
+            pass
+
+    release.set()
+    holder.join()
+    assert timed_out.value.retry_after >= 1
+    assert limiter.timeouts == 1
+    assert limiter.stats()["queue_depth"] == 0
+
+def test_concurrency_never_exceeds_the_limit():
+    limiter = ResourceLimiter("openai", max_concurrent=2, max_queue=10, queue_timeout=5)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        with limiter.acquire():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+    assert limiter.acquired == 8 and limiter.rejected == 0
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.core import result_cache
+
+REQUEST = {"prompt": "Une astuce  pour mémoriser", "tone": "percutant", "n_images": 3, "category": "astuce",
+           "lang": "fr", "tts_service": "auto", "render_engine": "moviepy"}
+
+def use_tmp_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(result_cache, "OUTPUT_DIR", str(tmp_path))
+
+def blocking_generator(tmp_path, calls, release):
+    def generate():
+        calls.append(1)
+        release.wait(5)
+        path = str(tmp_path / f"video_{len(calls)}.mp4")
+        with open(path, "wb") as f:
+            f.write(b"video")
+        return path
+    return generate
+
+def run_concurrently(count, target):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def test_identical_requests_share_one_generation(monkeypatch, tmp_path):
+    use_tmp_cache(monkeypatch, tmp_path)
+    calls, release = [], threading.Event()
+    generate = blocking_generator(tmp_path, calls, release)
+
+    threads, results, errors = run_concurrently(5, lambda: result_cache.get_or_generate(dict(REQUEST), generate))
+    while not calls:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors and len(calls) == 1
+    assert len({path for path, _, _ in results}) == 1
+    # Une seule demande a réellement généré la vidéo
+    assert sorted(cached for _, _, cached in results) == [False, True, True, True, True]
+    # La suivante est servie depuis le cache sans rien générer
+    path, _, cached = result_cache.get_or_generate(dict(REQUEST, prompt=" Une astuce pour  mémoriser"), generate)
+    assert cached and path == results[0][0] and len(calls) == 1
+
+def test_generation_error_reaches_waiting_requests(monkeypatch, tmp_path):
+    use_tmp_cache(monkeypatch, tmp_path)
+    started, release = threading.Event(), threading.Event()
+
+    def generate():
+        started.set()
+        release.wait(5)
+        raise Exception("échec du rendu")
+
+    threads, results, errors = run_concurrently(3, lambda: result_cache.get_or_generate(dict(REQUEST), generate))
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results and len(errors) == 3
+    assert all(str(error) == "échec du rendu" for error in errors)
+    assert result_cache.result_cache_stats()["in_flight"] == 0
+
+def test_expired_entries_are_not_served(monkeypatch, tmp_path):
+    use_tmp_cache(monkeypatch, tmp_path)
+    key = result_cache.request_cache_key(REQUEST)
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"video")
+    result_cache.store_result(key, str(video), REQUEST)
+    assert result_cache.get_cached_result(key) == str(video)
+
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_TTL_SECONDS", -1)
+    assert result_cache.get_cached_result(key) is None
+    assert not os.path.exists(os.path.join(str(tmp_path), f"{key}.json"))
+
+def test_invalid_keys_are_refused(monkeypatch, tmp_path):
+    use_tmp_cache(monkeypatch, tmp_path)
+    with pytest.raises(ValueError):
+        result_cache.get_cached_result("../../etc/passwd")
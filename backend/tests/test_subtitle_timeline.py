@@ -0,0 +1,25 @@
+from app.utils.subtitle_timeline import SubtitleTimeline
+
+def test_active_words_follow_start_inclusive_end_exclusive():
+    timeline = SubtitleTimeline([
+        {"word": "un", "start": 0.0, "end": 0.5},
+        {"word": "deux", "start": 0.5, "end": 1.0},
+    ])
+    assert [w["word"] for w in timeline.at(0.0)] == ["un"]
+    assert [w["word"] for w in timeline.at(0.5)] == ["deux"]
+    assert timeline.at(1.0) == ()
+    assert timeline.at(-1.0) == ()
+
+def test_out_of_order_and_overlapping_timings_keep_original_order():
+    timeline = SubtitleTimeline([
+        {"word": "b", "start": 1.0, "end": 2.0},
+        {"word": "a", "start": 0.0, "end": 1.5},
+        {"word": "vide", "start": 3.0, "end": 3.0},
+        {"word": "inversé", "start": 5.0, "end": 4.0},
+        {"word": "sans fin", "start": 2.0, "end": None},
+    ])
+    assert len(timeline) == 2
+    assert [w["word"] for w in timeline.at(0.5)] == ["a"]
+    assert [w["word"] for w in timeline.at(1.2)] == ["b", "a"]
+    assert [w["word"] for w in timeline.at(1.7)] == ["b"]
+    assert timeline.at(3.0) == ()
@@ -0,0 +1,21 @@
+from app.utils.transcript_chunks import plan_chunks, stitch_chunks
+
+def test_cuts_fall_in_silences_and_cover_the_whole_audio():
+    regions = [(0.0, 50.0), (52.0, 110.0), (111.0, 170.0), (172.0, 250.0)]
+    chunks = plan_chunks(regions, 250.0, target_seconds=100.0, max_seconds=150.0)
+    assert [c["own_start"] for c in chunks] == [0.0, 110.5]
+    assert chunks[0]["start"] == 0.0 and chunks[-1]["end"] == 250.0
+    assert all(a["own_end"] == b["own_start"] for a, b in zip(chunks, chunks[1:]))
+    # Coupures dans les silences : pas de recouvrement
+    assert all(c["start"] == c["own_start"] and c["end"] == c["own_end"] for c in chunks)
+
+def test_forced_cuts_overlap_and_stitching_drops_duplicates():
+    chunks = plan_chunks([(0.0, 30.0)], 30.0, target_seconds=10.0, max_seconds=15.0, overlap_seconds=2.0)
+    assert len(chunks) == 3
+    assert chunks[1]["start"] == 9.0 and chunks[1]["end"] == 21.0
+    first = [{"word": "un", "start": 8.0, "end": 8.6}, {"word": "deux", "start": 9.6, "end": 10.0}]
+    second = [{"word": "deux", "start": 0.7, "end": 1.0}, {"word": "trois", "start": 2.0, "end": 2.5}]
+    third = [{"word": "quatre", "start": 1.5, "end": 2.0}]
+    words = stitch_chunks([(chunks[0], first), (chunks[1], second), (chunks[2], third)])
+    assert [w["word"] for w in words] == ["un", "deux", "trois", "quatre"]
+    assert words[2]["start"] == 11.0 and words[3]["start"] == 20.5
@@ -0,0 +1,126 @@
+import time
+
+from app.core.resources import ResourceBusyError
+from app.core.tts_router import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker, TTSRouter
+
+def ok(name, delay=0.0):
+    def provider(text, lang):
+        time.sleep(delay)
+        return {"audio_data": name.encode()}
+    return provider
+
+def failing(delay=0.0):
+    def provider(text, lang):
+        time.sleep(delay)
+        raise Exception("panne")
+    return provider
+
+def make_router(providers, route, hedging=True):
+    return TTSRouter(providers=providers, routes={"default": route}, hedging=hedging)
+
+def open_breaker(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record(False, 0.0)
+    assert breaker.state == BREAKER_OPEN
+
+def test_breaker_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker("fake", window=4, min_calls=2, error_rate=0.5, cooldown=0.0, slow_call_seconds=10)
+    open_breaker(breaker)
+
+    assert breaker.allow()
+    assert breaker.state == BREAKER_HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(True, 0.1)
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.allow()
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker("fake", window=4, min_calls=2, error_rate=0.5, cooldown=0.0, slow_call_seconds=10)
+    open_breaker(breaker)
+    assert breaker.allow()
+
+    breaker.record(False, 0.1)
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.opened == 2
+
+def test_busy_provider_releases_probe_without_counting_a_failure():
+    def busy(text, lang):
+        raise ResourceBusyError("fake", 5)
+
+    router = make_router({"busy": busy, "backup": ok("backup")}, ["busy", "backup"])
+    breaker = router.breakers["busy"]
+    breaker.cooldown = 0.0
+    open_breaker(breaker)
+    failures = breaker.failures
+
+    assert router.synthesize("bonjour", "fr")["provider"] == "backup"
+    assert breaker.failures == failures
+    assert breaker.state == BREAKER_HALF_OPEN
+    # L'appel d'essai n'a pas eu lieu : il reste disponible
+    assert breaker.allow()
+
+def test_failure_launches_next_provider_while_hedge_is_running():
+    router = make_router({
+        "primary": failing(delay=0.2),
+        "hedge": ok("hedge", delay=2.0),
+        "third": ok("third"),
+    }, ["primary", "hedge", "third"])
+    # Couverture rapide du principal, mais pas de la requête de couverture elle-même
+    router._hedge_delay = lambda provider: 0.05 if provider == "primary" else 10.0
+
+    began = time.perf_counter()
+    response = router.synthesize("bonjour", "fr")
+
+    assert response["provider"] == "third"
+    assert time.perf_counter() - began < 1.0
+    assert router.counters["hedge"]["hedged"] == 1
+    assert router.counters["third"]["selected"] == 1
+
+def test_forced_launch_when_all_breakers_are_open():
+    router = make_router({"a": failing(), "b": ok("b")}, ["a", "b"], hedging=False)
+    for breaker in router.breakers.values():
+        breaker.cooldown = 3600
+        open_breaker(breaker)
+
+    response = router.synthesize("bonjour", "fr")
+
+    assert response["provider"] == "b"
+    assert router.counters["a"]["skipped_open"] == 1
+    assert router.counters["b"]["skipped_open"] == 1
+    assert router.counters["a"]["selected"] == 1
+
+def test_all_providers_failing_raises_with_details():
+    router = make_router({"a": failing(), "b": failing()}, ["a", "b"], hedging=False)
+    try:
+        router.synthesize("bonjour", "fr")
+    except Exception as e:
+        assert "a: panne" in str(e) and "b: panne" in str(e)
+    else:
+        raise AssertionError("une exception était attendue")
+
+def test_all_providers_busy_raises_busy_with_smallest_retry_after():
+    def busy(retry_after):
+        def provider(text, lang):
+            raise ResourceBusyError("fake", retry_after)
+        return provider
+
+    router = make_router({"a": busy(30), "b": busy(5)}, ["a", "b"], hedging=False)
+    try:
+        router.synthesize("bonjour", "fr")
+    except ResourceBusyError as e:
+        assert e.retry_after == 5
+    else:
+        raise AssertionError("ResourceBusyError était attendue")
+
+def test_busy_and_failing_providers_raise_a_generic_error():
+    def busy(text, lang):
+        raise ResourceBusyError("fake", 5)
+
+    router = make_router({"a": busy, "b": failing()}, ["a", "b"], hedging=False)
+    try:
+        router.synthesize("bonjour", "fr")
+    except ResourceBusyError:
+        raise AssertionError("une panne réelle ne doit pas devenir un 503")
+    except Exception as e:
+        assert "b: panne" in str(e)